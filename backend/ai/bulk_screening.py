@@ -0,0 +1,135 @@
+import numpy as np
+
+from sqlalchemy import func, select
+
+from ai import crop_rules
+
+# Per-batch flag bits. Photo GPS is not stored, so the GPS check stays
+# per batch at ingestion (utils/ingestion.py).
+FLAG_REGION = 1   # crop not grown in the declared region
+FLAG_YIELD = 2    # quantity above the crop's max yield
+
+LOAD_ATTEMPTS = 3
+
+
+def _factorize(values):
+    """(unique_values, codes) with codes[i] indexing unique_values; order of first use."""
+    index = {}
+    codes = np.fromiter(
+        (index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=len(values)
+    )
+    return list(index), codes
+
+
+class BatchColumns:
+    """Batch attributes as parallel NumPy arrays, one entry per batch."""
+
+    def __init__(self, ids, batch_ids, crops, regions, quantity):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.batch_ids = np.asarray(batch_ids, dtype=object)
+        self.crops = np.array([crop_rules.normalize_crop(c) for c in crops], dtype=object)
+        self.regions = np.array([(r or "Unknown").strip() for r in regions], dtype=object)
+        self.quantity = np.asarray(quantity, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _column(db, column, dtype, upto: int, n: int, chunk_size: int) -> np.ndarray:
+    """One column of every batch with id <= upto, in id order, read straight into an array."""
+    import models
+
+    stmt = (
+        select(column)
+        .where(models.Batch.id <= upto)
+        .order_by(models.Batch.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    return np.fromiter(db.execute(stmt).scalars(), dtype=dtype, count=n)
+
+
+def load_batch_columns(db, chunk_size: int = 50000) -> BatchColumns:
+    """
+    Reads each batch column with its own query into an array; no ORM
+    objects or per-row tuples are built. Rows inserted meanwhile are cut
+    off by the id bound; a delete between queries misaligns the counts,
+    which fromiter reports and the load is retried.
+    """
+    import models
+
+    b = models.Batch
+    for attempt in range(LOAD_ATTEMPTS):
+        upto = db.query(func.max(b.id)).scalar() or 0
+        ids = _column(db, b.id, np.int64, upto, -1, chunk_size)
+        n = len(ids)
+        try:
+            return BatchColumns(
+                ids,
+                _column(db, b.batch_id, object, upto, n, chunk_size),
+                _column(db, b.crop_name, object, upto, n, chunk_size),
+                _column(db, b.region, object, upto, n, chunk_size),
+                _column(db, func.coalesce(b.quantity, 0.0), np.float64, upto, n, chunk_size),
+            )
+        except ValueError:
+            if attempt == LOAD_ATTEMPTS - 1:
+                raise
+
+
+def screen(cols: BatchColumns, land_area_acres=1, rules=None) -> np.ndarray:
+    """
+    Applies the crop-location and yield rules to every batch at once.
+    Returns a uint8 flag bitmask per batch (0 = clean).
+    """
+    flags = np.zeros(len(cols), dtype=np.uint8)
+    if len(cols) == 0:
+        return flags
+
+    rules = rules or crop_rules.current()
+    valid_regions = rules.regions
+    max_yield = rules.max_yield
+
+    crop_names, crop_codes = _factorize(cols.crops)
+    region_names, region_codes = _factorize(cols.regions)
+
+    # ---- Region validity: (crop, region) lookup table ----
+    normalized = [crop_rules.normalize_region(r) for r in region_names]
+    ruled = np.zeros(len(crop_names), dtype=bool)
+    allowed = np.zeros((len(crop_names), len(region_names)), dtype=bool)
+    for c, crop in enumerate(crop_names):
+        if crop in valid_regions:
+            ruled[c] = True
+            allowed[c] = [r in valid_regions[crop] for r in normalized]
+
+    bad_region = ruled[crop_codes] & ~allowed[crop_codes, region_codes]
+    flags[bad_region] |= FLAG_REGION
+
+    # ---- Yield ratio ----
+    crop_max = np.array([max_yield.get(c, np.nan) for c in crop_names], dtype=np.float64)
+    limit = crop_max[crop_codes] * land_area_acres
+    with np.errstate(invalid="ignore"):
+        flags[cols.quantity > limit] |= FLAG_YIELD
+
+    return flags
+
+
+def flag_reasons(cols: BatchColumns, flags: np.ndarray, land_area_acres=1, limit: int = None, rules=None):
+    """
+    Human-readable reasons for the flagged rows only (the first `limit` of
+    them if given), worded like the scalar checks.
+    Returns {batch_id: [reason, ...]}.
+    """
+    reasons = {}
+    max_yield = (rules or crop_rules.current()).max_yield
+    for i in np.flatnonzero(flags)[:limit]:
+        crop = cols.crops[i]
+        out = []
+        if flags[i] & FLAG_REGION:
+            out.append(f"{crop.title()} cannot be grown in {cols.regions[i]}")
+        if flags[i] & FLAG_YIELD:
+            max_allowed = max_yield[crop] * land_area_acres
+            out.append(
+                f"Reported quantity {cols.quantity[i]}kg exceeds "
+                f"expected max {max_allowed}kg for {land_area_acres} acres"
+            )
+        reasons[cols.batch_ids[i]] = out
+    return reasons
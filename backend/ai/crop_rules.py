@@ -0,0 +1,98 @@
+import os
+
+from utils.versioned_cache import VersionedCache, read_version
+
+# Max staleness of another process's rule edits (see utils/versioned_cache.py)
+CROP_RULES_RECHECK_SECONDS = float(os.getenv("CROP_RULES_RECHECK_SECONDS", "5"))
+
+VERSION_KEY = "CROP_RULES_VERSION"
+
+# Seeded into an empty crop_rules table on first start
+DEFAULT_RULES = {
+    "saffron": {"max_yield_per_acre": 3, "regions": ["Jammu & Kashmir"]},
+    "apple": {"max_yield_per_acre": 8000, "regions": ["Himachal Pradesh", "Jammu & Kashmir"]},
+    "wheat": {"max_yield_per_acre": 1200, "regions": ["Punjab", "Haryana"]},
+}
+
+
+def normalize_crop(crop) -> str:
+    return (crop or "").strip().lower()
+
+
+def normalize_region(region) -> str:
+    return " ".join((region or "").split()).casefold()
+
+
+class CompiledRules:
+    """
+    Immutable lookup tables built from the crop_rules tables.
+
+    `regions` maps crop -> frozenset of normalized regions, `max_yield`
+    maps crop -> kg per acre. A crop missing from a map has no such rule.
+    """
+
+    def __init__(self, version: int, regions: dict, max_yield: dict):
+        self.version = version
+        self.regions = regions
+        self.max_yield = max_yield
+
+
+def compile_rules(db) -> CompiledRules:
+    import models
+
+    version = read_version(db, VERSION_KEY)
+    regions, max_yield = {}, {}
+    for rule in db.query(models.CropRule).all():
+        if rule.regions:
+            regions[rule.crop] = frozenset(normalize_region(r.region) for r in rule.regions)
+        if rule.max_yield_per_acre is not None:
+            value = rule.max_yield_per_acre
+            max_yield[rule.crop] = int(value) if float(value).is_integer() else value
+    return CompiledRules(version, regions, max_yield)
+
+
+def _load(db):
+    rules = compile_rules(db)
+    return rules.version, rules
+
+
+_cache = VersionedCache(VERSION_KEY, _load, CROP_RULES_RECHECK_SECONDS)
+
+
+def current() -> CompiledRules:
+    """
+    Returns the compiled rules for this process, reloaded only when the
+    rules version has moved, so fraud checks never query per call.
+    """
+    return _cache.get()
+
+
+def invalidate():
+    _cache.invalidate()
+
+
+def bump_version(db):
+    """Increments the rules version; the caller commits."""
+    _cache.bump(db)
+
+
+def seed_defaults():
+    """Fills an empty crop_rules table with DEFAULT_RULES."""
+    import models
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if db.query(models.CropRule.id).first() is not None or read_version(db, VERSION_KEY) > 0:
+            return
+        for crop, rule in DEFAULT_RULES.items():
+            db.add(models.CropRule(
+                crop=crop,
+                max_yield_per_acre=rule["max_yield_per_acre"],
+                regions=[models.CropRegion(region=r) for r in rule["regions"]],
+            ))
+        bump_version(db)
+        db.commit()
+    finally:
+        db.close()
+    invalidate()
@@ -0,0 +1,160 @@
+import os
+
+import numpy as np
+import torch
+import torchvision.models as models
+import torchvision.models.quantization as qmodels
+
+WEIGHTS_DIR = os.path.join(os.path.dirname(__file__), "weights")
+
+# Every backend loads from local disk only; see export_all() for creating the files
+MOBILENET_WEIGHTS_PATH = os.getenv(
+    "MOBILENET_WEIGHTS_PATH", os.path.join(WEIGHTS_DIR, "mobilenet_v2.pth")
+)
+MOBILENET_INT8_WEIGHTS_PATH = os.getenv(
+    "MOBILENET_INT8_WEIGHTS_PATH", os.path.join(WEIGHTS_DIR, "mobilenet_v2_int8.pth")
+)
+MOBILENET_ONNX_PATH = os.getenv(
+    "MOBILENET_ONNX_PATH", os.path.join(WEIGHTS_DIR, "mobilenet_v2.onnx")
+)
+MOBILENET_ONNX_INT8_PATH = os.getenv(
+    "MOBILENET_ONNX_INT8_PATH", os.path.join(WEIGHTS_DIR, "mobilenet_v2_int8.onnx")
+)
+
+QUANT_ENGINE = "qnnpack"  # engine the torchvision int8 weights were calibrated for
+
+
+def _require(path: str):
+    if not os.path.exists(path):
+        raise RuntimeError(
+            f"Embedding weights not found at {path}. "
+            "Run `python -m ai.vectorize --export-weights` once with network access."
+        )
+
+
+class TorchBackend:
+    """float32 reference model."""
+
+    name = "torch"
+
+    def __init__(self, num_threads: int = 0):
+        _require(MOBILENET_WEIGHTS_PATH)
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+
+        model = models.mobilenet_v2(weights=None)
+        state = torch.load(MOBILENET_WEIGHTS_PATH, map_location="cpu", weights_only=True)
+        model.load_state_dict(state)
+        model.classifier = torch.nn.Identity()
+        model.eval()
+        self.model = model
+
+    def embed(self, batch: torch.Tensor) -> np.ndarray:
+        with torch.inference_mode():
+            return self.model(batch).numpy()
+
+
+class TorchInt8Backend(TorchBackend):
+    """
+    torchvision's statically quantized MobileNetV2 (int8 weights and
+    activations). Dynamic quantization alone would not help here: it only
+    covers Linear layers, and with the classifier removed there are none.
+    """
+
+    name = "torch-int8"
+
+    def __init__(self, num_threads: int = 0):
+        _require(MOBILENET_INT8_WEIGHTS_PATH)
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+
+        torch.backends.quantized.engine = QUANT_ENGINE
+        model = qmodels.mobilenet_v2(weights=None, quantize=True, backend=QUANT_ENGINE)
+        state = torch.load(MOBILENET_INT8_WEIGHTS_PATH, map_location="cpu", weights_only=False)
+        model.load_state_dict(state)
+        model.classifier = torch.nn.Identity()
+        model.eval()
+        self.model = model
+
+
+class OnnxBackend:
+    """ONNX Runtime on CPU, for the exported float or int8 graph."""
+
+    name = "onnx"
+
+    def __init__(self, num_threads: int = 0, path: str = MOBILENET_ONNX_PATH):
+        import onnxruntime as ort
+
+        _require(path)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def embed(self, batch: torch.Tensor) -> np.ndarray:
+        return self.session.run(None, {self.input_name: batch.numpy()})[0]
+
+
+class OnnxInt8Backend(OnnxBackend):
+    name = "onnx-int8"
+
+    def __init__(self, num_threads: int = 0):
+        super().__init__(num_threads, path=MOBILENET_ONNX_INT8_PATH)
+
+
+BACKENDS = {
+    cls.name: cls
+    for cls in (TorchBackend, TorchInt8Backend, OnnxBackend, OnnxInt8Backend)
+}
+
+
+def load_backend(name: str, num_threads: int = 0):
+    if name not in BACKENDS:
+        raise RuntimeError(f"Unknown embedding backend {name!r}; choose from {sorted(BACKENDS)}")
+    return BACKENDS[name](num_threads)
+
+
+def export_all():
+    """
+    Downloads the float and int8 ImageNet weights, then exports the float
+    model to ONNX and, when onnxruntime is installed, a dynamically
+    quantized int8 copy of it. Returns the paths written.
+    """
+    os.makedirs(WEIGHTS_DIR, exist_ok=True)
+    written = []
+
+    model = models.mobilenet_v2(weights=models.MobileNet_V2_Weights.IMAGENET1K_V1)
+    torch.save(model.state_dict(), MOBILENET_WEIGHTS_PATH)
+    written.append(MOBILENET_WEIGHTS_PATH)
+
+    qmodel = qmodels.mobilenet_v2(
+        weights=qmodels.MobileNet_V2_QuantizedWeights.IMAGENET1K_QNNPACK_V1,
+        quantize=True,
+        backend=QUANT_ENGINE,
+    )
+    torch.save(qmodel.state_dict(), MOBILENET_INT8_WEIGHTS_PATH)
+    written.append(MOBILENET_INT8_WEIGHTS_PATH)
+
+    model.classifier = torch.nn.Identity()
+    model.eval()
+    torch.onnx.export(
+        model,
+        torch.zeros(1, 3, 224, 224),
+        MOBILENET_ONNX_PATH,
+        input_names=["input"],
+        output_names=["embedding"],
+        dynamic_axes={"input": {0: "batch"}, "embedding": {0: "batch"}},
+        opset_version=17,
+    )
+    written.append(MOBILENET_ONNX_PATH)
+
+    try:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+    except ImportError:
+        return written
+
+    quantize_dynamic(MOBILENET_ONNX_PATH, MOBILENET_ONNX_INT8_PATH, weight_type=QuantType.QInt8)
+    written.append(MOBILENET_ONNX_INT8_PATH)
+    return written
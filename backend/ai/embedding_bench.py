@@ -0,0 +1,91 @@
+"""
+Parity check and micro-benchmark for the embedding backends.
+
+    python -m ai.embedding_bench ai/static/*.png
+    python -m ai.embedding_bench ai/static/*.png --backends torch-int8 onnx --min-cosine 0.97
+
+Every backend is compared with the float32 torch reference on the same
+images. Exits with status 1 if any backend's worst-case cosine similarity
+falls below --min-cosine, so it can gate a backend switch in CI.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from ai.embedding_backends import BACKENDS, load_backend
+from ai.vectorize import images_to_vectors, _rss_mb, _rss_delta_mb, _round_mb
+
+# Worst-case cosine similarity to the torch reference a backend must reach
+DEFAULT_MIN_COSINE = 0.95
+
+
+def _cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def bench(name: str, image_paths, repeats: int, reference=None):
+    rss_before = _rss_mb()
+    started = time.perf_counter()
+    backend = load_backend(name)
+    load_seconds = time.perf_counter() - started
+    rss_delta = _rss_delta_mb(rss_before)
+
+    vectors = images_to_vectors(image_paths, backend=backend)  # warm-up + parity sample
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        images_to_vectors(image_paths, backend=backend)
+    per_image_ms = (time.perf_counter() - started) * 1000 / (repeats * len(image_paths))
+
+    row = {
+        "backend": name,
+        "load_s": round(load_seconds, 2),
+        "rss_delta_mb": _round_mb(rss_delta),
+        "ms_per_image": round(per_image_ms, 2),
+    }
+    if reference is not None:
+        cos = _cosine_rows(vectors, reference)
+        row["min_cosine"] = round(float(cos.min()), 4)
+        row["mean_cosine"] = round(float(cos.mean()), 4)
+    return row, vectors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--backends", nargs="+", default=sorted(BACKENDS))
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--min-cosine", type=float, default=DEFAULT_MIN_COSINE)
+    args = parser.parse_args(argv)
+
+    ref_row, reference = bench("torch", args.images, args.repeats)
+    rows = [ref_row]
+    failed = []
+
+    for name in args.backends:
+        if name == "torch":
+            continue
+        try:
+            row, _ = bench(name, args.images, args.repeats, reference)
+        except (ImportError, RuntimeError) as e:
+            rows.append({"backend": name, "skipped": str(e)})
+            continue
+        rows.append(row)
+        if row["min_cosine"] < args.min_cosine:
+            failed.append(name)
+
+    for row in rows:
+        print(row)
+
+    if failed:
+        print(f"Parity below {args.min_cosine}: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
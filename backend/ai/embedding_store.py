@@ -0,0 +1,191 @@
+"""
+Append-only store of unit-norm image embeddings as float16 rows in a flat
+file, read through a shared memory map.
+
+BatchImage.embedding_row holds each image's row. Rows are never updated
+in place; rows no BatchImage points at any more are dropped by
+compaction, which writes a new generation of the file:
+
+    python -m ai.embedding_store --compact    # with the API stopped
+"""
+import os
+import threading
+
+import numpy as np
+
+from ai.vector_index import _normalize
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+EMBEDDING_STORE_DIR = os.getenv("EMBEDDING_STORE_DIR", "embeddings")
+GENERATION_KEY = "EMBEDDING_STORE_GENERATION"
+
+
+def _lock_file(f):
+    """Exclusive lock shared with other processes: flock, or the first byte on Windows."""
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class EmbeddingStore:
+    """
+    float16 (N, dim) matrix on disk. Appends take an exclusive file lock, so
+    several worker processes can share one file; view() maps it without
+    copying, so they also share one copy in the page cache.
+    """
+
+    def __init__(self, directory: str, dim: int, dtype=np.float16):
+        self.directory = directory
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = dim * self.dtype.itemsize
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def path_for(self, generation: int) -> str:
+        return os.path.join(self.directory, f"embeddings.{generation}.f16")
+
+    @property
+    def path(self) -> str:
+        return self.path_for(self.generation)
+
+    def open(self, generation: int):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self.generation = generation
+            if not os.path.exists(self.path):
+                open(self.path, "ab").close()
+
+    def __len__(self):
+        try:
+            return os.path.getsize(self.path) // self.row_bytes
+        except FileNotFoundError:
+            return 0
+
+    def view(self) -> np.ndarray:
+        """Read-only (N, dim) map of every row written so far."""
+        n = len(self)
+        if n == 0:
+            return np.empty((0, self.dim), dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", shape=(n, self.dim))
+
+    def append(self, vectors: np.ndarray) -> int:
+        """Normalizes and appends rows; returns the row index of the first."""
+        data = _normalize(vectors).reshape(-1, self.dim).astype(self.dtype)
+        with self._lock, open(self.path, "ab") as f:
+            _lock_file(f)
+            try:
+                size = os.fstat(f.fileno()).st_size
+                if size % self.row_bytes:
+                    # Torn write from a crash; drop the partial row
+                    f.truncate(size - size % self.row_bytes)
+                first = size // self.row_bytes
+                f.write(data.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            finally:
+                _unlock_file(f)
+        return first
+
+    def get(self, row: int) -> np.ndarray:
+        with open(self.path, "rb") as f:
+            f.seek(row * self.row_bytes)
+            raw = f.read(self.row_bytes)
+        if len(raw) != self.row_bytes:
+            raise IndexError(f"Embedding row {row} not in store")
+        return np.frombuffer(raw, dtype=self.dtype).astype(np.float32)
+
+    def write_compacted(self, live_rows, chunk: int = 65536) -> int:
+        """
+        Copies `live_rows` (ascending) into the next generation's file.
+        Row i of the new file is live_rows[i]. Returns the new generation;
+        the caller records it and repoints the rows, then calls open().
+        """
+        live_rows = np.asarray(live_rows, dtype=np.int64)
+        generation = self.generation + 1
+        source = self.view()
+        with open(self.path_for(generation), "wb") as out:
+            for i in range(0, len(live_rows), chunk):
+                out.write(np.asarray(source[live_rows[i:i + chunk]]).tobytes())
+            out.flush()
+            os.fsync(out.fileno())
+        return generation
+
+
+# MobileNetV2 embeddings of every batch image
+embedding_store = EmbeddingStore(EMBEDDING_STORE_DIR, 1280)
+
+
+def open_store(db):
+    """Opens the generation recorded in global_settings."""
+    import models
+
+    row = db.query(models.GlobalSettings.value).filter(models.GlobalSettings.key == GENERATION_KEY).first()
+    embedding_store.open(int(row[0]) if row else 0)
+    return embedding_store
+
+
+def compact(db) -> dict:
+    """
+    Drops rows no BatchImage references. The new generation number and
+    the repointed rows commit in one transaction, so a crash at any point
+    leaves the database and a complete file in agreement.
+    """
+    import models
+
+    open_store(db)
+    old_generation = embedding_store.generation
+    total = len(embedding_store)
+
+    images = (
+        db.query(models.BatchImage.id, models.BatchImage.embedding_row)
+        .filter(models.BatchImage.embedding_row.isnot(None))
+        .order_by(models.BatchImage.embedding_row)
+        .all()
+    )
+    generation = embedding_store.write_compacted([row for _, row in images])
+
+    db.bulk_update_mappings(models.BatchImage, [
+        {"id": image_id, "embedding_row": new_row}
+        for new_row, (image_id, _) in enumerate(images)
+    ])
+    setting = db.query(models.GlobalSettings).filter(models.GlobalSettings.key == GENERATION_KEY).first()
+    if setting is None:
+        db.add(models.GlobalSettings(key=GENERATION_KEY, value=str(generation)))
+    else:
+        setting.value = str(generation)
+    db.commit()
+
+    embedding_store.open(generation)
+    os.remove(embedding_store.path_for(old_generation))
+    return {"generation": generation, "rows_before": total, "rows_after": len(images)}
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--compact" in sys.argv:
+        from database import SessionLocal
+
+        session = SessionLocal()
+        try:
+            print(compact(session))
+        finally:
+            session.close()
+    else:
+        print(__doc__)
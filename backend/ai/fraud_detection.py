@@ -2,40 +2,47 @@ from PIL import Image
 from PIL.ExifTags import TAGS
 from datetime import datetime, timedelta
 import numpy as np
+import hashlib
 import math
 
 
-MAX_YIELD_PER_ACRE = {
-    "saffron": 3,     
-    "wheat": 1200,   
-    "apple": 8000
-}
+from ai import crop_rules
 
-VALID_REGIONS = {
-    "saffron": ["Jammu & Kashmir"],
-    "apple": ["Himachal Pradesh", "Jammu & Kashmir"],
-    "wheat": ["Punjab", "Haryana"]
-}
 
-def check_crop_location(crop, location):
-    crop = crop.lower()
+def check_crop_location(crop, location, rules=None):
+    rules = rules or crop_rules.current()
+    crop = crop_rules.normalize_crop(crop)
     location = location.strip()
 
-    if crop not in VALID_REGIONS:
-        return False, None  
+    allowed = rules.regions.get(crop)
+    if allowed is None:
+        return False, None
 
-    if location not in VALID_REGIONS[crop]:
+    if crop_rules.normalize_region(location) not in allowed:
         return True, f"{crop.title()} cannot be grown in {location}"
 
     return False, None
 
-def check_yield(crop, quantity_kg, land_area_acres):
-    crop = crop.lower()
+def parse_banned_regions(value) -> frozenset:
+    """The BANNED_ZONES setting ("A, B") as normalized regions."""
+    return frozenset(
+        crop_rules.normalize_region(r) for r in (value or "").split(",") if r.strip()
+    )
+
+def check_banned_zone(location, banned_regions: frozenset):
+    if banned_regions and crop_rules.normalize_region(location) in banned_regions:
+        return True, f"{location.strip()} is a banned zone"
+    return False, None
+
+def check_yield(crop, quantity_kg, land_area_acres, rules=None):
+    rules = rules or crop_rules.current()
+    crop = crop_rules.normalize_crop(crop)
 
-    if crop not in MAX_YIELD_PER_ACRE:
+    max_per_acre = rules.max_yield.get(crop)
+    if max_per_acre is None:
         return False, None
 
-    max_allowed = MAX_YIELD_PER_ACRE[crop] * land_area_acres
+    max_allowed = max_per_acre * land_area_acres
 
     if quantity_kg > max_allowed:
         return True, (
@@ -46,23 +53,65 @@ def check_yield(crop, quantity_kg, land_area_acres):
     return False, None
 
 
-def extract_exif(image_path):
-    image = Image.open(image_path)
-    exif_raw = image._getexif()
+EXIF_IFD = 0x8769
+GPS_IFD = 0x8825
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ImageMetadata:
+    """
+    Everything the fraud checks need from one image, read in a single
+    file open. Only the header is parsed; pixel data is never decoded.
+    """
+
+    def __init__(self, path, exif, width, height, format, sha256):
+        self.path = path
+        self.exif = exif
+        self.width = width
+        self.height = height
+        self.format = format
+        self.sha256 = sha256
+        self.gps = extract_image_gps(exif)
+
 
+def _exif_to_dict(exif_raw):
     if not exif_raw:
         return None
 
     exif = {}
     for tag, value in exif_raw.items():
-        tag_name = TAGS.get(tag, tag)
-        exif[tag_name] = value
+        exif[TAGS.get(tag, tag)] = value
+
+    # Same shape as the legacy _getexif(): Exif sub-IFD merged in,
+    # GPS sub-IFD kept as a dict under "GPSInfo"
+    for tag, value in exif_raw.get_ifd(EXIF_IFD).items():
+        exif[TAGS.get(tag, tag)] = value
+
+    gps = exif_raw.get_ifd(GPS_IFD)
+    if gps:
+        exif["GPSInfo"] = dict(gps)
+    else:
+        exif.pop("GPSInfo", None)
 
     return exif
 
 
-def check_exif(image_path):
-    exif = extract_exif(image_path)
+def read_image_metadata(image_path) -> ImageMetadata:
+    sha = hashlib.sha256()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha.update(chunk)
+        f.seek(0)
+        with Image.open(f) as image:
+            exif = _exif_to_dict(image.getexif())
+            width, height = image.size
+            format = image.format
+
+    return ImageMetadata(image_path, exif, width, height, format, sha.hexdigest())
+
+
+def check_exif(meta: ImageMetadata):
+    exif = meta.exif
 
     if not exif:
         return True, "No EXIF metadata found"
@@ -71,7 +120,10 @@ def check_exif(image_path):
         return True, "Camera make missing"
 
     if "DateTime" in exif:
-        photo_time = datetime.strptime(exif["DateTime"], "%Y:%m:%d %H:%M:%S")
+        try:
+            photo_time = datetime.strptime(str(exif["DateTime"]).strip(), "%Y:%m:%d %H:%M:%S")
+        except ValueError:
+            return True, "Photo timestamp is unreadable"
         if datetime.now() - photo_time > timedelta(days=7):
             return True, "Photo is too old"
 
@@ -84,13 +136,13 @@ def cosine_similarity(vec1, vec2):
     )
 
 
-def check_image_similarity(image_path, reference_vector):
+def check_image_similarity(meta: ImageMetadata, reference_vector):
     """
     Flags fraud if cosine similarity < 40%
     """
     from ai.vectorize import image_to_vector  
 
-    current_vector = image_to_vector(image_path)
+    current_vector = image_to_vector(meta.path)
     similarity = cosine_similarity(current_vector, reference_vector)
 
     if similarity < 0.40:
@@ -113,6 +165,11 @@ def haversine(lat1, lon1, lat2, lon2):
     return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 def extract_image_gps(exif):
+    """
+    (lat, lon) from the EXIF GPSInfo, or (None, None) when there is no
+    usable fix. Phones often write a GPS IFD holding only a version or
+    timestamp, so missing or malformed coordinates are not an error.
+    """
     if not exif:
         return None, None
 
@@ -122,16 +179,21 @@ def extract_image_gps(exif):
 
     def convert(coord):
         d, m, s = coord
-        return d + m / 60 + s / 3600
+        return float(d) + float(m) / 60 + float(s) / 3600
 
-    lat = convert(gps[2])
-    if gps[1] != "N":
-        lat = -lat
+    try:
+        lat = convert(gps[2])
+        if gps[1] != "N":
+            lat = -lat
 
-    lon = convert(gps[4])
-    if gps[3] != "E":
-        lon = -lon
+        lon = convert(gps[4])
+        if gps[3] != "E":
+            lon = -lon
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None, None
 
+    if not (math.isfinite(lat) and math.isfinite(lon)) or abs(lat) > 90 or abs(lon) > 180:
+        return None, None
     return lat, lon
 
 
@@ -145,11 +207,12 @@ def check_gps_mismatch(user_lat, user_lon, image_lat, image_lon):
 
 def run_fraud_checks(data, image_path, reference_vector=None):
     flags = []
+    meta = read_image_metadata(image_path)
 
     checks = [
         check_crop_location(data["crop"], data["location"]),
         check_yield(data["crop"], data["quantity_kg"], data["land_area"]),
-        check_exif(image_path),
+        check_exif(meta),
     ]
 
     # Only apply cosine similarity AFTER farmer stage
@@ -158,11 +221,10 @@ def run_fraud_checks(data, image_path, reference_vector=None):
             flags.append("Missing reference image for comparison")
         else:
             checks.append(
-                check_image_similarity(image_path, reference_vector)
+                check_image_similarity(meta, reference_vector)
             )
             
-    exif = extract_exif(image_path)
-    img_lat, img_lon = extract_image_gps(exif)
+    img_lat, img_lon = meta.gps
 
     if img_lat and img_lon:
         is_fraud, reason = check_gps_mismatch(
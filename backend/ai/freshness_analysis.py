@@ -1,10 +1,23 @@
+import asyncio
 import base64
+import hashlib
 import json
+import logging
 import os
+import threading
+import time
+from collections import deque
+import httpx
+import numpy as np
 import requests
 from pathlib import Path
 from dotenv import load_dotenv
 from .prompt import FRESHNESS_PROMPT
+from .result_cache import ResultCache
+from .image_tasks import prepare_file
+from .freshness_local import estimate_file
+from . import http_client
+from utils.process_pool import image_pool, PoolBusy
 
 load_dotenv()
 
@@ -13,17 +26,178 @@ if not OPENROUTER_API_KEY:
     raise RuntimeError("OPENROUTER_API_KEY not set")
 
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+FRESHNESS_MODEL = "openrouter/auto"
+
+# Images are downscaled and re-encoded before upload
+FRESHNESS_MAX_EDGE = int(os.getenv("FRESHNESS_MAX_EDGE", "1024"))
+FRESHNESS_IMAGE_FORMAT = os.getenv("FRESHNESS_IMAGE_FORMAT", "JPEG").upper()  # JPEG | WEBP
+FRESHNESS_IMAGE_QUALITY = int(os.getenv("FRESHNESS_IMAGE_QUALITY", "85"))
+
+# Changing the prompt, model or preprocessing changes this,
+# which invalidates old cache entries
+ANALYSIS_VERSION = hashlib.sha256(
+    f"{FRESHNESS_MODEL}\n{FRESHNESS_PROMPT}\n"
+    f"{FRESHNESS_MAX_EDGE}/{FRESHNESS_IMAGE_FORMAT}/{FRESHNESS_IMAGE_QUALITY}".encode("utf-8")
+).hexdigest()[:16]
+
+# Local estimates at or above this confidence skip the LLM entirely.
+# Off by default: the local weights are not yet validated against LLM grades.
+FRESHNESS_TIERED = os.getenv("FRESHNESS_TIERED", "0") == "1"
+FRESHNESS_LOCAL_MIN_CONFIDENCE = float(os.getenv("FRESHNESS_LOCAL_MIN_CONFIDENCE", "0.6"))
+
+logger = logging.getLogger(__name__)
+
+freshness_cache = ResultCache(
+    path=os.getenv("FRESHNESS_CACHE_PATH", "freshness_cache.db"),
+    ttl_seconds=int(os.getenv("FRESHNESS_CACHE_TTL", str(7 * 24 * 3600))),
+    memory_size=int(os.getenv("FRESHNESS_CACHE_MEMORY_SIZE", "1024")),
+    max_entries=int(os.getenv("FRESHNESS_CACHE_MAX_ENTRIES", "100000")),
+)
+
+
+class TierStats:
+    """Per-tier counts and recent latencies for this process."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self._latencies = {}
+        self._counts = {}
+        self.local_attempts = 0
+        self.escalations = 0
+
+    def record(self, tier: str, seconds: float):
+        with self._lock:
+            self._counts[tier] = self._counts.get(tier, 0) + 1
+            self._latencies.setdefault(tier, deque(maxlen=self._window)).append(seconds * 1000)
+
+    def record_local(self, escalated: bool):
+        with self._lock:
+            self.local_attempts += 1
+            self.escalations += int(escalated)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            tiers = {}
+            for tier, samples in self._latencies.items():
+                ms = np.fromiter(samples, dtype=np.float64)
+                tiers[tier] = {
+                    "count": self._counts[tier],
+                    "mean_ms": round(float(ms.mean()), 1),
+                    "p50_ms": round(float(np.percentile(ms, 50)), 1),
+                    "p95_ms": round(float(np.percentile(ms, 95)), 1),
+                }
+            return {
+                "tiered": FRESHNESS_TIERED,
+                "min_confidence": FRESHNESS_LOCAL_MIN_CONFIDENCE,
+                "local_attempts": self.local_attempts,
+                "escalations": self.escalations,
+                "escalation_rate": round(self.escalations / self.local_attempts, 3) if self.local_attempts else None,
+                "tiers": tiers,
+            }
+
+
+tier_stats = TierStats()
+
+
+def fallback_ai_result() -> dict:
+    """Neutral grade used when the analysis fails, so batches still get one."""
+    return {
+        "freshness_score": 85,
+        "quality_grade": "B",
+        "estimated_shelf_life_days": 4,
+        "visual_defects": [],
+    }
+
+
+def _cache_key(sha256_hex: str) -> str:
+    return f"{ANALYSIS_VERSION}:{sha256_hex}"
+
+
+def file_sha256(image_path) -> str:
+    sha = hashlib.sha256()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _prepare_args(image_path):
+    return (prepare_file, str(image_path), FRESHNESS_MAX_EDGE, FRESHNESS_IMAGE_FORMAT, FRESHNESS_IMAGE_QUALITY)
+
+
+def _log_upload(original_size: int, upload_bytes: bytes):
+    logger.info(
+        "freshness upload: %d -> %d bytes (saved %.0f%%)",
+        original_size,
+        len(upload_bytes),
+        100 * (1 - len(upload_bytes) / max(original_size, 1)),
+    )
+
+
+def _normalize_result(result: dict) -> dict:
+    """Maps the prompt's `grade`/`visible_defects` to the keys the app stores."""
+    result = dict(result)
+    if "grade" in result:
+        result.setdefault("quality_grade", result.pop("grade"))
+    if "visible_defects" in result:
+        result.setdefault("visual_defects", result.pop("visible_defects"))
+    return result
+
+
+def _accept_local(local, started: float):
+    """Returns the local estimate if it is confident enough, else None (escalate)."""
+    if local is None:
+        tier_stats.record_local(escalated=True)
+        return None
+    confident = local["confidence"] >= FRESHNESS_LOCAL_MIN_CONFIDENCE
+    tier_stats.record("local", time.perf_counter() - started)
+    tier_stats.record_local(escalated=not confident)
+    return {**local, "tier": "local"} if confident else None
 
 
 def analyze_freshness(image_path: Path) -> dict:
-    response = None
-    text = None
+    """
+    Tiered freshness analysis: cached LLM result, else the local
+    estimator, else (low confidence) the LLM. Adds a `tier` key.
+    """
+    started = time.perf_counter()
+    cache_key = _cache_key(file_sha256(image_path))
+
+    cached = freshness_cache.get(cache_key)
+    if cached is not None:
+        tier_stats.record("cache", time.perf_counter() - started)
+        return {**_normalize_result(cached), "tier": "cache"}
+
+    if FRESHNESS_TIERED:
+        started = time.perf_counter()
+        try:
+            local = image_pool.run(estimate_file, str(image_path))
+        except Exception as e:
+            logger.warning("Local freshness estimate failed: %s", e)
+            local = None
+        accepted = _accept_local(local, started)
+        if accepted:
+            return accepted
 
-    image_bytes = image_path.read_bytes()
-    image_b64 = base64.b64encode(image_bytes).decode("utf-8")
+    started = time.perf_counter()
+    # Decode + resize in the image pool, off this process's GIL
+    upload_bytes, mime_type, original_size = image_pool.run(*_prepare_args(image_path))
+    _log_upload(original_size, upload_bytes)
+
+    result = _request_freshness(upload_bytes, mime_type)
+    tier_stats.record("llm", time.perf_counter() - started)
+    if "error" not in result:
+        freshness_cache.set(cache_key, result)
+        result = {**result, "tier": "llm"}
+    return result
+
+
+def _build_request(upload_bytes: bytes, mime_type: str):
+    image_b64 = base64.b64encode(upload_bytes).decode("utf-8")
 
     payload = {
-        "model": "openrouter/auto",
+        "model": FRESHNESS_MODEL,
         "messages": [
             {
                 "role": "user",
@@ -32,7 +206,7 @@ def analyze_freshness(image_path: Path) -> dict:
                     {
                         "type": "image_url",
                         "image_url": {
-                            "url": f"data:image/png;base64,{image_b64}"
+                            "url": f"data:{mime_type};base64,{image_b64}"
                         },
                     },
                 ],
@@ -48,37 +222,127 @@ def analyze_freshness(image_path: Path) -> dict:
         "HTTP-Referer": "https://traceroots.app",
         "X-Title": "TraceRoots",
     }
+    return payload, headers
+
+
+def _parse_completion(text: str) -> dict:
+    try:
+        return _normalize_result(json.loads(text))
+    except json.JSONDecodeError:
+        return {
+            "error": "invalid_json_from_llm",
+            "raw_response": text,
+        }
+
+
+def _request_freshness(upload_bytes: bytes, mime_type: str) -> dict:
+    response = None
 
     try:
-        response = requests.post(
+        payload, headers = _build_request(upload_bytes, mime_type)
+        response = http_client.post(
             OPENROUTER_URL,
             headers=headers,
             json=payload,
-            timeout=30,
         )
         response.raise_for_status()
 
         data = response.json()
-        text = data["choices"][0]["message"]["content"].strip()
-
-        return json.loads(text)
+        return _parse_completion(data["choices"][0]["message"]["content"].strip())
 
-    except json.JSONDecodeError:
+    except http_client.CircuitOpenError as e:
         return {
-            "error": "invalid_json_from_llm",
-            "raw_response": text,
+            "error": "openrouter_circuit_open",
+            "message": str(e),
         }
 
     except requests.RequestException as e:
         return {
             "error": "openrouter_request_failed",
             "message": str(e),
-            "status_code": response.status_code if response else None,
-            "raw_response": response.text if response else None,
+            "status_code": response.status_code if response is not None else None,
+            "raw_response": response.text if response is not None else None,
+        }
+
+    except Exception as e:
+        return {
+            "error": "unexpected_error",
+            "message": str(e),
+        }
+
+
+async def _request_freshness_async(upload_bytes: bytes, mime_type: str) -> dict:
+    response = None
+    try:
+        payload, headers = _build_request(upload_bytes, mime_type)
+        response = await http_client.async_post(
+            OPENROUTER_URL,
+            headers=headers,
+            json=payload,
+        )
+        response.raise_for_status()
+
+        data = response.json()
+        return _parse_completion(data["choices"][0]["message"]["content"].strip())
+
+    except http_client.CircuitOpenError as e:
+        return {
+            "error": "openrouter_circuit_open",
+            "message": str(e),
+        }
+
+    except httpx.HTTPError as e:
+        return {
+            "error": "openrouter_request_failed",
+            "message": str(e),
+            "status_code": response.status_code if response is not None else None,
+            "raw_response": response.text if response is not None else None,
         }
 
     except Exception as e:
         return {
             "error": "unexpected_error",
             "message": str(e),
-        }
\ No newline at end of file
+        }
+
+
+async def analyze_freshness_async(image_path, sha256: str = None) -> dict:
+    """
+    Event-loop friendly analyze_freshness: cache lookups run in worker
+    threads, the local estimate and image preprocessing in the image pool,
+    and the LLM call uses the async client. Pass `sha256` if the caller
+    already hashed the file. Raises PoolBusy if the image pool stays saturated.
+    """
+    started = time.perf_counter()
+    if sha256 is None:
+        sha256 = await asyncio.to_thread(file_sha256, image_path)
+    cache_key = _cache_key(sha256)
+
+    cached = await asyncio.to_thread(freshness_cache.get, cache_key)
+    if cached is not None:
+        tier_stats.record("cache", time.perf_counter() - started)
+        return {**_normalize_result(cached), "tier": "cache"}
+
+    if FRESHNESS_TIERED:
+        started = time.perf_counter()
+        try:
+            local = await image_pool.run_async(estimate_file, str(image_path))
+        except PoolBusy:
+            raise
+        except Exception as e:
+            logger.warning("Local freshness estimate failed: %s", e)
+            local = None
+        accepted = _accept_local(local, started)
+        if accepted:
+            return accepted
+
+    started = time.perf_counter()
+    upload_bytes, mime_type, original_size = await image_pool.run_async(*_prepare_args(image_path))
+    _log_upload(original_size, upload_bytes)
+
+    result = await _request_freshness_async(upload_bytes, mime_type)
+    tier_stats.record("llm", time.perf_counter() - started)
+    if "error" not in result:
+        await asyncio.to_thread(freshness_cache.set, cache_key, result)
+        result = {**result, "tier": "llm"}
+    return result
@@ -0,0 +1,121 @@
+"""
+First-tier freshness estimate from colour statistics, computed locally in
+a few milliseconds. Only images it is unsure about go to the LLM
+(see freshness_analysis.analyze_freshness).
+
+The weights are hand-set rather than trained, so the tier is off unless
+FRESHNESS_TIERED=1. Compare its grades with LLM grades on real uploads
+and tune FRESHNESS_LOCAL_MIN_CONFIDENCE before enabling it.
+"""
+import os
+
+import numpy as np
+from PIL import Image
+
+FRESHNESS_LOCAL_EDGE = int(os.getenv("FRESHNESS_LOCAL_EDGE", "128"))
+
+GRADE_A_MIN = 80
+GRADE_B_MIN = 60
+GRID = 4  # defect concentration is measured per cell of a GRID x GRID split
+
+# Below this brightness spread (0-1) the frame is a flat colour field, not a photo of produce
+MIN_TEXTURE = 0.03
+# Foreground share of saturated blue/cyan above which the frame is not produce
+MAX_BLUE_FRACTION = 0.5
+
+# Colour cannot tell shelf life; these are per-grade defaults on the scale
+# of the ingestion fallback, not crop-specific estimates
+SHELF_LIFE_DAYS = {"A": 6, "B": 4, "C": 2}
+
+
+def extract_features(image_path) -> dict:
+    """Colour and defect-region statistics of a downscaled copy of the image."""
+    with Image.open(image_path) as image:
+        image.draft("RGB", (FRESHNESS_LOCAL_EDGE, FRESHNESS_LOCAL_EDGE))
+        image = image.convert("RGB")
+        image.thumbnail((FRESHNESS_LOCAL_EDGE, FRESHNESS_LOCAL_EDGE), Image.BILINEAR)
+        hsv = np.asarray(image.convert("HSV"), dtype=np.int16)
+
+    h, s, v = hsv[..., 0], hsv[..., 1], hsv[..., 2]  # all 0-255
+
+    # Plain light background (paper, tray, sky) is not produce
+    foreground = ~((s < 30) & (v > 200))
+    dark = foreground & (v < 60)
+    brown = foreground & (h >= 10) & (h <= 35) & (s >= 60) & (s <= 200) & (v >= 40) & (v <= 150)
+    blue = foreground & (h >= 120) & (h <= 185) & (s >= 60)
+    defect = dark | brown
+
+    fg_count = max(int(foreground.sum()), 1)
+    rows = np.array_split(np.arange(defect.shape[0]), GRID)
+    cols = np.array_split(np.arange(defect.shape[1]), GRID)
+    cell_defect = [
+        defect[np.ix_(r, c)].sum() / max(foreground[np.ix_(r, c)].sum(), 1)
+        for r in rows for c in cols
+    ]
+
+    return {
+        "foreground_fraction": float(foreground.mean()),
+        "dark_fraction": float(dark.sum() / fg_count),
+        "brown_fraction": float(brown.sum() / fg_count),
+        "defect_fraction": float(defect.sum() / fg_count),
+        "max_cell_defect": float(max(cell_defect)),
+        "saturation": float(s[foreground].mean() / 255) if foreground.any() else 0.0,
+        "brightness": float(v[foreground].mean() / 255) if foreground.any() else 0.0,
+        "texture": float(v[foreground].std() / 255) if foreground.any() else 0.0,
+        "blue_fraction": float(blue.sum() / fg_count),
+    }
+
+
+def _grade(score: float) -> str:
+    if score >= GRADE_A_MIN:
+        return "A"
+    if score >= GRADE_B_MIN:
+        return "B"
+    return "C"
+
+
+def estimate(features: dict) -> dict:
+    """
+    Freshness result in the same shape as the LLM's, plus `confidence`
+    (0-1). Confidence is low near grade boundaries, when little of the
+    frame is produce, and for badly exposed photos. It is zero for frames
+    that do not look like produce at all (flat colour, mostly blue), so
+    those always go to the LLM.
+    """
+    score = (
+        100
+        - 150 * features["defect_fraction"]
+        - 40 * max(0.0, features["max_cell_defect"] - 0.25)
+        - 60 * max(0.0, 0.30 - features["saturation"])
+    )
+    score = float(np.clip(score, 0, 100))
+
+    margin = min(abs(score - GRADE_A_MIN), abs(score - GRADE_B_MIN))
+    coverage = min(1.0, features["foreground_fraction"] / 0.4)
+    exposure = 1.0 if 0.15 <= features["brightness"] <= 0.9 else 0.5
+    produce_like = features["texture"] >= MIN_TEXTURE and features["blue_fraction"] <= MAX_BLUE_FRACTION
+    confidence = min(1.0, margin / 15) * coverage * exposure if produce_like else 0.0
+
+    defects = []
+    if features["dark_fraction"] > 0.05:
+        defects.append("dark spots")
+    if features["brown_fraction"] > 0.08:
+        defects.append("browning")
+    if features["max_cell_defect"] > 0.3:
+        defects.append("concentrated decay")
+    if features["saturation"] < 0.2:
+        defects.append("dull colour")
+
+    grade = _grade(score)
+    return {
+        "freshness_score": round(score),
+        "quality_grade": grade,
+        "estimated_shelf_life_days": SHELF_LIFE_DAYS[grade],
+        "visual_defects": defects,
+        "confidence": round(confidence, 3),
+    }
+
+
+def estimate_file(image_path) -> dict:
+    """extract_features + estimate; runs in the image pool."""
+    return estimate(extract_features(image_path))
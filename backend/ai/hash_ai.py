@@ -1,8 +1,30 @@
 import numpy as np
 import hashlib
+from PIL import Image
 
 def vector_to_hash(vector: np.ndarray, precision=2) -> str:
     quantized = np.round(vector, precision)
     byte_data = quantized.tobytes()
     return hashlib.sha256(byte_data).hexdigest()
 
+def dhash(image_path, hash_size=8) -> int:
+    """
+    64-bit difference hash. Survives re-encoding, resizing and mild edits,
+    unlike a SHA-256 of the file bytes.
+    """
+    with Image.open(image_path) as image:
+        # JPEG can decode at reduced scale straight from the DCT
+        image.draft("L", (hash_size * 8, hash_size * 8))
+        pixels = np.asarray(
+            image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS),
+            dtype=np.int16,
+        )
+
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
@@ -0,0 +1,189 @@
+import asyncio
+import os
+import random
+import threading
+import time
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+POOL_SIZE = int(os.getenv("OPENROUTER_POOL_SIZE", "8"))
+MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "2"))
+CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "20"))
+
+BREAKER_FAILURES = int(os.getenv("OPENROUTER_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("OPENROUTER_BREAKER_RESET_SECONDS", "30"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Errors raised before the request reached the provider, so a retry cannot
+# run (or bill) it twice. Read timeouts and dropped responses are not retried.
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class CircuitOpenError(requests.RequestException):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_seconds`. After that one trial call is let through: success
+    closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=MAX_RETRIES,
+        read=False,  # re-raise read timeouts as-is
+        other=0,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(["POST"]),
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+session = _build_session()
+breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    """
+    POST through the shared keep-alive pool. Retries connection failures
+    and 429/5xx with jittered backoff, never a request that may have been
+    received, and fails fast with CircuitOpenError while the provider is down.
+    """
+    if not breaker.allow():
+        raise CircuitOpenError("OpenRouter circuit is open")
+
+    kwargs.setdefault("timeout", (CONNECT_TIMEOUT, READ_TIMEOUT))
+    try:
+        response = session.post(url, **kwargs)
+    except requests.RequestException:
+        breaker.record_failure()
+        raise
+
+    if response.status_code in RETRY_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+_async_client = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=POOL_SIZE,
+                max_keepalive_connections=POOL_SIZE,
+            ),
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+        )
+    return _async_client
+
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def _retry_delay(attempt: int, response: httpx.Response = None) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), READ_TIMEOUT)
+    return 0.5 * (2 ** attempt) + random.uniform(0, 0.5)
+
+
+async def async_post(url: str, **kwargs) -> httpx.Response:
+    """
+    Async twin of post(): same retry policy, shares the circuit breaker.
+    """
+    if not breaker.allow():
+        raise CircuitOpenError("OpenRouter circuit is open")
+
+    client = _get_async_client()
+    attempt = 0
+    while True:
+        try:
+            response = await client.post(url, **kwargs)
+        except httpx.TransportError as e:
+            if not isinstance(e, RETRY_ERRORS) or attempt >= MAX_RETRIES:
+                breaker.record_failure()
+                raise
+            await asyncio.sleep(_retry_delay(attempt))
+            attempt += 1
+            continue
+
+        if response.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            await asyncio.sleep(_retry_delay(attempt, response))
+            attempt += 1
+            continue
+        break
+
+    if response.status_code in RETRY_STATUSES:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
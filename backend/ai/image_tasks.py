@@ -0,0 +1,82 @@
+"""
+CPU-bound image work that runs in the process pool (utils/process_pool.py).
+
+Every task takes a file path and returns small results, so large inputs
+are never pickled between processes. Keep imports light: torch is never
+loaded in the pool workers.
+"""
+import io
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from ai.fraud_detection import read_image_metadata
+from ai.hash_ai import dhash
+
+EMBED_INPUT_SIZE = 224
+EMBED_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(3, 1, 1)
+EMBED_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(3, 1, 1)
+
+
+def inspect_image(image_path):
+    """(ImageMetadata, 64-bit dHash) for one image."""
+    return read_image_metadata(image_path), dhash(image_path)
+
+
+def reencode(image_bytes: bytes, max_edge: int, format: str, quality: int):
+    """
+    Shrinks the image to `max_edge` on its longest side, drops all
+    metadata and re-encodes it. Returns (bytes, mime_type).
+    Undecodable input is returned as-is.
+    """
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            source_mime = Image.MIME.get(image.format, "image/png")
+            # JPEG can decode at reduced scale straight from the DCT
+            image.draft("RGB", (max_edge, max_edge))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+            out = io.BytesIO()
+            image.save(out, format=format, quality=quality)
+    except Exception:
+        return image_bytes, "image/png"
+
+    encoded = out.getvalue()
+    if len(encoded) >= len(image_bytes):
+        # Already small; keep the original but label it correctly
+        return image_bytes, source_mime
+
+    return encoded, Image.MIME[format]
+
+
+def prepare_file(image_path, max_edge: int, format: str, quality: int):
+    """reencode() for a file on disk. Returns (bytes, mime_type, original_size)."""
+    with open(image_path, "rb") as f:
+        image_bytes = f.read()
+    upload_bytes, mime_type = reencode(image_bytes, max_edge, format, quality)
+    return upload_bytes, mime_type, len(image_bytes)
+
+
+def embedding_input(image_path) -> np.ndarray:
+    """
+    MobileNetV2 input for one image as a (3, 224, 224) float32 array.
+    Same as torchvision Resize((224, 224)) + ToTensor + Normalize.
+    """
+    with Image.open(image_path) as image:
+        # JPEG can decode at reduced scale; still >= 224 on both sides
+        image.draft("RGB", (EMBED_INPUT_SIZE, EMBED_INPUT_SIZE))
+        image = image.convert("RGB").resize((EMBED_INPUT_SIZE, EMBED_INPUT_SIZE), Image.BILINEAR)
+        pixels = np.asarray(image, dtype=np.float32).transpose(2, 0, 1) / 255.0
+    return (pixels - EMBED_MEAN) / EMBED_STD
+
+
+def embedding_input_into(buffer_path: str, shape, index: int, image_path):
+    """
+    Writes embedding_input() into row `index` of a float32 memmap shared
+    with the caller, instead of sending ~600 KB back through a pipe.
+    """
+    buffer = np.memmap(buffer_path, dtype=np.float32, mode="r+", shape=tuple(shape))
+    buffer[index] = embedding_input(image_path)
+    buffer.flush()
+    del buffer
@@ -0,0 +1,80 @@
+import threading
+
+from ai.hash_ai import hamming
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over 64-bit perceptual hashes.
+    Radius queries only visit children whose edge distance is within
+    [d - radius, d + radius] of the current node.
+    """
+
+    def __init__(self):
+        self.root = None  # [hash, payloads, {distance: child}]
+        self.size = 0
+
+    def add(self, value: int, payload):
+        if self.root is None:
+            self.root = [value, [payload], {}]
+            self.size += 1
+            return
+
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(payload)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [value, [payload], {}]
+                self.size += 1
+                return
+            node = child
+
+    def query(self, value: int, radius: int):
+        if self.root is None:
+            return []
+
+        matches = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            d = hamming(value, node[0])
+            if d <= radius:
+                matches.extend((payload, d) for payload in node[1])
+            for edge, child in node[2].items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return matches
+
+
+class PHashIndex:
+    """Thread-safe BK-tree shared by request handlers and workers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+
+    def rebuild(self, rows):
+        """rows: iterable of (phash_hex, batch_id)"""
+        tree = BKTree()
+        for phash_hex, batch_id in rows:
+            tree.add(int(phash_hex, 16), batch_id)
+        with self._lock:
+            self._tree = tree
+
+    def add(self, value: int, batch_id: str):
+        with self._lock:
+            self._tree.add(value, batch_id)
+
+    def query(self, value: int, radius: int):
+        with self._lock:
+            return self._tree.query(value, radius)
+
+    def __len__(self):
+        return self._tree.size
+
+
+phash_index = PHashIndex()
@@ -0,0 +1,197 @@
+import os
+import threading
+
+import numpy as np
+
+VECTOR_ANN_THRESHOLD = int(os.getenv("VECTOR_ANN_THRESHOLD", "20000"))
+VECTOR_NPROBE = int(os.getenv("VECTOR_NPROBE", "8"))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    idx = np.argpartition(-scores, k)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def _dot(vectors: np.ndarray, query: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """vectors @ query in float32, upcasting float16 rows a chunk at a time."""
+    out = np.empty(len(vectors), dtype=np.float32)
+    for i in range(0, len(vectors), chunk):
+        out[i:i + chunk] = vectors[i:i + chunk].astype(np.float32) @ query
+    return out
+
+
+def _assign(data: np.ndarray, centroids: np.ndarray, chunk: int = 16384) -> np.ndarray:
+    """Nearest centroid per row, in chunks to bound the score matrix."""
+    return np.concatenate([
+        np.argmax(data[i:i + chunk].astype(np.float32) @ centroids.T, axis=1)
+        for i in range(0, len(data), chunk)
+    ])
+
+
+def kmeans(data: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on unit vectors; returns unit-norm centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _assign(data, centroids)
+        for c in range(n_clusters):
+            members = data[assign == c]
+            if len(members):
+                centroids[c] = members.sum(axis=0)
+            else:
+                centroids[c] = data[rng.integers(len(data))]
+        centroids = _normalize(centroids)
+    return centroids
+
+
+class VectorIndex:
+    """
+    Cosine top-k search over image embeddings, stored as float16.
+
+    Below `ann_threshold` vectors every query is an exact matrix product.
+    Above it an IVF index is trained (k-means into ~sqrt(N) lists) and
+    queries only scan the `nprobe` lists nearest to the query. Vectors
+    added after training go straight into their nearest list; the lists
+    are retrained once the index has doubled in size.
+
+    Rows whose payload is None (deleted, or written by another process)
+    are never returned.
+    """
+
+    def __init__(self, dim: int, ann_threshold: int = 20000, nprobe: int = 8, train_sample: int = 50000):
+        self.dim = dim
+        self.ann_threshold = ann_threshold
+        self.nprobe = nprobe
+        self.train_sample = train_sample
+
+        self._lock = threading.Lock()
+        self._vectors = np.empty((0, dim), dtype=np.float16)
+        self._size = 0
+        self._payloads = []
+        self._live = np.zeros(0, dtype=bool)
+
+        self._centroids = None
+        self._lists = None
+        self._trained_at = 0
+
+    def __len__(self):
+        return self._size
+
+    def rebuild(self, payloads, vectors: np.ndarray, normalized: bool = False):
+        """
+        Replaces the contents. Unit-norm float16 `vectors` (such as an
+        EmbeddingStore view) are used as-is, without a copy. payloads[i]
+        labels row i; rows past the payloads, or labelled None, are dead.
+        """
+        if not (normalized and vectors.dtype == np.float16):
+            vectors = _normalize(vectors).reshape(-1, self.dim).astype(np.float16)
+        payloads = list(payloads)
+        if len(payloads) > len(vectors):
+            raise ValueError(f"{len(payloads)} payloads for {len(vectors)} vectors")
+        payloads.extend([None] * (len(vectors) - len(payloads)))
+
+        with self._lock:
+            self._vectors = vectors
+            self._size = len(vectors)
+            self._payloads = payloads
+            self._live = np.fromiter((p is not None for p in payloads), dtype=bool, count=len(payloads))
+            self._centroids = None
+            self._lists = None
+            self._maybe_train()
+
+    def add(self, payload, vector: np.ndarray, row: int = None, vectors: np.ndarray = None):
+        """
+        Adds one vector. A caller that keeps the rows itself (EmbeddingStore)
+        passes the vector's `row` and a fresh `vectors` view containing it.
+        A view shorter than the index (taken by a concurrent worker before
+        another worker's append) is ignored.
+        """
+        vector = _normalize(vector).reshape(self.dim)
+        with self._lock:
+            if vectors is not None:
+                if row >= len(vectors):
+                    raise ValueError(f"Row {row} is not in the {len(vectors)}-row view")
+                if len(vectors) >= self._size:
+                    self._vectors = vectors
+            else:
+                row = self._size
+                if self._size == len(self._vectors) or not self._vectors.flags.writeable:
+                    grown = np.empty((max(1024, 2 * self._size), self.dim), dtype=np.float16)
+                    grown[:self._size] = self._vectors[:self._size]
+                    self._vectors = grown
+                self._vectors[row] = vector
+
+            # Rows skipped over (e.g. written by another process) stay dead
+            if row >= len(self._payloads):
+                self._payloads.extend([None] * (row + 1 - len(self._payloads)))
+            self._payloads[row] = payload
+            if row >= len(self._live):
+                live = np.zeros(max(1024, 2 * (row + 1)), dtype=bool)
+                live[:len(self._live)] = self._live
+                self._live = live
+            self._live[row] = True
+            self._size = max(self._size, row + 1)
+
+            if self._centroids is not None:
+                nearest = int(np.argmax(self._centroids @ vector))
+                self._lists[nearest] = np.append(self._lists[nearest], row)
+            self._maybe_train()
+
+    def search(self, vector: np.ndarray, k: int = 5):
+        """Returns [(payload, cosine_similarity), ...], best first."""
+        query = _normalize(vector).reshape(self.dim)
+        with self._lock:
+            if self._size == 0:
+                return []
+
+            if self._centroids is None:
+                candidates = None
+                scores = _dot(self._vectors[:self._size], query)
+                scores[~self._live[:self._size]] = -np.inf
+            else:
+                probe = _top_k(self._centroids @ query, self.nprobe)
+                candidates = np.concatenate([self._lists[c] for c in probe])
+                # Sorted rows read the memory map sequentially
+                candidates = np.sort(candidates[self._live[candidates]])
+                scores = _dot(self._vectors[candidates], query)
+
+            best = _top_k(scores, k)
+            rows = best if candidates is None else candidates[best]
+            return [
+                (self._payloads[r], float(scores[b]))
+                for r, b in zip(rows, best)
+                if scores[b] > -np.inf
+            ]
+
+    def _maybe_train(self):
+        if self._size < self.ann_threshold:
+            return
+        if self._centroids is not None and self._size < 2 * self._trained_at:
+            return
+
+        data = self._vectors[:self._size]
+        n_lists = int(np.sqrt(self._size))
+        rng = np.random.default_rng(0)
+        picked = np.sort(rng.choice(self._size, min(self._size, self.train_sample), replace=False))
+        sample = _normalize(data[picked])
+
+        centroids = kmeans(sample, n_lists)
+        assign = _assign(data, centroids)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(n_lists + 1))
+
+        self._centroids = centroids
+        self._lists = [order[bounds[c]:bounds[c + 1]] for c in range(n_lists)]
+        self._trained_at = self._size
+
+
+# MobileNetV2 embeddings of every batch image; payload is (batch_id, image_id)
+embedding_index = VectorIndex(1280, ann_threshold=VECTOR_ANN_THRESHOLD, nprobe=VECTOR_NPROBE)
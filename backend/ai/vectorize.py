@@ -1,31 +1,154 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+
 import torch
-import torchvision.models as models
-import torchvision.transforms as transforms
-import numpy as np
-from PIL import Image
 import numpy as np
-import hashlib
-
-model = models.mobilenet_v2(pretrained=True)
-model.classifier = torch.nn.Identity()
-model.eval()
-
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225]
+
+from ai.embedding_backends import load_backend, export_all
+from ai.image_tasks import EMBED_INPUT_SIZE, embedding_input_into
+from utils.process_pool import image_pool
+
+# torch | torch-int8 | onnx | onnx-int8. Weights are local only, never
+# downloaded at runtime; create them once with
+# `python -m ai.vectorize --export-weights`.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch")
+
+EMBEDDING_DIM = 1280
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+TORCH_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0"))  # 0 = torch default
+
+logger = logging.getLogger(__name__)
+
+# Shared with the image pool workers; RAM-backed where available
+SHARED_BUFFER_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+_backend = None
+_model_lock = threading.Lock()
+model_stats = {}
+
+
+def _rss_mb():
+    """Resident memory of this process in MB, or None where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return None
+
+
+def _round_mb(value):
+    return None if value is None else round(value, 1)
+
+
+def _rss_delta_mb(before):
+    after = _rss_mb()
+    return None if before is None or after is None else after - before
+
+
+def get_backend():
+    """
+    Returns the process-wide embedding backend, loading it on first use.
+    Safe to call from many threads; only one of them loads.
+    """
+    global _backend
+    if _backend is None:
+        with _model_lock:
+            if _backend is None:
+                started = time.perf_counter()
+                rss_before = _rss_mb()
+                _backend = load_backend(EMBEDDING_BACKEND, TORCH_NUM_THREADS)
+                model_stats.update(
+                    backend=_backend.name,
+                    load_seconds=round(time.perf_counter() - started, 3),
+                    rss_delta_mb=_round_mb(_rss_delta_mb(rss_before)),
+                )
+                logger.info("MobileNetV2 loaded: %s", model_stats)
+    return _backend
+
+
+def is_loaded() -> bool:
+    return _backend is not None
+
+
+def warm_up() -> dict:
+    """
+    Loads the model and runs one dummy forward pass, so the first real
+    fraud check does not pay for lazy init. Call at application startup.
+    """
+    backend = get_backend()
+    started = time.perf_counter()
+    backend.embed(torch.zeros(1, 3, EMBED_INPUT_SIZE, EMBED_INPUT_SIZE))
+    model_stats.update(
+        warmup_seconds=round(time.perf_counter() - started, 3),
+        rss_mb=_round_mb(_rss_mb()),
     )
-])
+    return dict(model_stats)
 
-def image_to_vector(image_path) -> np.ndarray:
-    image = Image.open(image_path).convert("RGB")
-    tensor = transform(image).unsqueeze(0)
 
-    with torch.no_grad():
-        features = model(tensor)
+def images_to_vectors(image_paths, batch_size: int = EMBED_BATCH_SIZE, backend=None) -> np.ndarray:
+    """
+    Embeds many images at once. Returns an (N, 1280) float32 array in input order.
+
+    Decoding and preprocessing run in the image process pool, one batch
+    ahead of inference. Workers write straight into two memory-mapped
+    batch buffers that are reused for the whole call.
+    `backend` overrides the configured one (used by the benchmark).
+    """
+    image_paths = list(image_paths)
+    vectors = np.empty((len(image_paths), EMBEDDING_DIM), dtype=np.float32)
+    if not image_paths:
+        return vectors
+
+    backend = backend or get_backend()
+    chunks = [image_paths[i:i + batch_size] for i in range(0, len(image_paths), batch_size)]
+    shape = (min(batch_size, len(image_paths)), 3, EMBED_INPUT_SIZE, EMBED_INPUT_SIZE)
+
+    buffers = []
+    try:
+        for _ in range(min(2, len(chunks))):
+            fd, path = tempfile.mkstemp(dir=SHARED_BUFFER_DIR, suffix=".embed")
+            os.close(fd)
+            buffers.append((path, np.memmap(path, dtype=np.float32, mode="w+", shape=shape)))
+
+        def fill(i):
+            path = buffers[i % len(buffers)][0]
+            return [
+                image_pool.submit(embedding_input_into, path, shape, j, str(p))
+                for j, p in enumerate(chunks[i])
+            ]
+
+        pending = fill(0)
+        offset = 0
+        for i in range(len(chunks)):
+            for f in pending:
+                f.result()
+            if i + 1 < len(chunks):
+                pending = fill(i + 1)
+
+            # Buffer i % 2 is not refilled until this batch is embedded
+            n = len(chunks[i])
+            batch = torch.from_numpy(np.asarray(buffers[i % len(buffers)][1][:n]))
+            vectors[offset:offset + n] = backend.embed(batch)
+            offset += n
+    finally:
+        for path, _ in buffers:
+            os.remove(path)
+
+    return vectors
+
+
+def image_to_vector(image_path) -> np.ndarray:
+    return images_to_vectors([image_path])[0]
 
-    return features.squeeze().numpy() 
 
+if __name__ == "__main__":
+    import sys
 
+    if "--export-weights" in sys.argv:
+        for path in export_all():
+            print("Saved", path)
+    else:
+        print(warm_up())
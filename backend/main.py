@@ -3,14 +3,57 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
+import logging
 import os
 
-from database import engine, Base
+from database import engine
 from routes import auth, farmers, batches, regulator, processor, consumer, surplus, ai
+from utils.ingestion import start_ingestion_workers, stop_ingestion_workers
+from utils.rescan import start_rescan_workers, stop_rescan_workers
+from utils.process_pool import image_pool
+from utils import harvest_totals, daily_rollups, rollups, migrations
+from ai import http_client, crop_rules
 
-Base.metadata.create_all(bind=engine)
+migrations.upgrade(engine)
 load_dotenv(dotenv_path=".env", override=True)
-app = FastAPI(title="TraceRoots API")
+logger = logging.getLogger("traceroots")
+
+
+def warm_up_embedding_model():
+    """Load MobileNetV2 now so the first image-similarity check is not slow."""
+    if os.getenv("WARM_UP_EMBEDDING_MODEL", "1") != "1":
+        return
+    try:
+        from ai.vectorize import warm_up
+    except ImportError:
+        logger.warning("torch not installed; image embeddings disabled")
+        return
+    try:
+        logger.info("Embedding model ready: %s", warm_up())
+    except RuntimeError as e:
+        logger.warning("Embedding model not loaded: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    crop_rules.seed_defaults()
+    # Keep the summary tables in step with batch writes from here on
+    rollups.register(harvest_totals.rollup, daily_rollups.rollup)
+    harvest_totals.rollup.ensure_built()
+    daily_rollups.rollup.ensure_built()
+    warm_up_embedding_model()
+    # Background batch verification
+    start_ingestion_workers()
+    start_rescan_workers()
+    yield
+    stop_rescan_workers()
+    stop_ingestion_workers()
+    image_pool.shutdown()
+    await http_client.aclose()
+
+
+app = FastAPI(title="TraceRoots API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +61,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-AI-Queue-Wait-Ms"],
 )
 
 # Create directories
@@ -1,5 +1,5 @@
 # backend/models.py
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Enum
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, Float, DateTime, Text, Enum, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import datetime
@@ -25,6 +25,13 @@ class UserRole(str, enum.Enum):
     CONSUMER = "CONSUMER"
     NGO = "NGO"
 
+class JobStatus(str, enum.Enum):
+    QUEUED = "QUEUED"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
+
 class NotificationType(str, enum.Enum):
     ALERT = "ALERT"     
     INFO = "INFO"       
@@ -60,6 +67,67 @@ class GlobalSettings(Base):
     key = Column(String, unique=True) 
     value = Column(String)           
 
+class CropRule(Base):
+    """Regulator-managed fraud rule for one crop (key is lower-case)."""
+    __tablename__ = "crop_rules"
+    id = Column(Integer, primary_key=True)
+    crop = Column(String, unique=True, index=True)
+    max_yield_per_acre = Column(Float, nullable=True)  # kg; None = no yield rule
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    regions = relationship("CropRegion", back_populates="rule", cascade="all, delete-orphan")
+
+class CropRegion(Base):
+    """A region where a crop may legitimately be grown."""
+    __tablename__ = "crop_regions"
+    id = Column(Integer, primary_key=True)
+    crop_rule_id = Column(Integer, ForeignKey("crop_rules.id"), index=True)
+    region = Column(String)
+
+    rule = relationship("CropRule", back_populates="regions")
+
+class FarmerHarvestTotal(Base):
+    """
+    Rollup of Batch.quantity per farmer, lifetime (period "all") and per
+    harvest month ("YYYY-MM"). Maintained by utils/harvest_totals.py.
+    """
+    __tablename__ = "farmer_harvest_totals"
+    id = Column(Integer, primary_key=True)
+    farmer_id = Column(Integer, ForeignKey("users.id"))
+    period = Column(String)
+    total_kg = Column(Float, default=0.0)
+    batch_count = Column(Integer, default=0)
+
+    farmer = relationship("User")
+
+    __table_args__ = (
+        Index("ux_harvest_totals_farmer_period", "farmer_id", "period", unique=True),
+        # Alerts: everyone above the limit in one period
+        Index("ix_harvest_totals_period_total", "period", "total_kg"),
+    )
+
+class DailyBatchRollup(Base):
+    """
+    Per-day aggregates of batches by harvest day ("YYYY-MM-DD"), crop,
+    region and status, for the dashboards. Maintained by
+    utils/daily_rollups.py. Missing crop/region are stored as "".
+    """
+    __tablename__ = "daily_batch_rollups"
+    id = Column(Integer, primary_key=True)
+    day = Column(String)
+    crop_name = Column(String)
+    region = Column(String)
+    status = Column(String)
+    batch_count = Column(Integer, default=0)
+    total_kg = Column(Float, default=0.0)
+    freshness_sum = Column(Float, default=0.0)
+    freshness_count = Column(Integer, default=0)  # batches with a freshness_score
+    flagged_count = Column(Integer, default=0)
+
+    __table_args__ = (
+        Index("ux_daily_rollups_key", "day", "crop_name", "region", "status", unique=True),
+    )
+
 class Notification(Base):
     __tablename__ = "notifications"
     id = Column(Integer, primary_key=True)
@@ -75,6 +143,13 @@ class Notification(Base):
 
 class Batch(Base):
     __tablename__ = "batches"
+    __table_args__ = (
+        # Keyset pagination on (harvest_date, id), globally and per farmer
+        Index("ix_batches_harvest_date_id", "harvest_date", "id"),
+        Index("ix_batches_farmer_harvest_date_id", "farmer_id", "harvest_date", "id"),
+        # Bounding-box queries for the map tiles
+        Index("ix_batches_lat_lng", "latitude", "longitude"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     batch_id = Column(String, unique=True, index=True)
@@ -118,12 +193,53 @@ class BatchImage(Base):
     """Stores multiple angles of the crop"""
     __tablename__ = "batch_images"
     id = Column(Integer, primary_key=True)
-    batch_id = Column(Integer, ForeignKey("batches.id"))
+    batch_id = Column(Integer, ForeignKey("batches.id"), index=True)
     image_url = Column(String)
     description = Column(String, nullable=True) 
+    phash = Column(String, nullable=True)  # 64-bit dHash, hex
+    embedding_row = Column(Integer, nullable=True)  # row in ai/embedding_store.py
     
     batch = relationship("Batch", back_populates="images")
 
+class IngestionJob(Base):
+    """Background fraud + AI verification of a newly created batch"""
+    __tablename__ = "ingestion_jobs"
+    id = Column(String, primary_key=True)
+    batch_id = Column(Integer, ForeignKey("batches.id"), index=True)
+    status = Column(String, default=JobStatus.QUEUED, index=True)
+    attempts = Column(Integer, default=0, server_default="0")  # failed runs so far
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    batch = relationship("Batch")
+
+class RescanJob(Base):
+    """Re-applies fraud and banned-zone rules to existing verified batches"""
+    __tablename__ = "rescan_jobs"
+    id = Column(String, primary_key=True)
+    status = Column(String, default=JobStatus.QUEUED, index=True)
+    trigger = Column(String)
+    banned_regions = Column(String, default="")  # snapshot taken when queued
+    total = Column(Integer, default=0)
+    processed = Column(Integer, default=0)
+    flagged = Column(Integer, default=0)
+    checkpoint_id = Column(Integer, default=0)  # last Batch.id fully handled
+    active_seconds = Column(Float, default=0.0)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    @property
+    def progress(self) -> float:
+        return round(self.processed / self.total, 4) if self.total else 1.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.processed / self.active_seconds, 1) if self.active_seconds else 0.0
+
 class BatchEvent(Base):
     __tablename__ = "batch_events"
     id = Column(Integer, primary_key=True)
@@ -1,52 +1,92 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from pathlib import Path
+import asyncio
+import os
+import sys
+import tempfile
 import time
 
 from database import get_db
 import models
+from utils.ingestion import image_path_from_url
+from utils.process_pool import PoolBusy
+from utils.upload_utils import receive_multipart, UploadTooLarge, MalformedUpload
 
-from ai.freshness_analysis import analyze_freshness
+from ai.freshness_analysis import analyze_freshness_async, fallback_ai_result, tier_stats
+from ai.vector_index import embedding_index
+from ai.embedding_store import embedding_store
 
 router = APIRouter(prefix="/ai", tags=["AI Services"])
 
-# -----------------------------
-# 1️⃣ Analyze by Direct Upload
-# -----------------------------
-@router.post("/analyze")
-async def analyze_crop_quality(file: UploadFile = File(...)):
+# Caps in-flight LLM analyses per worker; extra requests wait their turn
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+AI_QUEUE_TIMEOUT = float(os.getenv("AI_QUEUE_TIMEOUT", "30"))
+QUEUE_WAIT_HEADER = "X-AI-Queue-Wait-Ms"
+
+_ai_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+
+
+async def _run_analysis(image_path, response: Response, sha256: str = None) -> dict:
     """
-    Direct image upload → AI freshness analysis
+    Waits for a free slot (503 after AI_QUEUE_TIMEOUT), runs the analysis
+    and reports the time spent queued in the X-AI-Queue-Wait-Ms header.
     """
-    temp_path = Path("static/uploads") / f"temp_{file.filename}"
-
+    queued_at = time.monotonic()
     try:
-        with temp_path.open("wb") as buffer:
-            buffer.write(await file.read())
+        await asyncio.wait_for(_ai_slots.acquire(), timeout=AI_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="AI service busy, please retry.")
 
-        time.sleep(0.5)  # UX delay (spinner)
+    try:
+        response.headers[QUEUE_WAIT_HEADER] = str(int((time.monotonic() - queued_at) * 1000))
+        result = await analyze_freshness_async(image_path, sha256)
+    except PoolBusy:
+        raise HTTPException(status_code=503, detail="AI service busy, please retry.")
+    finally:
+        _ai_slots.release()
 
-        result = analyze_freshness(temp_path)
+    if "error" in result:
+        # 🔐 Safe fallback (demo-proof)
+        result = fallback_ai_result()
+    return result
 
-        if "error" in result:
-            # 🔐 Safe fallback (demo-proof)
-            result = fallback_ai_result()
 
-        return result
+# -----------------------------
+# 1️⃣ Analyze by Direct Upload
+# -----------------------------
+@router.post("/analyze", openapi_extra={
+    "requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object", "required": ["file"],
+        "properties": {"file": {"type": "string", "format": "binary"}},
+    }}}},
+})
+async def analyze_crop_quality(request: Request, response: Response):
+    """
+    Direct image upload → AI freshness analysis
+    """
+    # Streamed to disk (and hashed on the way) so the image workers read the
+    # file instead of receiving the bytes
+    try:
+        form = await receive_multipart(request, tempfile.gettempdir())
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MalformedUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    try:
+        uploads = form.uploads("file")
+        if not uploads:
+            raise HTTPException(status_code=422, detail="Missing form field: file")
+        return await _run_analysis(uploads[0].temp_path, response, uploads[0].sha256)
     finally:
-        if temp_path.exists():
-            temp_path.unlink()
+        form.discard()
 
 
 # -----------------------------------
 # 2️⃣ Analyze Existing Batch Image
 # -----------------------------------
-@router.post("/analyze-batch/{batch_id}")
-def analyze_batch_image(batch_id: str, db: Session = Depends(get_db)):
-    """
-    Fetches batch image from DB → runs AI freshness
-    """
+def _primary_image_path(db: Session, batch_id: str):
     batch = db.query(models.Batch).filter(
         models.Batch.batch_id == batch_id
     ).first()
@@ -58,17 +98,22 @@ def analyze_batch_image(batch_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="No images found for this batch")
 
     # Assume first image is primary
-    image_path = Path(batch.images[0].image_url)
+    image_path = image_path_from_url(batch.images[0].image_url)
 
     if not image_path.exists():
         raise HTTPException(status_code=404, detail="Image file not found")
 
-    time.sleep(0.5)
+    return image_path
 
-    result = analyze_freshness(image_path)
 
-    if "error" in result:
-        result = fallback_ai_result()
+@router.post("/analyze-batch/{batch_id}")
+async def analyze_batch_image(batch_id: str, response: Response, db: Session = Depends(get_db)):
+    """
+    Fetches batch image from DB → runs AI freshness
+    """
+    image_path = await run_in_threadpool(_primary_image_path, db, batch_id)
+
+    result = await _run_analysis(image_path, response)
 
     return {
         "batch_id": batch_id,
@@ -76,13 +121,65 @@ def analyze_batch_image(batch_id: str, db: Session = Depends(get_db)):
     }
 
 
-# -----------------------------
-# 🔐 Fallback (Demo Safe)
-# -----------------------------
-def fallback_ai_result():
+# -----------------------------------
+# 3️⃣ Visually Similar Batches
+# -----------------------------------
+@router.get("/similar/{batch_id}")
+def find_similar_batches(batch_id: str, k: int = 5, db: Session = Depends(get_db)):
+    """
+    Which existing batches does this batch's photos look like?
+    Top-k cosine search of every image embedding against the whole corpus.
+    """
+    batch = db.query(models.Batch).filter(
+        models.Batch.batch_id == batch_id
+    ).first()
+
+    if not batch:
+        raise HTTPException(status_code=404, detail="Batch not found")
+
+    embedded = [img for img in batch.images if img.embedding_row is not None]
+    if not embedded:
+        raise HTTPException(status_code=404, detail="No embeddings for this batch yet")
+
+    best = {}
+    for img in embedded:
+        vector = embedding_store.get(img.embedding_row)
+        # Over-fetch so the batch's own images don't crowd out other results
+        for (other_batch_id, _), similarity in embedding_index.search(vector, k + len(embedded)):
+            if other_batch_id != batch_id and similarity > best.get(other_batch_id, -1.0):
+                best[other_batch_id] = similarity
+
+    ranked = sorted(best.items(), key=lambda kv: kv[1], reverse=True)[:k]
     return {
-        "freshness_score": 85,
-        "quality_grade": "B",
-        "estimated_shelf_life_days": 4,
-        "visual_defects": []
+        "batch_id": batch_id,
+        "matches": [
+            {"batch_id": other, "similarity": round(sim, 4)} for other, sim in ranked
+        ]
     }
+
+
+# -----------------------------
+# 4️⃣ Embedding Model Status
+# -----------------------------
+@router.get("/model-status")
+def embedding_model_status():
+    """
+    Load time and memory of the MobileNetV2 embedding model in this worker.
+    Never triggers a load itself.
+    """
+    vectorize = sys.modules.get("ai.vectorize")
+    if vectorize is None:
+        return {"loaded": False}
+    return {"loaded": vectorize.is_loaded(), **vectorize.model_stats}
+
+
+# -----------------------------
+# 5️⃣ Freshness Tier Stats
+# -----------------------------
+@router.get("/freshness-stats")
+def freshness_tier_stats():
+    """
+    How often the local estimator was confident enough to skip the LLM,
+    and latency per tier (cache / local / llm) in this worker.
+    """
+    return tier_stats.snapshot()
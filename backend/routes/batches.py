@@ -1,54 +1,136 @@
 # backend/routes/batches.py
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Query, Request, Response
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional
+import asyncio
 import os
 import uuid
 import datetime
-import hashlib
-from pathlib import Path
+import zipfile
 
 from database import get_db
 import models
 import schemas
 from utils.qr_utils import generate_qr
-
-from ai.fraud_detection import (
-    check_crop_location,
-    check_yield,
-    check_exif,
-    extract_exif,
-    check_gps_mismatch,
-    extract_image_gps,
+from utils.ingestion import ingestion_queue, retry_ingestion_job, INGESTION_QUEUE_SIZE
+from utils.upload_utils import (
+    receive_multipart,
+    stage_stream,
+    discard_all,
+    UploadTooLarge,
+    MalformedUpload,
+    MAX_UPLOAD_FILE_BYTES,
 )
-from ai.freshness_analysis import analyze_freshness
-from ai.blockchain import generate_origin_hash, hash_onchain_record
+from utils.bulk_import import parse_manifest, validate_row, ManifestError, BULK_CHUNK_SIZE
 
 router = APIRouter(prefix="/batches", tags=["Batches"])
 
 UPLOAD_DIR = "static/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
 
-@router.get("/all", response_model=List[schemas.Batch])
-def get_all_batches(db: Session = Depends(get_db)):
-    return (
-        db.query(models.Batch)
-        .order_by(models.Batch.harvest_date.desc())
-        .all()
+
+def _encode_cursor(batch: models.Batch) -> str:
+    # An empty date part stands for a NULL harvest_date
+    date_str = batch.harvest_date.isoformat() if batch.harvest_date else ""
+    return f"{date_str}_{batch.id}"
+
+
+def _decode_cursor(cursor: str):
+    try:
+        date_str, id_str = cursor.rsplit("_", 1)
+        return (datetime.datetime.fromisoformat(date_str) if date_str else None), int(id_str)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _paginate(query, cursor: Optional[str], limit: int, response: Response):
+    """
+    Keyset page over (harvest_date DESC, id DESC); NULL dates sort last.
+    Images are loaded with one extra IN query for the whole page.
+    The cursor for the next page goes in the X-Next-Cursor header.
+    """
+    if cursor:
+        cursor_date, cursor_id = _decode_cursor(cursor)
+        if cursor_date is None:
+            query = query.filter(models.Batch.harvest_date.is_(None), models.Batch.id < cursor_id)
+        else:
+            query = query.filter(
+                or_(
+                    models.Batch.harvest_date < cursor_date,
+                    and_(
+                        models.Batch.harvest_date == cursor_date,
+                        models.Batch.id < cursor_id,
+                    ),
+                    models.Batch.harvest_date.is_(None),
+                )
+            )
+
+    # SQLite sorts NULLs last in DESC order, matching the filters above
+    query = query.options(selectinload(models.Batch.images)).order_by(
+        models.Batch.harvest_date.desc(), models.Batch.id.desc()
     )
+    rows = query.limit(limit + 1).all()
 
+    page = rows[:limit]
+    if len(rows) > limit:
+        response.headers[NEXT_CURSOR_HEADER] = _encode_cursor(page[-1])
+    return page
 
-@router.post("/create", response_model=schemas.Batch)
-def create_batch(
-    farmer_id: int = Form(...),
-    crop_name: str = Form(...),
-    quantity: float = Form(...),
-    location: str = Form(...),   # "lat,lng"
-    region: str = Form(None),
-    files: List[UploadFile] = File(...),
+
+@router.get("/all", response_model=List[schemas.BatchSummary])
+def get_all_batches(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
 ):
+    return _paginate(db.query(models.Batch), cursor, limit, response)
+
+
+_CREATE_BATCH_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["farmer_id", "crop_name", "quantity", "location", "files"],
+            "properties": {
+                "farmer_id": {"type": "integer"},
+                "crop_name": {"type": "string"},
+                "quantity": {"type": "number"},
+                "location": {"type": "string", "description": "lat,lng"},
+                "region": {"type": "string"},
+                "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+            },
+        }}},
+    }
+}
+
+
+def _form_value(form, name: str, cast=str, required: bool = True):
+    value = form.fields.get(name)
+    if value is None or value == "":
+        if required:
+            raise HTTPException(status_code=422, detail=f"Missing form field: {name}")
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"Invalid value for {name}")
+
+
+def _register_batch(db: Session, form) -> schemas.BatchCreated:
+    farmer_id = _form_value(form, "farmer_id", int)
+    crop_name = _form_value(form, "crop_name")
+    quantity = _form_value(form, "quantity", float)
+    location = _form_value(form, "location")  # "lat,lng"
+    region = _form_value(form, "region", required=False)
+
     # ---- Parse GPS ----
     lat, lng = 0.0, 0.0
     try:
@@ -58,25 +140,17 @@ def create_batch(
         pass  # allow fallback
 
     # ---- Validate images ----
-    if not files or len(files) < 2:
+    staged = form.uploads("files")
+    if len(staged) < 2:
         raise HTTPException(
             status_code=400,
             detail="Please upload at least 2 photos from different angles.",
         )
-
-    seen_hashes = set()
-    file_payloads = []
-
-    for file in files:
-        content = file.file.read()
-        h = hashlib.sha256(content).hexdigest()
-        if h in seen_hashes:
-            raise HTTPException(
-                status_code=400,
-                detail="Duplicate image detected.",
-            )
-        seen_hashes.add(h)
-        file_payloads.append((file.filename, content))
+    if len({upload.sha256 for upload in staged}) < len(staged):
+        raise HTTPException(
+            status_code=400,
+            detail="Duplicate image detected.",
+        )
 
     # ---- Create Batch (initial) ----
     batch_id = uuid.uuid4().hex[:8]
@@ -95,21 +169,13 @@ def create_batch(
     )
 
     db.add(batch)
-    db.commit()
-    db.refresh(batch)
+    db.flush()
 
-    # ---- Save images ----
-    image_paths: List[Path] = []
-
-    for idx, (filename, content) in enumerate(file_payloads):
-        ext = filename.split(".")[-1]
+    # ---- Move images into place ----
+    for idx, upload in enumerate(staged):
+        ext = upload.filename.split(".")[-1]
         unique_name = f"{uuid.uuid4()}.{ext}"
-        file_path = os.path.join(UPLOAD_DIR, unique_name)
-
-        with open(file_path, "wb") as f:
-            f.write(content)
-
-        image_paths.append(Path(file_path))
+        upload.commit(os.path.join(UPLOAD_DIR, unique_name))
 
         db.add(
             models.BatchImage(
@@ -119,108 +185,232 @@ def create_batch(
             )
         )
 
-    # ---- FRAUD CHECKS ----
-    fraud_reasons = []
-
-    region_safe = region if region else "Unknown"
+    # ---- Queue fraud + AI verification ----
+    job = models.IngestionJob(id=uuid.uuid4().hex, batch_id=batch.id)
+    db.add(job)
+    db.commit()
+    db.refresh(batch)
 
-    f1, r1 = check_crop_location(crop_name, region_safe)
-    f2, r2 = check_yield(crop_name, quantity, 1)  # assume 1 acre
+    ingestion_queue.submit(job.id)
 
-    if f1:
-        fraud_reasons.append(r1)
-    if f2:
-        fraud_reasons.append(r2)
+    return schemas.BatchCreated(
+        **schemas.Batch.model_validate(batch).model_dump(),
+        job_id=job.id,
+    )
 
-    exif = extract_exif(image_paths[0])
-    if not exif:
-        fraud_reasons.append("Missing EXIF metadata")
-    else:
-        f3, r3 = check_exif(image_paths[0])
-        if f3:
-            fraud_reasons.append(r3)
 
-        if "GPSInfo" in exif:
-            img_lat, img_lng = extract_image_gps(exif)
-            f4, r4 = check_gps_mismatch(lat, lng, img_lat, img_lng)
-            if f4:
-                fraud_reasons.append(f"GPS mismatch warning: {r4}")
+@router.post("/create", response_model=schemas.BatchCreated, status_code=202, openapi_extra=_CREATE_BATCH_BODY)
+async def create_batch(request: Request, db: Session = Depends(get_db)):
+    """
+    Persists the batch and its images, then queues fraud + AI verification.
+    Poll /batches/jobs/{job_id} for the outcome; the farmer also gets a
+    notification when the job finishes.
 
-    if fraud_reasons:
-        batch.status = models.BatchStatus.FLAGGED
-        batch.processor_notes = "; ".join(fraud_reasons)
-        batch.is_verified = False
-        batch.expiry_date = None
-        batch.estimated_shelf_life = None
+    The multipart body is parsed here rather than by FastAPI, so photos
+    are written once, straight into static/uploads, and an oversized
+    upload is refused before (Content-Length) or while it is received.
+    """
+    if ingestion_queue.pending() >= INGESTION_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=503,
+            detail="Verification queue is full, please retry shortly.",
+        )
 
-        db.commit()
-        db.refresh(batch)
-        return batch
-
-    # ---- AI FRESHNESS ----
-    ai = analyze_freshness(image_paths[0])
-
-    if "error" in ai:
-        ai = {
-            "freshness_score": 85,
-            "quality_grade": "B",
-            "estimated_shelf_life_days": 4,
-            "visual_defects": [],
-        }
-
-    batch.freshness_score = ai["freshness_score"]
-    batch.quality_grade = ai["quality_grade"]
-    batch.estimated_shelf_life = ai["estimated_shelf_life_days"]
-    batch.visual_defects = ", ".join(ai.get("visual_defects", []))
-
-    batch.expiry_date = (
-        datetime.datetime.utcnow()
-        + datetime.timedelta(days=ai["estimated_shelf_life_days"])
-    )
+    # ---- Stream images to disk, hashing as we go ----
+    try:
+        form = await receive_multipart(request, UPLOAD_DIR)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Upload too large.")
+    except MalformedUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    try:
+        return await asyncio.to_thread(_register_batch, db, form)
+    finally:
+        # Accepted files were already renamed into place; this removes the rest
+        form.discard()
 
-    batch.origin_hash = generate_origin_hash(
-        latitude=lat,
-        longitude=lng,
-        region=region or "Local Farm",
-    )
 
-    onchain_payload = {
-        "batchId": batch.batch_id,
-        "cropType": crop_name,
-        "originHash": batch.origin_hash,
-        "expiryDate": batch.expiry_date.date().isoformat(),
-        "timestamp": datetime.datetime.utcnow().isoformat(),
-    }
+def _stage_archive_images(zf: zipfile.ZipFile, names):
+    staged = []
+    seen_hashes = set()
+    try:
+        for name in names:
+            if zf.getinfo(name).file_size > MAX_UPLOAD_FILE_BYTES:
+                raise UploadTooLarge(f"{name} is too large")
+            with zf.open(name) as member:
+                upload = stage_stream(member, name, UPLOAD_DIR)
+            staged.append(upload)
+            if upload.sha256 in seen_hashes:
+                raise ValueError("Duplicate image detected.")
+            seen_hashes.add(upload.sha256)
+    except BaseException:
+        discard_all(staged)
+        raise
+    return staged
+
+
+def _import_chunk(db: Session, zf: zipfile.ZipFile, chunk):
+    """Inserts one chunk of manifest rows in a single transaction."""
+    results = []
+    placed = []
+    job_ids = []
+
+    for row_no, row in chunk:
+        try:
+            staged = _stage_archive_images(zf, row["images"])
+        except (UploadTooLarge, ValueError, zipfile.BadZipFile) as e:
+            results.append(schemas.BulkRowResult(row=row_no, errors=[str(e)]))
+            continue
+
+        batch = models.Batch(
+            batch_id=uuid.uuid4().hex[:8],
+            farmer_id=row["farmer_id"],
+            crop_name=row["crop_name"],
+            quantity=row["quantity"],
+            harvest_date=datetime.datetime.utcnow(),
+            latitude=row["latitude"],
+            longitude=row["longitude"],
+            region=row["region"] or "Local Farm",
+            status=models.BatchStatus.HARVESTED,
+            is_verified=False,
+        )
+        db.add(batch)
+
+        for idx, upload in enumerate(staged):
+            ext = upload.filename.split(".")[-1]
+            unique_name = f"{uuid.uuid4()}.{ext}"
+            final_path = os.path.join(UPLOAD_DIR, unique_name)
+            upload.commit(final_path)
+            placed.append(final_path)
+            batch.images.append(
+                models.BatchImage(
+                    image_url=f"/static/uploads/{unique_name}",
+                    description=f"Harvest Image {idx + 1}",
+                )
+            )
 
-    # Pre-chain content hash (tx hash later)
-    batch.blockchain_tx_hash = hash_onchain_record(onchain_payload)
+        job = models.IngestionJob(id=uuid.uuid4().hex, batch=batch)
+        db.add(job)
+        job_ids.append(job.id)
+        results.append(
+            schemas.BulkRowResult(row=row_no, batch_id=batch.batch_id, job_id=job.id)
+        )
 
-    batch.status = models.BatchStatus.VERIFIED
-    batch.is_verified = True
+    try:
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        for path in placed:
+            if os.path.exists(path):
+                os.remove(path)
+        return [
+            schemas.BulkRowResult(row=row_no, errors=[f"Database error: {e.__class__.__name__}"])
+            for row_no, _ in chunk
+        ]
+
+    for job_id in job_ids:
+        ingestion_queue.submit(job_id)
+    return results
+
+
+@router.post("/bulk", response_model=schemas.BulkImportReport, status_code=202)
+def bulk_create_batches(
+    manifest: UploadFile = File(...),
+    archive: UploadFile = File(...),
+    db: Session = Depends(get_db),
+):
+    """
+    Registers many batches from a CSV/JSON manifest plus a zip of images.
+    Rows are inserted in chunks of BULK_CHUNK_SIZE, one transaction each,
+    and every accepted batch gets its own verification job.
+    """
+    try:
+        rows = parse_manifest(manifest.filename, manifest.file)
+    except ManifestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    db.add(
-        models.BatchEvent(
-            batch_id=batch.id,
-            event_type="VERIFIED",
-            description="Batch passed fraud checks and AI verification",
-            location=f"{lat},{lng}",
+    if ingestion_queue.pending() + len(rows) > INGESTION_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=503,
+            detail="Verification queue is full, please retry shortly.",
         )
-    )
 
-    db.commit()
-    db.refresh(batch)
-    return batch
+    try:
+        zf = zipfile.ZipFile(archive.file)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Images must be a zip archive.")
+
+    with zf:
+        members = {info.filename for info in zf.infolist() if not info.is_dir()}
+
+        results = []
+        valid = []
+        for row_no, raw in enumerate(rows, start=1):
+            clean, errors = validate_row(raw)
+            if clean:
+                errors = [f"Image not in archive: {p}" for p in clean["images"] if p not in members]
+            if errors:
+                results.append(schemas.BulkRowResult(row=row_no, errors=errors))
+            else:
+                valid.append((row_no, clean))
+
+        farmer_ids = {row["farmer_id"] for _, row in valid}
+        known_farmers = {
+            uid for (uid,) in db.query(models.User.id).filter(models.User.id.in_(farmer_ids))
+        } if farmer_ids else set()
+
+        ready = []
+        for row_no, row in valid:
+            if row["farmer_id"] in known_farmers:
+                ready.append((row_no, row))
+            else:
+                results.append(schemas.BulkRowResult(row=row_no, errors=["Unknown farmer_id"]))
+
+        for start in range(0, len(ready), BULK_CHUNK_SIZE):
+            results.extend(_import_chunk(db, zf, ready[start:start + BULK_CHUNK_SIZE]))
+
+    results.sort(key=lambda r: r.row)
+    accepted = sum(1 for r in results if not r.errors)
+    return schemas.BulkImportReport(
+        total=len(rows),
+        accepted=accepted,
+        rejected=len(rows) - accepted,
+        results=results,
+    )
 
 
-@router.get("/farmer/{farmer_id}", response_model=List[schemas.Batch])
-def get_my_batches(farmer_id: int, db: Session = Depends(get_db)):
-    return (
-        db.query(models.Batch)
-        .filter(models.Batch.farmer_id == farmer_id)
-        .order_by(models.Batch.harvest_date.desc())
-        .all()
-    )
+@router.get("/jobs/{job_id}", response_model=schemas.IngestionJobStatus)
+def get_ingestion_job(job_id: str, db: Session = Depends(get_db)):
+    job = db.get(models.IngestionJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/retry", response_model=schemas.IngestionJobStatus)
+def retry_failed_job(job_id: str, db: Session = Depends(get_db)):
+    """Re-runs verification of a batch whose job ran out of attempts."""
+    job = db.get(models.IngestionJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status != models.JobStatus.FAILED:
+        raise HTTPException(status_code=400, detail=f"Job is {job.status}, not FAILED")
+    retry_ingestion_job(db, job)
+    db.refresh(job)
+    return job
+
+
+@router.get("/farmer/{farmer_id}", response_model=List[schemas.BatchSummary])
+def get_my_batches(
+    farmer_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    query = db.query(models.Batch).filter(models.Batch.farmer_id == farmer_id)
+    return _paginate(query, cursor, limit, response)
 
 
 @router.get("/{batch_id}", response_model=schemas.Batch)
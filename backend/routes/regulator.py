@@ -1,29 +1,21 @@
 # /backend/routes/regulator.py
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Optional
 from fastapi.responses import StreamingResponse
-import csv
-import io
+import datetime
+import numpy as np
 from database import get_db
 import models
 import schemas
+from ai import bulk_screening, crop_rules
+from utils.rescan import start_rescan
+from utils import map_tiles, harvest_totals, daily_rollups, export, settings, versioned_cache
 
 router = APIRouter(prefix="/regulator", tags=["Regulator"])
 
-def _get_setting(db: Session, key: str, default: str = "") -> str:
-    setting = db.query(models.GlobalSettings).filter(models.GlobalSettings.key == key).first()
-    return setting.value if setting else default
-
-def _set_setting(db: Session, key: str, value: str):
-    setting = db.query(models.GlobalSettings).filter(models.GlobalSettings.key == key).first()
-    if setting:
-        setting.value = value
-    else:
-        db.add(models.GlobalSettings(key=key, value=value))
-    db.commit()
-
 # --- SUSTAINABILITY MAP DATA ---
 @router.get("/map-data")
 def get_sustainability_map(db: Session = Depends(get_db)):
@@ -31,13 +23,12 @@ def get_sustainability_map(db: Session = Depends(get_db)):
     Returns all batches with their location and calculated 'Stress Level'.
     If many farmers harvest in the same region, it flags as 'RED' (Over-farming).
     """
-    batches = db.query(models.Batch).all()
+    batches = db.query(models.Batch).options(joinedload(models.Batch.owner)).all()
     map_points = []
     
-    region_counts = {}
-    for b in batches:
-        region = b.region or "Unknown"
-        region_counts[region] = region_counts.get(region, 0) + 1
+    region_counts = dict(
+        db.query(models.Batch.region, func.count(models.Batch.id)).group_by(models.Batch.region).all()
+    )
 
     for batch in batches:
         count = region_counts.get(batch.region, 0)
@@ -56,26 +47,76 @@ def get_sustainability_map(db: Session = Depends(get_db)):
     
     return map_points
 
+@router.get("/map-tiles")
+def get_map_tiles(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(..., ge=0, le=22),
+    db: Session = Depends(get_db),
+):
+    """
+    Pre-clustered map for a bounding box: per-cell batch counts, dominant
+    crop and stress, aggregated in SQL and cached per tile. Individual
+    batches are included only from MAP_POINTS_ZOOM upwards.
+    """
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="Invalid bounding box")
+    try:
+        tiles = map_tiles.tiles_for_bbox(min_lat, min_lng, max_lat, max_lng, zoom)
+    except map_tiles.TooManyTiles as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    version = map_tiles.data_version(db)
+    cells = []
+    for x, y in tiles:
+        cells.extend(
+            c for c in map_tiles.cached_tile(db, zoom, x, y, version)
+            if min_lat <= c["lat"] <= max_lat and min_lng <= c["lng"] <= max_lng
+        )
+
+    return {
+        "zoom": zoom,
+        "cell_size_deg": map_tiles.tile_size(zoom) / map_tiles.CELLS_PER_TILE,
+        "cells": cells,
+        "points": (
+            map_tiles.points_in_bbox(db, min_lat, min_lng, max_lat, max_lng)
+            if zoom >= map_tiles.MAP_POINTS_ZOOM else []
+        ),
+    }
+
 # --- ALERTS & NOTIFICATIONS ---
 @router.get("/alerts")
-def get_recent_alerts(db: Session = Depends(get_db)):
+def get_recent_alerts(period: str = None, db: Session = Depends(get_db)):
     """
     Returns alerts for the Regulator Dashboard.
+    `period` ("YYYY-MM") limits the harvest totals to one month.
     """
-    max_limit = float(_get_setting(db, "MAX_HARVEST_LIMIT", "500"))
-    alerts = []
-
-    farmers = db.query(models.User).filter(models.User.role == "COLLECTOR").all()
-    for farmer in farmers:
-        total_kg = sum([b.quantity for b in farmer.batches])
-        if total_kg > max_limit:
-            alerts.append({
-                "farmer_id": farmer.id,
-                "farmer_name": farmer.full_name or farmer.username,
-                "total_harvested_kg": total_kg,
-                "threshold_kg": max_limit,
-                "severity": "HIGH" if total_kg > (max_limit * 1.5) else "MEDIUM"
-            })
+    max_limit = settings.get_float("MAX_HARVEST_LIMIT")
+
+    # One indexed range scan on the rollup, however many batches exist
+    over_limit = (
+        db.query(models.FarmerHarvestTotal.total_kg, models.User)
+        .join(models.User, models.FarmerHarvestTotal.farmer_id == models.User.id)
+        .filter(
+            models.FarmerHarvestTotal.period == (period or harvest_totals.ALL_TIME),
+            models.FarmerHarvestTotal.total_kg > max_limit,
+            models.User.role == "COLLECTOR",
+        )
+        .order_by(models.FarmerHarvestTotal.total_kg.desc())
+        .all()
+    )
+    alerts = [
+        {
+            "farmer_id": farmer.id,
+            "farmer_name": farmer.full_name or farmer.username,
+            "total_harvested_kg": total_kg,
+            "threshold_kg": max_limit,
+            "severity": "HIGH" if total_kg > (max_limit * 1.5) else "MEDIUM"
+        }
+        for total_kg, farmer in over_limit
+    ]
 
     regulator = db.query(models.User).filter(models.User.role == "REGULATOR").first()
     notifications = []
@@ -97,14 +138,142 @@ def get_recent_alerts(db: Session = Depends(get_db)):
         ]
     }
 
+# --- BULK FRAUD RE-SCREEN (dry run) ---
+@router.get("/screening")
+def screen_all_batches(limit: int = 100, db: Session = Depends(get_db)):
+    """
+    Re-applies the crop-location and yield rules to every batch in one
+    vectorised pass. Read-only: reports what would be flagged today.
+    """
+    cols = bulk_screening.load_batch_columns(db)
+    flags = bulk_screening.screen(cols)
+
+    return {
+        "total_batches": len(cols),
+        "flagged": int(np.count_nonzero(flags)),
+        "by_rule": {
+            "region": int(np.count_nonzero(flags & bulk_screening.FLAG_REGION)),
+            "yield": int(np.count_nonzero(flags & bulk_screening.FLAG_YIELD)),
+        },
+        "samples": bulk_screening.flag_reasons(cols, flags, limit=limit),
+    }
+
+# --- CROP RULES (fraud checks) ---
+def _crop_rule_out(rule: models.CropRule) -> schemas.CropRule:
+    return schemas.CropRule(
+        crop=rule.crop,
+        max_yield_per_acre=rule.max_yield_per_acre,
+        regions=[r.region for r in rule.regions],
+        updated_at=rule.updated_at,
+    )
+
+def _rule_set(db: Session) -> schemas.CropRuleSet:
+    rules = db.query(models.CropRule).order_by(models.CropRule.crop).all()
+    return schemas.CropRuleSet(
+        version=versioned_cache.read_version(db, crop_rules.VERSION_KEY),
+        rules=[_crop_rule_out(r) for r in rules],
+    )
+
+@router.get("/crop-rules", response_model=schemas.CropRuleSet)
+def get_crop_rules(db: Session = Depends(get_db)):
+    return _rule_set(db)
+
+@router.put("/crop-rules/{crop}", response_model=schemas.CropRuleSet)
+def set_crop_rule(crop: str, rule_in: schemas.CropRuleIn, db: Session = Depends(get_db)):
+    """Creates or replaces the rule for one crop and bumps the rules version."""
+    key = crop_rules.normalize_crop(crop)
+    if not key:
+        raise HTTPException(status_code=400, detail="Crop name is required")
+    if rule_in.max_yield_per_acre is not None and rule_in.max_yield_per_acre <= 0:
+        raise HTTPException(status_code=400, detail="max_yield_per_acre must be positive")
+
+    regions = {}
+    for region in rule_in.regions:
+        region = " ".join(region.split())
+        if region:
+            regions.setdefault(crop_rules.normalize_region(region), region)
+
+    rule = db.query(models.CropRule).filter(models.CropRule.crop == key).first()
+    if not rule:
+        rule = models.CropRule(crop=key)
+        db.add(rule)
+    rule.max_yield_per_acre = rule_in.max_yield_per_acre
+    rule.regions = [models.CropRegion(region=r) for r in regions.values()]
+
+    crop_rules.bump_version(db)
+    db.commit()
+    crop_rules.invalidate()
+    start_rescan(db, trigger="crop-rules")
+    return _rule_set(db)
+
+@router.delete("/crop-rules/{crop}", response_model=schemas.CropRuleSet)
+def delete_crop_rule(crop: str, db: Session = Depends(get_db)):
+    rule = db.query(models.CropRule).filter(
+        models.CropRule.crop == crop_rules.normalize_crop(crop)
+    ).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail="Crop rule not found")
+    db.delete(rule)
+
+    crop_rules.bump_version(db)
+    db.commit()
+    crop_rules.invalidate()
+    start_rescan(db, trigger="crop-rules")
+    return _rule_set(db)
+
+@router.post("/harvest-totals/rebuild")
+def rebuild_harvest_totals(db: Session = Depends(get_db)):
+    """Recomputes the per-farmer harvest rollup from the batches table."""
+    harvest_totals.rebuild(db)
+    return {"rows": db.query(models.FarmerHarvestTotal.id).count()}
+
+# --- DASHBOARD TIME SERIES ---
+@router.get("/rollups/daily")
+def get_daily_rollups(
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    bucket: str = Query("day", pattern="^(day|month|year)$"),
+    group_by: List[str] = Query([]),
+    crop: Optional[str] = None,
+    region: Optional[str] = None,
+    status: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Batch count, total kg, average freshness and flagged count per
+    `bucket`, optionally split by crop_name / region / status
+    (repeat `group_by`). Reads the pre-computed daily rollup.
+    """
+    group_by = list(dict.fromkeys(group_by))
+    unknown = set(group_by) - set(daily_rollups.GROUP_COLUMNS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot group by {', '.join(sorted(unknown))}")
+    return {
+        "bucket": bucket,
+        "group_by": group_by,
+        "series": daily_rollups.series(
+            db,
+            date_from=date_from.isoformat() if date_from else None,
+            date_to=date_to.isoformat() if date_to else None,
+            bucket=bucket,
+            group_by=group_by,
+            crop=crop,
+            region=region,
+            status=status,
+        ),
+    }
+
+@router.post("/rollups/daily/rebuild")
+def rebuild_daily_rollups(db: Session = Depends(get_db)):
+    """Recomputes the daily dashboard rollup from the batches table."""
+    daily_rollups.rebuild(db)
+    return {"rows": db.query(models.DailyBatchRollup.id).count()}
+
 @router.get("/thresholds")
-def get_thresholds(db: Session = Depends(get_db)):
-    limit = db.query(models.GlobalSettings).filter(models.GlobalSettings.key == "MAX_HARVEST_LIMIT").first()
-    zones = db.query(models.GlobalSettings).filter(models.GlobalSettings.key == "BANNED_ZONES").first()
-    
+def get_thresholds():
     return {
-        "max_harvest_limit": limit.value if limit else "500",
-        "banned_regions": zones.value if zones else ""
+        "max_harvest_limit": settings.get("MAX_HARVEST_LIMIT"),
+        "banned_regions": settings.get("BANNED_ZONES"),
     }
 
 @router.post("/thresholds")
@@ -113,36 +282,70 @@ def set_thresholds(
     banned_regions: str, 
     db: Session = Depends(get_db)
 ):
-    limit = db.query(models.GlobalSettings).filter(models.GlobalSettings.key == "MAX_HARVEST_LIMIT").first()
-    if not limit:
-        limit = models.GlobalSettings(key="MAX_HARVEST_LIMIT", value=max_harvest_limit)
-        db.add(limit)
-    else:
-        limit.value = max_harvest_limit
-        
-    zones = db.query(models.GlobalSettings).filter(models.GlobalSettings.key == "BANNED_ZONES").first()
-    if not zones:
-        zones = models.GlobalSettings(key="BANNED_ZONES", value=banned_regions)
-        db.add(zones)
-    else:
-        zones.value = banned_regions
-        
-    db.commit()
-    return {"message": "Regulatory thresholds updated successfully"}
+    settings.set_many(db, {
+        "MAX_HARVEST_LIMIT": max_harvest_limit,
+        "BANNED_ZONES": banned_regions,
+    })
+    job = start_rescan(db, trigger="thresholds")
+    return {"message": "Regulatory thresholds updated successfully", "rescan_job_id": job.id}
+
+# --- RETROACTIVE RESCAN ---
+@router.get("/rescan", response_model=List[schemas.RescanJob])
+def list_rescans(limit: int = 20, db: Session = Depends(get_db)):
+    return db.query(models.RescanJob).order_by(models.RescanJob.created_at.desc()).limit(limit).all()
+
+@router.post("/rescan", response_model=schemas.RescanJob, status_code=202)
+def trigger_rescan(db: Session = Depends(get_db)):
+    return start_rescan(db, trigger="manual")
+
+@router.get("/rescan/{job_id}", response_model=schemas.RescanJob)
+def get_rescan(job_id: str, db: Session = Depends(get_db)):
+    job = db.get(models.RescanJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Rescan job not found")
+    return job
 
 @router.get("/export")
-def export_data(db: Session = Depends(get_db)):
-    batches = db.query(models.Batch).all()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(["batch_id", "crop_name", "quantity", "region", "harvest_date", "status"])
-    for b in batches:
-        writer.writerow([b.batch_id, b.crop_name, b.quantity, b.region, b.harvest_date, b.status])
-    output.seek(0)
+def export_data(
+    format: str = Query("csv", pattern="^(csv|arrow|parquet)$"),
+    gzip: bool = False,
+    date_from: Optional[datetime.date] = None,
+    date_to: Optional[datetime.date] = None,
+    region: Optional[str] = None,
+    status: Optional[str] = None,
+    crop: Optional[str] = None,
+):
+    """
+    Streams the batches table, optionally filtered (harvest dates are
+    inclusive). Rows are read and encoded a chunk at a time, so memory
+    stays flat however large the export. `arrow` and `parquet` need pyarrow;
+    `gzip` applies to csv and arrow (parquet is compressed internally).
+    """
+    if format != "csv":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail=f"{format} export needs pyarrow installed on the server")
+    compress = gzip and format != "parquet"
+
+    media_type, extension = export.FORMATS[format]
+    filename = f"traceability_report.{extension}"
+    if compress:
+        media_type, filename = "application/gzip", filename + ".gz"
+
+    body = export.stream_export(
+        format,
+        compress,
+        date_from=date_from,
+        date_to=date_to + datetime.timedelta(days=1) if date_to else None,
+        region=region,
+        status=status,
+        crop=crop,
+    )
     return StreamingResponse(
-        iter([output.getvalue()]),
-        media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=traceability_report.csv"}
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 @router.post("/message")
@@ -2,7 +2,7 @@
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-from models import BatchStatus, UserRole 
+from models import BatchStatus, UserRole, JobStatus
 
 # --- Auth ---
 class UserBase(BaseModel):
@@ -100,3 +100,82 @@ class Batch(BatchBase):
 
     class Config:
         from_attributes = True
+
+class BatchSummary(BatchBase):
+    """Slim list-view row: no timeline, lab report or feedback."""
+    id: int
+    batch_id: str
+    farmer_id: int
+    harvest_date: Optional[datetime] = None
+    expiry_date: Optional[datetime] = None
+    status: BatchStatus
+    qr_code_url: Optional[str] = None
+    quality_grade: Optional[str] = None
+    freshness_score: Optional[float] = None
+    is_verified: bool = False
+
+    images: List[BatchImage] = []
+
+    class Config:
+        from_attributes = True
+
+# --- Ingestion ---
+class IngestionJob(BaseModel):
+    id: str
+    status: JobStatus
+    attempts: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+class IngestionJobStatus(IngestionJob):
+    batch: Batch
+
+class RescanJob(BaseModel):
+    id: str
+    status: JobStatus
+    trigger: Optional[str] = None
+    total: int = 0
+    processed: int = 0
+    flagged: int = 0
+    progress: float
+    rows_per_second: float
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    class Config:
+        from_attributes = True
+
+class BatchCreated(Batch):
+    job_id: str
+
+class BulkRowResult(BaseModel):
+    row: int
+    batch_id: Optional[str] = None
+    job_id: Optional[str] = None
+    errors: List[str] = []
+
+class BulkImportReport(BaseModel):
+    total: int
+    accepted: int
+    rejected: int
+    results: List[BulkRowResult]
+
+# --- Crop rules ---
+class CropRuleIn(BaseModel):
+    max_yield_per_acre: Optional[float] = None
+    regions: List[str] = []
+
+class CropRule(BaseModel):
+    crop: str
+    max_yield_per_acre: Optional[float] = None
+    regions: List[str] = []
+    updated_at: Optional[datetime] = None
+
+class CropRuleSet(BaseModel):
+    version: int
+    rules: List[CropRule]
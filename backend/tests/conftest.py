@@ -0,0 +1,29 @@
+# backend/tests/conftest.py
+import os
+import sys
+import tempfile
+
+# Point the app at a throwaway database and working directory before any
+# backend module is imported; several create files relative to the cwd.
+_workdir = tempfile.mkdtemp(prefix="traceroots-tests-")
+os.chdir(_workdir)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'test.db')}"
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+os.environ.setdefault("IMAGE_POOL_WORKERS", "0")  # image tasks run inline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+import models  # noqa: E402,F401
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,97 @@
+# backend/tests/test_backfill_images.py
+import os
+import uuid
+
+import numpy as np
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine, inspect, text
+
+import models
+from ai import embedding_store
+from ai.embedding_store import EmbeddingStore
+from ai.hash_ai import dhash
+from utils import backfill_images, migrations
+
+UPLOADS = os.path.join("static", "uploads")
+
+
+def test_upgrade_adds_columns_and_indexes_to_existing_tables(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        # batch_images as it was before phash/embedding_row
+        conn.execute(text(
+            "CREATE TABLE batch_images (id INTEGER PRIMARY KEY, batch_id INTEGER, "
+            "image_url VARCHAR, description VARCHAR)"
+        ))
+        conn.execute(text("INSERT INTO batch_images (batch_id, image_url) VALUES (1, '/static/uploads/a.jpg')"))
+        conn.execute(text("CREATE TABLE ingestion_jobs (id VARCHAR PRIMARY KEY, batch_id INTEGER, status VARCHAR)"))
+        conn.execute(text("INSERT INTO ingestion_jobs (id, batch_id, status) VALUES ('j1', 1, 'FAILED')"))
+
+    migrations.upgrade(engine)
+    migrations.upgrade(engine)  # idempotent
+
+    inspector = inspect(engine)
+    assert {"phash", "embedding_row"} <= {c["name"] for c in inspector.get_columns("batch_images")}
+    assert "ix_batch_images_batch_id" in {i["name"] for i in inspector.get_indexes("batch_images")}
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT image_url, phash FROM batch_images")).one() == ("/static/uploads/a.jpg", None)
+        # server_default fills existing rows
+        assert conn.execute(text("SELECT attempts FROM ingestion_jobs")).scalar_one() == 0
+    engine.dispose()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = EmbeddingStore(str(tmp_path / "embeddings"), 1280)
+    monkeypatch.setattr(embedding_store, "embedding_store", store)
+    return store
+
+
+def _image(db, url):
+    batch = models.Batch(batch_id=uuid.uuid4().hex[:8], farmer_id=1, crop_name="Wheat", quantity=10)
+    db.add(batch)
+    db.flush()
+    image = models.BatchImage(batch_id=batch.id, image_url=url)
+    db.add(image)
+    db.commit()
+    return image
+
+
+def _photo(seed):
+    os.makedirs(UPLOADS, exist_ok=True)
+    name = f"{uuid.uuid4().hex}.jpg"
+    pixels = np.random.default_rng(seed).integers(0, 255, (48, 48, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(os.path.join(UPLOADS, name), "JPEG")
+    return f"/static/uploads/{name}"
+
+
+def test_backfill_hashes_and_embeds_stored_images(db, store, monkeypatch):
+    monkeypatch.setattr(backfill_images, "_embed", lambda paths: np.ones((len(paths), 1280)))
+    old = _image(db, _photo(1))
+    done = _image(db, _photo(2))
+    done.phash, done.embedding_row = "00000000000000ff", 7
+    gone = _image(db, "/static/uploads/deleted.jpg")
+    db.commit()
+
+    counts = backfill_images.backfill(db, chunk_size=1)
+
+    assert counts == {"phash": {"hashed": 1, "unreadable": 1}, "embedding": {"embedded": 1, "unreadable": 1}}
+    db.expire_all()
+    assert old.phash == f"{dhash(old.image_url.lstrip('/')):016x}" and old.embedding_row == 0
+    assert (done.phash, done.embedding_row) == ("00000000000000ff", 7)
+    assert (gone.phash, gone.embedding_row) == (None, None)
+    assert len(store) == 1
+    assert backfill_images.backfill(db)["phash"] == {"hashed": 0, "unreadable": 1}
+
+
+def test_backfill_skips_embeddings_without_a_model(db, store, monkeypatch):
+    monkeypatch.setattr(backfill_images, "_embed", lambda paths: None)
+    image = _image(db, _photo(3))
+
+    counts = backfill_images.backfill(db)
+
+    assert counts["embedding"]["skipped"]
+    db.expire_all()
+    assert image.phash and image.embedding_row is None
+    assert len(store) == 0
@@ -0,0 +1,93 @@
+# backend/tests/test_batch_pagination.py
+import datetime
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import models
+from routes import batches
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(batches.router)
+    return TestClient(app)
+
+
+def _add_batches(db):
+    day = datetime.datetime(2024, 5, 1)
+    dates = [day, day, day - datetime.timedelta(days=1), None, day + datetime.timedelta(days=2), None, day]
+    for i, harvest_date in enumerate(dates):
+        db.add(models.Batch(
+            batch_id=f"B{i}",
+            farmer_id=1 if i % 2 else 2,
+            crop_name="Wheat",
+            quantity=10,
+            harvest_date=harvest_date or day,
+            status=models.BatchStatus.HARVESTED,
+        ))
+    db.commit()
+    # The column default would replace None on insert
+    undated = [f"B{i}" for i, d in enumerate(dates) if d is None]
+    db.query(models.Batch).filter(models.Batch.batch_id.in_(undated)).update(
+        {models.Batch.harvest_date: None}, synchronize_session=False,
+    )
+    db.commit()
+    rows = db.query(models.Batch).all()
+    assert sum(b.harvest_date is None for b in rows) == 2
+    # Newest first, ties by id descending, undated batches last
+    return [b.batch_id for b in sorted(
+        rows, key=lambda b: (b.harvest_date is not None, b.harvest_date or day, b.id), reverse=True,
+    )]
+
+
+def _walk(client, path, limit):
+    seen, cursor = [], None
+    while True:
+        params = {"limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get(path, params=params)
+        assert response.status_code == 200
+        page = [b["batch_id"] for b in response.json()]
+        assert len(page) <= limit
+        seen += page
+        cursor = response.headers.get(batches.NEXT_CURSOR_HEADER)
+        if not cursor:
+            return seen
+
+
+def test_without_paging_params_returns_the_first_page(db, client):
+    db.add_all(
+        models.Batch(batch_id=f"B{i}", farmer_id=1, crop_name="Wheat", quantity=10)
+        for i in range(batches.DEFAULT_PAGE_SIZE + 1)
+    )
+    db.commit()
+    response = client.get("/batches/all")
+    assert response.status_code == 200
+    assert len(response.json()) == batches.DEFAULT_PAGE_SIZE
+    assert response.headers[batches.NEXT_CURSOR_HEADER]
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 50])
+def test_cursor_walk_visits_every_batch_once_in_order(db, client, limit):
+    expected = _add_batches(db)
+    assert _walk(client, "/batches/all", limit) == expected
+
+
+def test_cursor_walk_per_farmer(db, client):
+    _add_batches(db)
+    farmer_ids = {b.batch_id for b in db.query(models.Batch).filter(models.Batch.farmer_id == 1)}
+    walked = _walk(client, "/batches/farmer/1", 2)
+    assert set(walked) == farmer_ids and len(walked) == len(farmer_ids)
+
+
+def test_cursor_round_trips_null_harvest_date(db):
+    batch = models.Batch(id=7, harvest_date=None)
+    assert batches._decode_cursor(batches._encode_cursor(batch)) == (None, 7)
+
+
+def test_invalid_cursor_is_rejected(db, client):
+    assert client.get("/batches/all", params={"cursor": "garbage"}).status_code == 400
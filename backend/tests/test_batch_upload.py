@@ -0,0 +1,114 @@
+# backend/tests/test_batch_upload.py
+import asyncio
+import os
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import models
+from routes import batches
+from utils.upload_utils import MultipartReceiver, UploadTooLarge, receive_multipart
+
+FORM = {"farmer_id": "1", "crop_name": "Wheat", "quantity": "12.5", "location": "30.9,75.8", "region": "Punjab"}
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(batches.ingestion_queue, "submit", submitted.append)
+    app = FastAPI()
+    app.include_router(batches.router)
+    client = TestClient(app)
+    client.submitted = submitted
+    return client
+
+
+def _leftovers():
+    return [n for n in os.listdir(batches.UPLOAD_DIR) if n.endswith(".part")]
+
+
+def test_create_batch_writes_photos_into_place(db, client):
+    files = [("files", ("a.jpg", b"front" * 1000, "image/jpeg")), ("files", ("b.jpg", b"side" * 1000, "image/jpeg"))]
+    response = client.post("/batches/create", data=FORM, files=files)
+
+    assert response.status_code == 202, response.text
+    body = response.json()
+    assert client.submitted == [body["job_id"]]
+    batch = db.query(models.Batch).filter(models.Batch.batch_id == body["batch_id"]).one()
+    assert (batch.crop_name, batch.quantity, batch.latitude) == ("Wheat", 12.5, 30.9)
+
+    contents = sorted(open(img.image_url.lstrip("/"), "rb").read() for img in batch.images)
+    assert contents == sorted([b"front" * 1000, b"side" * 1000])
+    assert _leftovers() == []
+
+
+def test_duplicate_photos_are_rejected_and_removed(db, client):
+    before = set(os.listdir(batches.UPLOAD_DIR))
+    files = [("files", ("a.jpg", b"same", "image/jpeg")), ("files", ("b.jpg", b"same", "image/jpeg"))]
+    response = client.post("/batches/create", data=FORM, files=files)
+
+    assert response.status_code == 400
+    assert set(os.listdir(batches.UPLOAD_DIR)) == before
+    assert db.query(models.Batch).count() == 0
+
+
+def test_missing_field_is_rejected(db, client):
+    files = [("files", ("a.jpg", b"1", "image/jpeg")), ("files", ("b.jpg", b"2", "image/jpeg"))]
+    response = client.post("/batches/create", data={**FORM, "quantity": ""}, files=files)
+    assert response.status_code == 422
+    assert _leftovers() == []
+
+
+class _Request:
+    def __init__(self, headers, chunks):
+        self.headers = headers
+        self.chunks = chunks
+        self.read = 0
+
+    async def stream(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+def _multipart(boundary, filename, payload):
+    return (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"files\"; filename=\"{filename}\"\r\n"
+        f"Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+
+
+def test_declared_length_over_limit_is_refused_before_reading(tmp_path):
+    request = _Request({"content-length": "1000", "content-type": "multipart/form-data; boundary=x"}, [b"x" * 1000])
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(receive_multipart(request, str(tmp_path), max_request_bytes=100))
+    assert request.read == 0
+
+
+def test_oversized_file_is_cut_off_mid_stream(tmp_path):
+    body = _multipart("x", "big.jpg", b"y" * 5000)
+    chunks = [body[i:i + 512] for i in range(0, len(body), 512)]
+    request = _Request({"content-type": "multipart/form-data; boundary=x"}, chunks)
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(receive_multipart(request, str(tmp_path), max_file_bytes=1000))
+    assert request.read < len(chunks)
+    assert os.listdir(tmp_path) == []
+
+
+def test_receiver_hashes_while_writing(tmp_path):
+    import hashlib
+
+    receiver = MultipartReceiver("multipart/form-data; boundary=x", str(tmp_path))
+    body = _multipart("x", "a.jpg", b"z" * 3000)
+    for i in range(0, len(body), 100):
+        receiver.feed(body[i:i + 100])
+    receiver.finish()
+
+    (upload,) = receiver.uploads("files")
+    assert upload.size == 3000
+    assert upload.sha256 == hashlib.sha256(b"z" * 3000).hexdigest()
+    assert open(upload.temp_path, "rb").read() == b"z" * 3000
+    receiver.discard()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,63 @@
+# backend/tests/test_bulk_import.py
+import io
+import json
+import zipfile
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import models
+from routes import batches
+
+GOOD = {"farmer_id": 1, "crop_name": "Wheat", "quantity": 100, "region": "Punjab", "images": ["a.jpg", "b.jpg"]}
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    db.add(models.User(id=1, username="farmer", email="farmer@example.com"))
+    db.commit()
+    monkeypatch.setattr(batches.ingestion_queue, "submit", lambda job_id: None)
+    app = FastAPI()
+    app.include_router(batches.router)
+    return TestClient(app)
+
+
+def _post(client, filename, manifest: bytes):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a.jpg", b"front")
+        zf.writestr("b.jpg", b"side")
+    return client.post("/batches/bulk", files={
+        "manifest": (filename, manifest),
+        "archive": ("images.zip", archive.getvalue(), "application/zip"),
+    })
+
+
+@pytest.mark.parametrize("bad, error", [
+    ({"images": 5}, "images must be a list of archive paths"),
+    ({"images": ["a.jpg", 7]}, "images must be a list of archive paths"),
+    ({"quantity": "nan"}, "quantity must be a finite number"),
+    ({"quantity": "inf"}, "quantity must be a finite number"),
+    ({"region": ["Punjab"]}, "region must be text"),
+    ({"crop_name": {"name": "Wheat"}}, "crop_name must be text"),
+])
+def test_malformed_rows_are_rejected_alone(db, client, bad, error):
+    response = _post(client, "manifest.json", json.dumps([GOOD, {**GOOD, **bad}, GOOD]).encode())
+
+    assert response.status_code == 202, response.text
+    report = response.json()
+    assert (report["accepted"], report["rejected"]) == (2, 1)
+    assert [r["errors"] for r in report["results"]] == [[], [error], []]
+    assert db.query(models.Batch).count() == 2
+    assert db.query(models.IngestionJob).count() == 2
+
+
+def test_csv_manifest_with_image_paths(db, client):
+    manifest = "farmer_id,crop_name,quantity,location,region,images\n1,Wheat,12.5,\"30.9,75.8\",Punjab,a.jpg;b.jpg\n"
+    response = _post(client, "manifest.csv", manifest.encode())
+
+    assert response.status_code == 202, response.text
+    assert response.json()["accepted"] == 1
+    batch = db.query(models.Batch).one()
+    assert (batch.quantity, batch.latitude, batch.region, len(batch.images)) == (12.5, 30.9, "Punjab", 2)
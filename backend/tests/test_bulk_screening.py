@@ -0,0 +1,38 @@
+# backend/tests/test_bulk_screening.py
+import numpy as np
+
+import models
+from ai import bulk_screening, crop_rules
+
+
+def test_screens_batches_loaded_from_the_database(db):
+    crop_rules.seed_defaults()
+    for batch_id, region, quantity in [
+        ("OK", "Punjab", 500),
+        ("REGION", "Kerala", 500),
+        ("YIELD", "Haryana", 5000),
+        ("BOTH", None, None),
+    ]:
+        db.add(models.Batch(batch_id=batch_id, farmer_id=1, crop_name=" Wheat ", region=region, quantity=quantity))
+    db.commit()
+
+    cols = bulk_screening.load_batch_columns(db, chunk_size=2)
+    assert list(cols.batch_ids) == ["OK", "REGION", "YIELD", "BOTH"]
+    assert list(cols.crops) == ["wheat"] * 4
+    assert list(cols.regions) == ["Punjab", "Kerala", "Haryana", "Unknown"]
+    assert cols.quantity.tolist() == [500, 500, 5000, 0]
+
+    rules = crop_rules.compile_rules(db)
+    flags = bulk_screening.screen(cols, rules=rules)
+    assert flags.tolist() == [
+        0, bulk_screening.FLAG_REGION, bulk_screening.FLAG_YIELD, bulk_screening.FLAG_REGION,
+    ]
+    reasons = bulk_screening.flag_reasons(cols, flags, rules=rules)
+    assert reasons["REGION"] == ["Wheat cannot be grown in Kerala"]
+    assert reasons["YIELD"][0].startswith("Reported quantity 5000.0kg exceeds")
+
+
+def test_empty_table_loads_empty_columns(db):
+    cols = bulk_screening.load_batch_columns(db)
+    assert len(cols) == 0
+    assert bulk_screening.screen(cols).dtype == np.uint8
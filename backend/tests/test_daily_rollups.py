@@ -0,0 +1,67 @@
+# backend/tests/test_daily_rollups.py
+import datetime
+import uuid
+
+import pytest
+
+import models
+from ai import crop_rules
+from utils import daily_rollups, rescan, rollups
+
+MAY_1 = datetime.datetime(2024, 5, 1, 8)
+MAY_2 = datetime.datetime(2024, 5, 2, 8)
+
+
+@pytest.fixture(autouse=True)
+def registered(db):
+    rollups.register(daily_rollups.rollup)
+    crop_rules._cache.clear()
+    crop_rules.seed_defaults()
+
+
+def _rollup(db):
+    return {
+        (r.day, r.crop_name, r.region, r.status):
+            (r.batch_count, round(r.total_kg, 6), round(r.freshness_sum, 6), r.freshness_count, r.flagged_count)
+        for r in db.query(models.DailyBatchRollup).all()
+        if r.batch_count or r.total_kg or r.freshness_sum or r.freshness_count or r.flagged_count
+    }
+
+
+def _batch(batch_id, region, quantity, harvest_date, status=models.BatchStatus.VERIFIED, freshness=None):
+    return models.Batch(batch_id=batch_id, farmer_id=1, crop_name="Wheat", region=region, quantity=quantity,
+                        harvest_date=harvest_date, status=status, freshness_score=freshness)
+
+
+def test_incremental_rollup_matches_a_rebuild(db):
+    a = _batch("A", "Punjab", 100, MAY_1, freshness=90)
+    b = _batch("B", "Punjab", 40, MAY_1, freshness=70)
+    c = _batch("C", "Kerala", 10, MAY_2)
+    d = _batch("D", "Haryana", 60, MAY_2, status=models.BatchStatus.HARVESTED)
+    db.add_all([a, b, c, d])
+    db.commit()
+    assert _rollup(db)[("2024-05-01", "Wheat", "Punjab", "VERIFIED")] == (2, 140, 160, 2, 0)
+
+    a.quantity = 120
+    b.harvest_date = MAY_2
+    d.freshness_score = 80
+    db.commit()
+    db.delete(a)
+    db.commit()
+
+    # The rescan flags C (Kerala is banned) with a bulk update and moves its rollup row itself
+    job = models.RescanJob(id=str(uuid.uuid4()), trigger="test", banned_regions="Kerala")
+    db.add(job)
+    db.commit()
+    rescan.run_rescan_job(job.id)
+    db.expire_all()
+    assert db.get(models.Batch, c.id).status == models.BatchStatus.FLAGGED
+
+    incremental = _rollup(db)
+    assert incremental == {
+        ("2024-05-02", "Wheat", "Punjab", "VERIFIED"): (1, 40, 70, 1, 0),
+        ("2024-05-02", "Wheat", "Kerala", "FLAGGED"): (1, 10, 0, 0, 1),
+        ("2024-05-02", "Wheat", "Haryana", "HARVESTED"): (1, 60, 80, 1, 0),
+    }
+    daily_rollups.rebuild(db)
+    assert _rollup(db) == incremental
@@ -0,0 +1,48 @@
+# backend/tests/test_embedding_parity.py
+"""
+Accuracy parity of each embedding backend with the float32 torch model
+(the check in ai/embedding_bench.py). Skipped without torch or without
+the exported weights (`python -m ai.vectorize --export-weights`).
+"""
+import glob
+import os
+
+import pytest
+
+pytest.importorskip("torch")
+
+from ai import embedding_backends  # noqa: E402
+from ai.embedding_bench import DEFAULT_MIN_COSINE, _cosine_rows  # noqa: E402
+from ai.vectorize import images_to_vectors  # noqa: E402
+
+SAMPLE_IMAGES = sorted(glob.glob(os.path.join(os.path.dirname(embedding_backends.__file__), "static", "*.png")))
+
+WEIGHTS = {
+    "torch": embedding_backends.MOBILENET_WEIGHTS_PATH,
+    "torch-int8": embedding_backends.MOBILENET_INT8_WEIGHTS_PATH,
+    "onnx": embedding_backends.MOBILENET_ONNX_PATH,
+    "onnx-int8": embedding_backends.MOBILENET_ONNX_INT8_PATH,
+}
+
+
+def _load(name):
+    if not os.path.exists(WEIGHTS[name]):
+        pytest.skip(f"{name} weights not exported")
+    try:
+        return embedding_backends.load_backend(name)
+    except ImportError as e:  # onnxruntime not installed
+        pytest.skip(str(e))
+
+
+@pytest.fixture(scope="module")
+def reference():
+    if not SAMPLE_IMAGES:
+        pytest.skip("no sample images in ai/static")
+    return images_to_vectors(SAMPLE_IMAGES, backend=_load("torch"))
+
+
+@pytest.mark.parametrize("name", sorted(set(embedding_backends.BACKENDS) - {"torch"}))
+def test_backend_matches_the_torch_reference(name, reference):
+    vectors = images_to_vectors(SAMPLE_IMAGES, backend=_load(name))
+    assert vectors.shape == reference.shape
+    assert _cosine_rows(vectors, reference).min() >= DEFAULT_MIN_COSINE
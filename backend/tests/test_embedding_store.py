@@ -0,0 +1,18 @@
+# backend/tests/test_embedding_store.py
+import numpy as np
+import pytest
+
+from ai.embedding_store import EmbeddingStore
+
+
+def test_rows_read_back_normalized(tmp_path):
+    store = EmbeddingStore(str(tmp_path), 4)
+    store.open(0)
+    assert store.append(np.array([[3.0, 4.0, 0, 0]])) == 0
+    assert store.append(np.array([[0, 0, 2.0, 0], [0, 0, 0, 5.0]])) == 1
+
+    assert len(store) == 3
+    assert store.get(0) == pytest.approx([0.6, 0.8, 0, 0], abs=1e-3)
+    assert store.get(2) == pytest.approx([0, 0, 0, 1])
+    with pytest.raises(IndexError):
+        store.get(3)
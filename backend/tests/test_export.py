@@ -0,0 +1,20 @@
+# backend/tests/test_export.py
+import pytest
+
+import models
+from utils import export
+
+
+@pytest.mark.parametrize("crop, expected", [
+    ("wheat", ["W1"]),
+    ("WHEAT", ["W1"]),
+    ("%", []),
+    ("wh_at", []),
+])
+def test_crop_filter_is_an_exact_case_insensitive_match(db, crop, expected):
+    db.add_all([
+        models.Batch(batch_id="W1", farmer_id=1, crop_name="Wheat", quantity=1),
+        models.Batch(batch_id="R1", farmer_id=1, crop_name="Rice", quantity=1),
+    ])
+    db.commit()
+    assert [row.batch_id for row in export.filtered_rows(db, crop=crop)] == expected
@@ -0,0 +1,43 @@
+# backend/tests/test_fraud_detection.py
+import pytest
+from PIL import Image
+
+from ai.fraud_detection import GPS_IFD, ImageMetadata, check_exif, extract_image_gps, read_image_metadata
+
+
+def _photo(path, gps_tags):
+    exif = Image.Exif()
+    exif[0x010F] = "Canon"  # Make
+    exif.get_ifd(GPS_IFD).update(gps_tags)
+    Image.new("RGB", (32, 32), "green").save(path, "JPEG", exif=exif)
+    return path
+
+
+def test_gps_ifd_without_a_fix_has_no_coordinates(tmp_path):
+    # Version and timestamp only, as many phones write without a fix
+    path = _photo(tmp_path / "nofix.jpg", {0: b"\x02\x02\x00\x00", 7: (12.0, 30.0, 5.0)})
+    meta = read_image_metadata(path)
+    assert "GPSInfo" in meta.exif
+    assert meta.gps == (None, None)
+
+
+def test_gps_fix_is_converted_to_degrees(tmp_path):
+    path = _photo(tmp_path / "fix.jpg", {1: "N", 2: (30.0, 54.0, 0.0), 3: "W", 4: (75.0, 48.0, 36.0)})
+    lat, lon = read_image_metadata(path).gps
+    assert lat == pytest.approx(30.9)
+    assert lon == pytest.approx(-75.81)
+
+
+@pytest.mark.parametrize("gps", [
+    {1: "N", 2: (30.0, 54.0)},                       # too few components
+    {1: "N", 2: (30.0, 54.0, 0.0), 3: "E"},          # longitude missing
+    {1: "N", 2: ("x", 0, 0), 3: "E", 4: (1, 0, 0)},  # not a number
+    {1: "N", 2: (95.0, 0, 0), 3: "E", 4: (1, 0, 0)}, # out of range
+])
+def test_malformed_gps_is_ignored(gps):
+    assert extract_image_gps({"GPSInfo": gps}) == (None, None)
+
+
+def test_malformed_photo_timestamp_is_flagged_not_raised():
+    meta = ImageMetadata("x.jpg", {"Make": "Canon", "DateTime": "2024:13:45 99:00:00"}, 32, 32, "JPEG", "")
+    assert check_exif(meta) == (True, "Photo timestamp is unreadable")
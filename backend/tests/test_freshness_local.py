@@ -0,0 +1,34 @@
+# backend/tests/test_freshness_local.py
+import numpy as np
+import pytest
+from PIL import Image
+
+from ai.freshness_local import estimate_file
+
+
+def _save(tmp_path, pixels, name="photo.jpg"):
+    path = tmp_path / name
+    Image.fromarray(pixels.astype(np.uint8)).save(path, "JPEG", quality=95)
+    return path
+
+
+@pytest.mark.parametrize("colour", [(30, 60, 200), (40, 160, 60)])
+def test_flat_colour_is_never_trusted(tmp_path, colour):
+    pixels = np.broadcast_to(np.array(colour), (96, 96, 3))
+    result = estimate_file(_save(tmp_path, pixels))
+    assert result["confidence"] == 0.0
+
+
+def test_mostly_blue_frame_is_never_trusted(tmp_path):
+    rng = np.random.default_rng(0)
+    pixels = np.array([40, 70, 200]) + rng.integers(-40, 40, (96, 96, 1))
+    result = estimate_file(_save(tmp_path, np.clip(pixels, 0, 255)))
+    assert result["confidence"] == 0.0
+
+
+def test_textured_produce_colours_can_be_trusted(tmp_path):
+    rng = np.random.default_rng(0)
+    pixels = np.array([200, 40, 30]) + rng.integers(-40, 40, (96, 96, 1))
+    result = estimate_file(_save(tmp_path, np.clip(pixels, 0, 255)))
+    assert result["confidence"] > 0
+    assert result["estimated_shelf_life_days"] in (2, 4, 6)
@@ -0,0 +1,65 @@
+# backend/tests/test_harvest_totals.py
+import datetime
+
+import pytest
+
+import models
+from database import SessionLocal
+from utils import harvest_totals, rollups
+
+MAY = datetime.datetime(2024, 5, 10)
+JUNE = datetime.datetime(2024, 6, 2)
+
+
+@pytest.fixture(autouse=True)
+def registered():
+    rollups.register(harvest_totals.rollup)
+
+
+def _totals(db):
+    return {
+        (t.farmer_id, t.period): (round(t.total_kg, 6), t.batch_count)
+        for t in db.query(models.FarmerHarvestTotal).all()
+        if t.total_kg or t.batch_count
+    }
+
+
+def _batch(batch_id, farmer_id, quantity, harvest_date):
+    return models.Batch(batch_id=batch_id, farmer_id=farmer_id, crop_name="Wheat",
+                        quantity=quantity, harvest_date=harvest_date)
+
+
+def test_incremental_totals_match_a_rebuild(db):
+    a, b, c = _batch("A", 1, 100, MAY), _batch("B", 1, 50, JUNE), _batch("C", 2, 30, MAY)
+    db.add_all([a, b, c])
+    db.commit()
+    assert _totals(db)[(1, harvest_totals.ALL_TIME)] == (150, 2)
+
+    # Attributes are expired after the commit, so the old values must be loaded on set
+    a.quantity = 120
+    b.farmer_id, b.harvest_date = 2, MAY
+    db.commit()
+
+    db.delete(c)
+    db.commit()
+
+    # A delete from another session, where the row was never loaded
+    other = SessionLocal()
+    try:
+        other.delete(other.get(models.Batch, a.id))
+        other.commit()
+    finally:
+        other.close()
+
+    db.add(_batch("D", 3, 70, JUNE))
+    db.commit()
+
+    incremental = _totals(db)
+    assert incremental == {
+        (2, harvest_totals.ALL_TIME): (50, 1),
+        (2, "2024-05"): (50, 1),
+        (3, harvest_totals.ALL_TIME): (70, 1),
+        (3, "2024-06"): (70, 1),
+    }
+    harvest_totals.rebuild(db)
+    assert _totals(db) == incremental
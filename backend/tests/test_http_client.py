@@ -0,0 +1,75 @@
+# backend/tests/test_http_client.py
+import asyncio
+import socket
+import threading
+
+import httpx
+import pytest
+import requests
+
+from ai import http_client
+
+
+@pytest.fixture
+def hung_server():
+    """Accepts connections and never answers; counts the requests it got."""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(8)
+    accepted = []
+
+    def serve():
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            accepted.append(conn)
+
+    threading.Thread(target=serve, daemon=True).start()
+    yield f"http://127.0.0.1:{sock.getsockname()[1]}/", accepted
+    sock.close()
+    for conn in accepted:
+        conn.close()
+
+
+@pytest.fixture(autouse=True)
+def closed_breaker(monkeypatch):
+    monkeypatch.setattr(http_client, "breaker", http_client.CircuitBreaker(100, 30))
+
+
+def test_read_timeout_is_not_retried(hung_server):
+    url, accepted = hung_server
+    with pytest.raises(requests.ReadTimeout):
+        http_client.post(url, json={}, timeout=(1, 0.2))
+    assert len(accepted) == 1
+
+
+def test_async_read_timeout_is_not_retried(hung_server, monkeypatch):
+    url, accepted = hung_server
+    monkeypatch.setattr(http_client, "_async_client", None)
+
+    async def call():
+        try:
+            await http_client.async_post(url, json={}, timeout=httpx.Timeout(0.2))
+        finally:
+            await http_client.aclose()
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(call())
+    assert len(accepted) == 1
+
+
+def test_async_connect_error_is_retried(monkeypatch):
+    attempts = []
+
+    def refuse(request):
+        attempts.append(request)
+        raise httpx.ConnectError("refused", request=request)
+
+    monkeypatch.setattr(http_client, "_async_client", httpx.AsyncClient(transport=httpx.MockTransport(refuse)))
+    monkeypatch.setattr(http_client, "_retry_delay", lambda attempt, response=None: 0)
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(http_client.async_post("http://provider/", json={}))
+    assert len(attempts) == http_client.MAX_RETRIES + 1
@@ -0,0 +1,165 @@
+# backend/tests/test_ingestion.py
+import os
+import uuid
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import models
+from ai import crop_rules
+from ai.fraud_detection import GPS_IFD
+from utils import ingestion, settings
+
+UPLOADS = os.path.join("static", "uploads")
+FRESHNESS = {"freshness_score": 91, "quality_grade": "A", "estimated_shelf_life_days": 6, "visual_defects": []}
+
+
+@pytest.fixture(autouse=True)
+def pipeline(db, monkeypatch):
+    """Fresh rule and photo indexes; no embedding model and no LLM."""
+    os.makedirs(UPLOADS, exist_ok=True)
+    crop_rules._cache.clear()
+    crop_rules.seed_defaults()
+    settings._cache.clear()
+    ingestion.rebuild_phash_index()
+    monkeypatch.setattr(ingestion, "_embed", lambda paths: None)
+    calls = []
+
+    def analyze(path):
+        calls.append(path)
+        return dict(FRESHNESS)
+
+    monkeypatch.setattr(ingestion, "analyze_freshness", analyze)
+    return calls
+
+
+def _photo(seed, exif=True, gps=None):
+    pixels = np.random.default_rng(seed).integers(0, 255, (48, 48, 3), dtype=np.uint8)
+    info = Image.Exif()
+    if exif:
+        info[0x010F] = "Canon"  # Make
+    if gps is not None:
+        info.get_ifd(GPS_IFD).update(gps)
+    name = f"{uuid.uuid4().hex}.jpg"
+    Image.fromarray(pixels).save(os.path.join(UPLOADS, name), "JPEG", exif=info)
+    return f"/static/uploads/{name}"
+
+
+def _queued_batch(db, photos, crop="Wheat", region="Punjab", quantity=500):
+    batch = models.Batch(
+        batch_id=uuid.uuid4().hex[:8], farmer_id=1, crop_name=crop, quantity=quantity,
+        latitude=30.9, longitude=75.8, region=region, status=models.BatchStatus.HARVESTED,
+    )
+    db.add(batch)
+    db.flush()
+    for url in photos:
+        db.add(models.BatchImage(batch_id=batch.id, image_url=url))
+    job = models.IngestionJob(id=uuid.uuid4().hex, batch_id=batch.id)
+    db.add(job)
+    db.commit()
+    return batch, job
+
+
+def _run(db, job):
+    ingestion.run_ingestion_job(job.id)
+    db.expire_all()
+    return db.get(models.IngestionJob, job.id), db.get(models.Batch, job.batch_id)
+
+
+def test_clean_batch_is_verified(db, pipeline):
+    _, job = _queued_batch(db, [_photo(1), _photo(2)])
+    job, batch = _run(db, job)
+
+    assert job.status == models.JobStatus.DONE and job.error is None
+    assert batch.status == models.BatchStatus.VERIFIED and batch.is_verified
+    assert (batch.freshness_score, batch.quality_grade, batch.estimated_shelf_life) == (91, "A", 6)
+    assert batch.origin_hash and batch.blockchain_tx_hash
+    assert all(img.phash for img in batch.images)
+    assert len(pipeline) == 1
+    note = db.query(models.Notification).filter(models.Notification.user_id == 1).one()
+    assert note.type == models.NotificationType.SUCCESS
+
+
+def test_rule_failures_flag_the_batch_without_grading(db, pipeline):
+    _, job = _queued_batch(db, [_photo(1, exif=False), _photo(2)], region="Kerala", quantity=5000)
+    job, batch = _run(db, job)
+
+    assert job.status == models.JobStatus.DONE
+    assert batch.status == models.BatchStatus.FLAGGED and not batch.is_verified
+    notes = batch.processor_notes
+    assert "Kerala" in notes and "Missing EXIF metadata" in notes
+    assert pipeline == []
+    note = db.query(models.Notification).filter(models.Notification.user_id == 1).one()
+    assert note.type == models.NotificationType.ALERT
+
+
+def test_batch_in_a_banned_zone_is_flagged(db, pipeline):
+    settings.set_many(db, {"BANNED_ZONES": "Haryana, Punjab"})
+    _, job = _queued_batch(db, [_photo(3), _photo(4)], region=" punjab ")
+    job, batch = _run(db, job)
+
+    assert batch.status == models.BatchStatus.FLAGGED and not batch.is_verified
+    assert batch.processor_notes == "punjab is a banned zone"
+    assert pipeline == []
+
+
+def test_photo_reused_from_another_batch_is_flagged(db):
+    reused = _photo(7)
+    first, job = _queued_batch(db, [reused, _photo(8)])
+    assert _run(db, job)[1].status == models.BatchStatus.VERIFIED
+
+    _, job = _queued_batch(db, [reused, _photo(9)])
+    job, batch = _run(db, job)
+    assert batch.status == models.BatchStatus.FLAGGED
+    assert f"Photo reused from batch {first.batch_id}" in batch.processor_notes
+
+
+def test_gps_block_without_fix_does_not_fail_the_job(db):
+    _, job = _queued_batch(db, [_photo(1, gps={0: b"\x02\x02\x00\x00"}), _photo(2)])
+    job, batch = _run(db, job)
+    assert job.status == models.JobStatus.DONE
+    assert batch.status == models.BatchStatus.VERIFIED
+
+
+def test_gps_far_from_the_farm_is_flagged(db):
+    far = {1: "N", 2: (12.0, 58.0, 0.0), 3: "E", 4: (77.0, 35.0, 0.0)}  # Bengaluru, not Punjab
+    _, job = _queued_batch(db, [_photo(1, gps=far), _photo(2)])
+    job, batch = _run(db, job)
+    assert batch.status == models.BatchStatus.FLAGGED
+    assert "GPS mismatch" in batch.processor_notes
+
+
+def test_failed_job_is_requeued_then_left_failed_with_an_alert(db, monkeypatch):
+    requeued = []
+    monkeypatch.setattr(ingestion.ingestion_queue, "submit", lambda job_id, **kw: requeued.append(job_id))
+    _, job = _queued_batch(db, ["/static/uploads/missing.jpg", _photo(2)])
+
+    for attempt in range(1, ingestion.INGESTION_MAX_ATTEMPTS):
+        job, batch = _run(db, job)
+        assert (job.status, job.attempts) == (models.JobStatus.QUEUED, attempt) and job.error
+        assert requeued == [job.id] * attempt
+        assert db.query(models.Notification).count() == 0
+
+    job, batch = _run(db, job)
+    assert job.status == models.JobStatus.FAILED
+    assert job.attempts == ingestion.INGESTION_MAX_ATTEMPTS
+    assert job.finished_at is not None
+    assert len(requeued) == ingestion.INGESTION_MAX_ATTEMPTS - 1
+    assert batch.status == models.BatchStatus.HARVESTED
+    note = db.query(models.Notification).filter(models.Notification.user_id == 1).one()
+    assert note.type == models.NotificationType.ALERT and batch.batch_id in note.message
+
+    ingestion.retry_ingestion_job(db, job)
+    db.expire_all()
+    job = db.get(models.IngestionJob, job.id)
+    assert (job.status, job.attempts, job.error) == (models.JobStatus.QUEUED, 0, None)
+    assert requeued[-1] == job.id
+
+
+def test_finished_job_is_not_run_again(db, pipeline):
+    _, job = _queued_batch(db, [_photo(1), _photo(2)])
+    _run(db, job)
+    job, batch = _run(db, job)
+    assert job.status == models.JobStatus.DONE
+    assert len(pipeline) == 1
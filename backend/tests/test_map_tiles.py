@@ -0,0 +1,65 @@
+# backend/tests/test_map_tiles.py
+import pytest
+
+import models
+from ai.result_cache import ResultCache
+from utils import map_tiles
+
+
+@pytest.fixture
+def tile_cache(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "tiles.db"), ttl_seconds=3600)
+    monkeypatch.setattr(map_tiles, "map_tile_cache", cache)
+    return cache
+
+
+def _tile(db):
+    version = map_tiles.data_version(db)
+    x, y = map_tiles.tiles_for_bbox(30.0, 75.0, 30.0, 75.0, 10)[0]
+    return version, map_tiles.cached_tile(db, 10, x, y, version)
+
+
+def _batch(db, batch_id, quantity, lat=30.0, lng=75.0):
+    batch = models.Batch(batch_id=batch_id, farmer_id=1, crop_name="Wheat", quantity=quantity, latitude=lat, longitude=lng)
+    db.add(batch)
+    db.commit()
+    return batch
+
+
+def test_inserts_and_edits_keep_tiles_until_they_expire(db, tile_cache):
+    batch = _batch(db, "T1", 100)
+    version, cells = _tile(db)
+    assert cells[0]["total_kg"] == 100
+
+    _batch(db, "T2", 50)
+    batch.quantity = 250
+    batch.status = models.BatchStatus.FLAGGED
+    db.commit()
+    assert _tile(db) == (version, cells)  # still cached
+
+    # Expire every cached tile, as MAP_TILE_TTL would
+    tile_cache._memory.clear()
+    tile_cache._conn.execute("UPDATE results SET expires_at = 0")
+    assert _tile(db)[1][0]["total_kg"] == 300
+
+
+def test_moves_and_deletes_move_the_tile_version(db, tile_cache):
+    batch = _batch(db, "T1", 100)
+    version, cells = _tile(db)
+    assert cells[0]["count"] == 1
+
+    batch.latitude = 10.0
+    db.commit()
+    moved, cells = _tile(db)
+    assert moved > version
+    assert cells == []
+
+    batch.latitude = 30.0
+    db.commit()
+    assert _tile(db)[1][0]["count"] == 1
+
+    db.delete(batch)
+    db.commit()
+    deleted, cells = _tile(db)
+    assert deleted > moved
+    assert cells == []
@@ -0,0 +1,14 @@
+# backend/tests/test_process_pool.py
+from utils import process_pool
+
+
+def test_falls_back_to_spawn_without_forkserver(monkeypatch):
+    monkeypatch.setattr(process_pool.multiprocessing, "get_all_start_methods", lambda: ["spawn"])
+    assert process_pool._start_method() == "spawn"
+
+
+def test_prefers_forkserver_where_available(monkeypatch):
+    monkeypatch.setattr(
+        process_pool.multiprocessing, "get_all_start_methods", lambda: ["fork", "spawn", "forkserver"]
+    )
+    assert process_pool._start_method() == "forkserver"
@@ -0,0 +1,38 @@
+# backend/tests/test_rescan.py
+import uuid
+
+import pytest
+
+import models
+from ai import crop_rules
+from utils import rescan
+
+
+@pytest.fixture(autouse=True)
+def rules(db):
+    crop_rules._cache.clear()
+    crop_rules.seed_defaults()
+
+
+def test_flagged_batches_lose_their_verification(db):
+    for batch_id, region in [("OK", "Punjab"), ("BANNED", "Haryana"), ("RULE", "Kerala")]:
+        db.add(models.Batch(
+            batch_id=batch_id, farmer_id=1, crop_name="Wheat", region=region, quantity=100,
+            status=models.BatchStatus.VERIFIED, is_verified=True, estimated_shelf_life=5,
+        ))
+    job = models.RescanJob(id=str(uuid.uuid4()), trigger="test", banned_regions="Haryana")
+    db.add(job)
+    db.commit()
+
+    rescan.run_rescan_job(job.id)
+    db.expire_all()
+    batches = {b.batch_id: b for b in db.query(models.Batch).all()}
+
+    assert batches["OK"].status == models.BatchStatus.VERIFIED and batches["OK"].is_verified
+    for batch_id, notes in [("BANNED", "Haryana is a banned zone"), ("RULE", "Wheat cannot be grown in Kerala")]:
+        batch = batches[batch_id]
+        assert batch.status == models.BatchStatus.FLAGGED
+        assert batch.is_verified is False
+        assert batch.processor_notes == notes
+        assert batch.estimated_shelf_life is None
+    assert db.get(models.RescanJob, job.id).flagged == 2
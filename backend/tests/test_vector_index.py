@@ -0,0 +1,56 @@
+# backend/tests/test_vector_index.py
+import numpy as np
+import pytest
+
+from ai.vector_index import VectorIndex
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def test_rows_without_a_payload_are_never_returned():
+    index = VectorIndex(8)
+    vectors = _vectors(5)
+    index.rebuild(["a", None, "c"], vectors)
+
+    assert len(index) == 5
+    found = [payload for payload, _ in index.search(vectors[1], k=5)]
+    assert sorted(found) == ["a", "c"]
+
+
+def test_more_payloads_than_vectors_is_rejected():
+    with pytest.raises(ValueError):
+        VectorIndex(8).rebuild(["a", "b", "c"], _vectors(2))
+
+
+def test_add_after_rebuild_extends_the_index():
+    index = VectorIndex(8)
+    vectors = _vectors(3)
+    index.rebuild(["a", "b"], vectors[:2])
+    index.add("c", vectors[2])
+
+    (payload, similarity), *_ = index.search(vectors[2], k=1)
+    assert payload == "c" and similarity == pytest.approx(1.0, abs=1e-3)
+
+
+def test_stale_store_view_does_not_shrink_the_index(tmp_path):
+    from ai.embedding_store import EmbeddingStore
+
+    store = EmbeddingStore(str(tmp_path), 8)
+    store.open(0)
+    index = VectorIndex(8)
+    index.rebuild([], store.view(), normalized=True)
+    vectors = _vectors(2)
+
+    # Two ingestion workers interleave append / view / add
+    row_a = store.append(vectors[:1])
+    view_a = store.view()
+    row_b = store.append(vectors[1:])
+    view_b = store.view()
+    index.add("b", vectors[1], row=row_b, vectors=view_b)
+    index.add("a", vectors[0], row=row_a, vectors=view_a)
+
+    assert len(index) == 2
+    assert index.search(vectors[0], k=1)[0][0] == "a"
+    assert index.search(vectors[1], k=1)[0][0] == "b"
@@ -0,0 +1,32 @@
+# backend/tests/test_versioned_cache.py
+from utils.versioned_cache import VersionedCache, bump_version, read_version
+
+
+def test_reloads_only_when_the_version_moves(db):
+    loads = []
+
+    def load(session):
+        loads.append(1)
+        return read_version(session, "TEST_VERSION"), len(loads)
+
+    cache = VersionedCache("TEST_VERSION", load, recheck_seconds=0)
+    assert cache.get() == 1
+    assert cache.get() == 1  # version unchanged: no reload
+    assert cache.version == 0
+
+    bump_version(db, "TEST_VERSION")  # inserts the counter
+    bump_version(db, "TEST_VERSION")  # increments it in place
+    db.commit()
+    assert read_version(db, "TEST_VERSION") == 2
+    assert cache.get() == 2
+    assert cache.version == 2
+
+
+def test_invalidate_skips_the_recheck_interval(db):
+    cache = VersionedCache("TEST_VERSION", lambda s: (read_version(s, "TEST_VERSION"), object()), recheck_seconds=3600)
+    first = cache.get()
+    bump_version(db, "TEST_VERSION")
+    db.commit()
+    assert cache.get() is first
+    cache.invalidate()
+    assert cache.get() is not first
@@ -0,0 +1,106 @@
+# backend/utils/backfill_images.py
+"""
+Fills in the duplicate-photo data for batch images stored before it
+existed: the dHash (BatchImage.phash) and the MobileNetV2 embedding
+(BatchImage.embedding_row). New uploads get both at ingestion.
+
+    python -m utils.backfill_images
+
+Safe to re-run; it only touches images still missing a value. The API
+rebuilds its photo indexes from these columns at startup, so restart it
+afterwards if it was running. Embeddings are skipped where torch or the
+local weights are unavailable.
+"""
+import logging
+import os
+
+import models
+from ai import embedding_store
+from ai.image_tasks import inspect_image
+from utils.ingestion import _embed, image_path_from_url
+from utils.process_pool import image_pool
+
+BACKFILL_CHUNK_SIZE = int(os.getenv("BACKFILL_CHUNK_SIZE", "256"))
+
+logger = logging.getLogger(__name__)
+
+
+def _missing(db, column, after_id: int, limit: int):
+    return (
+        db.query(models.BatchImage)
+        .filter(column.is_(None), models.BatchImage.id > after_id)
+        .order_by(models.BatchImage.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def backfill_phashes(db, chunk_size: int = BACKFILL_CHUNK_SIZE) -> dict:
+    counts = {"hashed": 0, "unreadable": 0}
+    last_id = 0
+    while True:
+        images = _missing(db, models.BatchImage.phash, last_id, chunk_size)
+        if not images:
+            return counts
+        last_id = images[-1].id
+
+        futures = [image_pool.submit(inspect_image, str(image_path_from_url(img.image_url))) for img in images]
+        for img, future in zip(images, futures):
+            try:
+                _, value = future.result()
+            except Exception as e:
+                # Missing or undecodable file; left NULL
+                logger.warning("Cannot hash image %s (%s): %s", img.id, img.image_url, e)
+                counts["unreadable"] += 1
+                continue
+            img.phash = f"{value:016x}"
+            counts["hashed"] += 1
+        db.commit()
+
+
+def backfill_embeddings(db, chunk_size: int = BACKFILL_CHUNK_SIZE) -> dict:
+    counts = {"embedded": 0, "unreadable": 0}
+    store = embedding_store.open_store(db)
+    last_id = 0
+    while True:
+        images = _missing(db, models.BatchImage.embedding_row, last_id, chunk_size)
+        if not images:
+            return counts
+        last_id = images[-1].id
+
+        readable = [img for img in images if image_path_from_url(img.image_url).is_file()]
+        counts["unreadable"] += len(images) - len(readable)
+        if not readable:
+            continue
+
+        vectors = _embed([image_path_from_url(img.image_url) for img in readable])
+        if vectors is None:
+            counts["skipped"] = True
+            return counts
+
+        first = store.append(vectors)
+        for i, img in enumerate(readable):
+            img.embedding_row = first + i
+        db.commit()
+        counts["embedded"] += len(readable)
+
+
+def backfill(db, chunk_size: int = BACKFILL_CHUNK_SIZE) -> dict:
+    return {
+        "phash": backfill_phashes(db, chunk_size),
+        "embedding": backfill_embeddings(db, chunk_size),
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine
+    from utils import migrations
+
+    logging.basicConfig(level=logging.INFO)
+    migrations.upgrade(engine)
+    session = SessionLocal()
+    try:
+        print(backfill(session))
+    finally:
+        session.close()
+        image_pool.shutdown()
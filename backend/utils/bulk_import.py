@@ -0,0 +1,99 @@
+# backend/utils/bulk_import.py
+import os
+import io
+import csv
+import json
+import math
+
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "5000"))
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "200"))
+
+REQUIRED_FIELDS = ("farmer_id", "crop_name", "quantity", "images")
+
+
+class ManifestError(Exception):
+    pass
+
+
+def parse_manifest(filename: str, fileobj):
+    """
+    Reads a CSV or JSON manifest into a list of dicts.
+
+    CSV: header row with farmer_id, crop_name, quantity, location ("lat,lng"),
+    region, images (archive paths separated by ";").
+    JSON: a list of objects with the same keys; images may be a list.
+    """
+    try:
+        if filename.lower().endswith(".json"):
+            rows = json.load(fileobj)
+            if not isinstance(rows, list):
+                raise ManifestError("JSON manifest must be a list of rows")
+        else:
+            text = io.TextIOWrapper(fileobj, encoding="utf-8-sig")
+            rows = list(csv.DictReader(text))
+    except (ValueError, csv.Error) as e:
+        raise ManifestError(f"Could not parse manifest: {e}")
+
+    if len(rows) > BULK_MAX_ROWS:
+        raise ManifestError(f"Manifest has {len(rows)} rows, limit is {BULK_MAX_ROWS}")
+    return rows
+
+
+def validate_row(row):
+    """Returns (clean_row, errors). clean_row is None when errors is non-empty."""
+    if not isinstance(row, dict):
+        return None, ["Row must be an object"]
+
+    errors = [f"Missing {f}" for f in REQUIRED_FIELDS if row.get(f) in (None, "")]
+    if errors:
+        return None, errors
+
+    # JSON rows can hold any type; text columns must be strings
+    for field in ("crop_name", "region"):
+        if row.get(field) is not None and not isinstance(row[field], str):
+            errors.append(f"{field} must be text")
+    images = row["images"]
+    if isinstance(images, str):
+        images = [p.strip() for p in images.split(";")]
+    elif not (isinstance(images, list) and all(isinstance(p, str) for p in images)):
+        errors.append("images must be a list of archive paths")
+        images = []
+    if errors:
+        return None, errors
+
+    clean = {"crop_name": row["crop_name"].strip(), "region": row.get("region") or None}
+
+    try:
+        clean["farmer_id"] = int(row["farmer_id"])
+    except (TypeError, ValueError):
+        errors.append("farmer_id must be an integer")
+
+    try:
+        clean["quantity"] = float(row["quantity"])
+        if not math.isfinite(clean["quantity"]):
+            errors.append("quantity must be a finite number")
+        elif clean["quantity"] <= 0:
+            errors.append("quantity must be positive")
+    except (TypeError, ValueError):
+        errors.append("quantity must be a number")
+
+    # ---- Parse GPS (same fallback as /batches/create) ----
+    lat, lng = 0.0, 0.0
+    try:
+        if row.get("latitude") not in (None, "") and row.get("longitude") not in (None, ""):
+            lat, lng = float(row["latitude"]), float(row["longitude"])
+        elif row.get("location"):
+            lat_str, lng_str = str(row["location"]).split(",")
+            lat, lng = float(lat_str), float(lng_str)
+    except (TypeError, ValueError):
+        pass
+    if not (math.isfinite(lat) and math.isfinite(lng)):
+        lat, lng = 0.0, 0.0
+    clean["latitude"], clean["longitude"] = lat, lng
+
+    images = [p for p in images if p]
+    if len(images) < 2:
+        errors.append("At least 2 images are required")
+    clean["images"] = images
+
+    return (None, errors) if errors else (clean, [])
@@ -0,0 +1,123 @@
+# backend/utils/daily_rollups.py
+from sqlalchemy import case, func
+
+import models
+from utils.rollups import BatchRollup
+
+BUCKETS = {"day": 10, "month": 7, "year": 4}  # prefix length of "YYYY-MM-DD"
+GROUP_COLUMNS = ("crop_name", "region", "status")
+
+
+def _status(status) -> str:
+    return getattr(status, "value", status) or ""
+
+
+def add(deltas, batch: dict, sign: int = 1):
+    """Accumulates one batch (sign -1 removes it) into {key: [count, kg, fresh_sum, fresh_n, flagged]}."""
+    if batch["harvest_date"] is None:
+        return
+    status = _status(batch["status"])
+    key = (batch["harvest_date"].strftime("%Y-%m-%d"), batch["crop_name"] or "", batch["region"] or "", status)
+    d = deltas.setdefault(key, [0, 0.0, 0.0, 0, 0])
+    d[0] += sign
+    d[1] += sign * (batch["quantity"] or 0.0)
+    if batch["freshness_score"] is not None:
+        d[2] += sign * batch["freshness_score"]
+        d[3] += sign
+    if status == models.BatchStatus.FLAGGED.value:
+        d[4] += sign
+
+
+def rebuild(db):
+    """Recomputes the whole rollup from the batches table."""
+    table = models.DailyBatchRollup.__table__
+    b = models.Batch
+    day = func.strftime("%Y-%m-%d", b.harvest_date)
+    crop, region, status = func.coalesce(b.crop_name, ""), func.coalesce(b.region, ""), func.coalesce(b.status, "")
+
+    db.execute(table.delete())
+    db.execute(table.insert().from_select(
+        ["day", "crop_name", "region", "status",
+         "batch_count", "total_kg", "freshness_sum", "freshness_count", "flagged_count"],
+        db.query(
+            day, crop, region, status,
+            func.count(b.id),
+            func.coalesce(func.sum(b.quantity), 0.0),
+            func.coalesce(func.sum(b.freshness_score), 0.0),
+            func.count(b.freshness_score),
+            func.sum(case((b.status == models.BatchStatus.FLAGGED.value, 1), else_=0)),
+        ).filter(b.harvest_date.isnot(None))
+        .group_by(day, crop, region, status).statement,
+    ))
+    db.commit()
+
+
+rollup = BatchRollup(
+    "daily batch rollups",
+    models.DailyBatchRollup.__table__,
+    key_columns=("day", "crop_name", "region", "status"),
+    sum_columns=("batch_count", "total_kg", "freshness_sum", "freshness_count", "flagged_count"),
+    tracked=("harvest_date", "crop_name", "region", "status", "quantity", "freshness_score"),
+    add=add,
+    rebuild=rebuild,
+)
+
+
+def series(db, date_from=None, date_to=None, bucket="day", group_by=(), crop=None, region=None, status=None):
+    """
+    Time series from the rollup: one row per bucket (and per combination
+    of the `group_by` columns), oldest first. Dates are "YYYY-MM-DD"
+    strings; date_to is inclusive.
+    """
+    r = models.DailyBatchRollup
+    period = func.substr(r.day, 1, BUCKETS[bucket]).label("period")
+    groups = [getattr(r, c) for c in group_by]
+
+    query = db.query(
+        period, *groups,
+        func.sum(r.batch_count), func.sum(r.total_kg),
+        func.sum(r.freshness_sum), func.sum(r.freshness_count), func.sum(r.flagged_count),
+    )
+    if date_from:
+        query = query.filter(r.day >= date_from)
+    if date_to:
+        query = query.filter(r.day <= date_to)
+    if crop:
+        query = query.filter(r.crop_name == crop)
+    if region:
+        query = query.filter(r.region == region)
+    if status:
+        query = query.filter(r.status == status)
+    rows = query.group_by(period, *groups).order_by(period, *groups).all()
+
+    out = []
+    for row in rows:
+        count, kg, fresh_sum, fresh_n, flagged = row[-5:]
+        if not count:
+            continue
+        point = {"period": row[0]}
+        point.update(zip(group_by, row[1:1 + len(groups)]))
+        point.update({
+            "batch_count": count,
+            "total_kg": round(kg or 0.0, 2),
+            "avg_freshness_score": round(fresh_sum / fresh_n, 2) if fresh_n else None,
+            "flagged_count": flagged,
+        })
+        out.append(point)
+    return out
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--rebuild" in sys.argv:
+        from database import SessionLocal
+
+        session = SessionLocal()
+        try:
+            rebuild(session)
+            print({"rows": session.query(models.DailyBatchRollup.id).count()})
+        finally:
+            session.close()
+    else:
+        print("usage: python -m utils.daily_rollups --rebuild")
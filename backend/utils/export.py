@@ -0,0 +1,138 @@
+# backend/utils/export.py
+import csv
+import io
+import os
+import zlib
+
+from sqlalchemy import func
+
+from database import SessionLocal
+import models
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "5000"))
+
+EXPORT_COLUMNS = ["batch_id", "crop_name", "quantity", "region", "harvest_date", "status"]
+
+FORMATS = {
+    # format: (media type, file extension)
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def filtered_rows(db, date_from=None, date_to=None, region=None, status=None, crop=None):
+    """Export columns for the matching batches, fetched EXPORT_CHUNK_ROWS at a time."""
+    query = db.query(*(getattr(models.Batch, c) for c in EXPORT_COLUMNS))
+    if date_from:
+        query = query.filter(models.Batch.harvest_date >= date_from)
+    if date_to:
+        query = query.filter(models.Batch.harvest_date < date_to)
+    if region:
+        query = query.filter(models.Batch.region == region)
+    if status:
+        query = query.filter(models.Batch.status == status)
+    if crop:
+        query = query.filter(func.lower(models.Batch.crop_name) == crop.lower())
+    return query.order_by(models.Batch.id).execution_options(stream_results=True).yield_per(EXPORT_CHUNK_ROWS)
+
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in _chunks(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        out, self._parts = b"".join(self._parts), []
+        return out
+
+
+def _arrow_schema(pa):
+    return pa.schema([
+        ("batch_id", pa.string()),
+        ("crop_name", pa.string()),
+        ("quantity", pa.float64()),
+        ("region", pa.string()),
+        ("harvest_date", pa.timestamp("us")),
+        ("status", pa.string()),
+    ])
+
+
+def iter_columnar(rows, format: str):
+    """Arrow IPC stream or Parquet, one record batch / row group per chunk."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(pa)
+    sink = _Sink()
+    if format == "parquet":
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        write = writer.write_table
+        to_batch = pa.Table.from_pylist
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+        to_batch = pa.RecordBatch.from_pylist
+
+    try:
+        for chunk in _chunks(rows):
+            write(to_batch([dict(zip(EXPORT_COLUMNS, r)) for r in chunk], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out:
+            yield out
+    yield compressor.flush()
+
+
+def stream_export(format: str, compress: bool, **filters):
+    """
+    Generator of the encoded export. Owns its own session, since it is
+    consumed after the request handler (and its dependencies) returned.
+    """
+    db = SessionLocal()
+    try:
+        rows = filtered_rows(db, **filters)
+        chunks = iter_csv(rows) if format == "csv" else iter_columnar(rows, format)
+        yield from (gzip_stream(chunks) if compress else chunks)
+    finally:
+        db.close()
@@ -0,0 +1,60 @@
+# backend/utils/harvest_totals.py
+from sqlalchemy import func, literal
+
+import models
+from utils.rollups import BatchRollup
+
+ALL_TIME = "all"
+
+
+def period_of(harvest_date) -> str:
+    return harvest_date.strftime("%Y-%m")
+
+
+def add(deltas, batch: dict, sign: int = 1):
+    """Accumulates one batch (sign -1 removes it) into {(farmer_id, period): [kg, count]}."""
+    if batch["farmer_id"] is None:
+        return
+    harvest_date = batch["harvest_date"]
+    periods = [ALL_TIME] if harvest_date is None else [ALL_TIME, period_of(harvest_date)]
+    for period in periods:
+        d = deltas.setdefault((batch["farmer_id"], period), [0.0, 0])
+        d[0] += sign * (batch["quantity"] or 0.0)
+        d[1] += sign
+
+
+def rebuild(db):
+    """Recomputes the whole rollup from the batches table."""
+    table = models.FarmerHarvestTotal.__table__
+    batches = models.Batch
+    db.execute(table.delete())
+
+    db.execute(table.insert().from_select(
+        ["farmer_id", "period", "total_kg", "batch_count"],
+        db.query(
+            batches.farmer_id, literal(ALL_TIME),
+            func.coalesce(func.sum(batches.quantity), 0.0), func.count(batches.id),
+        ).filter(batches.farmer_id.isnot(None)).group_by(batches.farmer_id).statement,
+    ))
+
+    month = func.strftime("%Y-%m", batches.harvest_date)
+    db.execute(table.insert().from_select(
+        ["farmer_id", "period", "total_kg", "batch_count"],
+        db.query(
+            batches.farmer_id, month,
+            func.coalesce(func.sum(batches.quantity), 0.0), func.count(batches.id),
+        ).filter(batches.farmer_id.isnot(None), batches.harvest_date.isnot(None))
+        .group_by(batches.farmer_id, month).statement,
+    ))
+    db.commit()
+
+
+rollup = BatchRollup(
+    "farmer harvest totals",
+    models.FarmerHarvestTotal.__table__,
+    key_columns=("farmer_id", "period"),
+    sum_columns=("total_kg", "batch_count"),
+    tracked=("quantity", "farmer_id", "harvest_date"),
+    add=add,
+    rebuild=rebuild,
+)
@@ -0,0 +1,370 @@
+# backend/utils/ingestion.py
+import os
+import datetime
+import logging
+import queue
+from pathlib import Path
+
+from database import SessionLocal
+import models
+from utils.job_queue import JobQueue
+from utils import settings
+
+from utils.process_pool import image_pool
+
+from ai.fraud_detection import (
+    check_banned_zone,
+    check_crop_location,
+    check_yield,
+    check_exif,
+    check_gps_mismatch,
+    parse_banned_regions,
+)
+from ai.freshness_analysis import analyze_freshness, fallback_ai_result
+from ai.blockchain import generate_origin_hash, hash_onchain_record
+from ai.image_tasks import inspect_image
+from ai.phash_index import phash_index
+from ai.vector_index import embedding_index
+from ai import embedding_store
+
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "4"))
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", "10000"))
+# Max differing bits (of 64) for two photos to count as the same shot
+PHASH_MAX_DISTANCE = int(os.getenv("PHASH_MAX_DISTANCE", "6"))
+# Cosine similarity above which two photos count as the same scene
+EMBED_MATCH_THRESHOLD = float(os.getenv("EMBED_MATCH_THRESHOLD", "0.97"))
+EMBED_TOP_K = 5
+# Runs of a job before it is left FAILED and the farmer told
+INGESTION_MAX_ATTEMPTS = int(os.getenv("INGESTION_MAX_ATTEMPTS", "3"))
+
+logger = logging.getLogger(__name__)
+
+def image_path_from_url(image_url: str) -> Path:
+    # "/static/uploads/x.jpg" -> "static/uploads/x.jpg"
+    return Path(image_url.lstrip("/"))
+
+
+def inspect_images(image_paths):
+    """[(ImageMetadata, dhash), ...] per path, computed in parallel in the image pool."""
+    futures = [image_pool.submit(inspect_image, str(p)) for p in image_paths]
+    return [f.result() for f in futures]
+
+
+def check_recycled_photos(batch: models.Batch, matched: set, hashes):
+    """
+    Looks each batch image's dHash up against every historical image.
+    Stores the hash on the BatchImage and adds it to the shared index.
+    """
+    reasons = []
+
+    for img, value in zip(batch.images, hashes):
+        img.phash = f"{value:016x}"
+
+        for other_batch_id, distance in phash_index.query(value, PHASH_MAX_DISTANCE):
+            if other_batch_id == batch.batch_id or other_batch_id in matched:
+                continue
+            matched.add(other_batch_id)
+            reasons.append(
+                f"Photo reused from batch {other_batch_id} (distance {distance})"
+            )
+
+        phash_index.add(value, batch.batch_id)
+
+    return reasons
+
+
+def _embed(image_paths):
+    try:
+        from ai.vectorize import images_to_vectors
+        return images_to_vectors(image_paths)
+    except (ImportError, RuntimeError) as e:
+        # torch or local weights unavailable on this host
+        logger.warning("Skipping embedding check: %s", e)
+        return None
+
+
+def check_similar_photos(batch: models.Batch, matched: set):
+    """
+    Embeds each batch image, screens it against the whole corpus with a
+    top-k cosine search, then stores the vector and indexes it.
+    """
+    vectors = _embed([image_path_from_url(img.image_url) for img in batch.images])
+    if vectors is None:
+        return []
+
+    reasons = []
+    for vector in vectors:
+        for (other_batch_id, _), similarity in embedding_index.search(vector, EMBED_TOP_K):
+            if similarity < EMBED_MATCH_THRESHOLD:
+                break
+            if other_batch_id == batch.batch_id or other_batch_id in matched:
+                continue
+            matched.add(other_batch_id)
+            reasons.append(
+                f"Photo closely resembles batch {other_batch_id} (similarity {similarity:.2f})"
+            )
+
+    # Rows are written before the batch commits; if it never does, they
+    # are unreferenced and go at the next compaction
+    store = embedding_store.embedding_store
+    first = store.append(vectors)
+    view = store.view()
+    for i, (img, vector) in enumerate(zip(batch.images, vectors)):
+        img.embedding_row = first + i
+        embedding_index.add((batch.batch_id, img.id), vector, row=first + i, vectors=view)
+
+    return reasons
+
+
+def rebuild_embedding_index():
+    """Maps the embedding store (no copy) and labels its rows from the DB."""
+    db = SessionLocal()
+    try:
+        store = embedding_store.open_store(db)
+        view = store.view()
+        payloads = [None] * len(view)
+        rows = (
+            db.query(models.Batch.batch_id, models.BatchImage.id, models.BatchImage.embedding_row)
+            .join(models.Batch, models.BatchImage.batch_id == models.Batch.id)
+            .filter(models.BatchImage.embedding_row.isnot(None))
+            .yield_per(10000)
+        )
+        for batch_id, image_id, row in rows:
+            if row < len(payloads):
+                payloads[row] = (batch_id, image_id)
+    finally:
+        db.close()
+
+    embedding_index.rebuild(payloads, view, normalized=True)
+
+
+def rebuild_phash_index():
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(models.BatchImage.phash, models.Batch.batch_id)
+            .join(models.Batch, models.BatchImage.batch_id == models.Batch.id)
+            .filter(models.BatchImage.phash.isnot(None))
+            .yield_per(10000)
+        )
+        phash_index.rebuild(rows)
+    finally:
+        db.close()
+
+
+def collect_fraud_reasons(batch: models.Batch, image_paths):
+    fraud_reasons = []
+
+    region_safe = batch.region if batch.region else "Unknown"
+
+    f1, r1 = check_crop_location(batch.crop_name, region_safe)
+    f2, r2 = check_yield(batch.crop_name, batch.quantity, 1)  # assume 1 acre
+    f5, r5 = check_banned_zone(region_safe, parse_banned_regions(settings.get("BANNED_ZONES")))
+
+    if f1:
+        fraud_reasons.append(r1)
+    if f2:
+        fraud_reasons.append(r2)
+    if f5:
+        fraud_reasons.append(r5)
+
+    inspected = inspect_images(image_paths)
+
+    matched = set()
+    fraud_reasons.extend(check_recycled_photos(batch, matched, [h for _, h in inspected]))
+    fraud_reasons.extend(check_similar_photos(batch, matched))
+
+    meta = inspected[0][0]
+    if not meta.exif:
+        fraud_reasons.append("Missing EXIF metadata")
+    else:
+        f3, r3 = check_exif(meta)
+        if f3:
+            fraud_reasons.append(r3)
+
+        img_lat, img_lng = meta.gps
+        if img_lat is not None:
+            f4, r4 = check_gps_mismatch(batch.latitude, batch.longitude, img_lat, img_lng)
+            if f4:
+                fraud_reasons.append(f"GPS mismatch warning: {r4}")
+
+    return fraud_reasons
+
+
+def verify_batch(db, batch: models.Batch, image_paths):
+    """
+    Runs fraud rules, then AI freshness + origin hashing.
+    Moves the batch from HARVESTED to FLAGGED or VERIFIED. Caller commits.
+    """
+    fraud_reasons = collect_fraud_reasons(batch, image_paths)
+
+    if fraud_reasons:
+        batch.status = models.BatchStatus.FLAGGED
+        batch.processor_notes = "; ".join(fraud_reasons)
+        batch.is_verified = False
+        batch.expiry_date = None
+        batch.estimated_shelf_life = None
+        return fraud_reasons
+
+    # ---- AI FRESHNESS ----
+    ai = analyze_freshness(image_paths[0])
+
+    if "error" in ai:
+        ai = fallback_ai_result()
+
+    batch.freshness_score = ai["freshness_score"]
+    batch.quality_grade = ai["quality_grade"]
+    batch.estimated_shelf_life = ai["estimated_shelf_life_days"]
+    batch.visual_defects = ", ".join(ai.get("visual_defects", []))
+
+    batch.expiry_date = (
+        datetime.datetime.utcnow()
+        + datetime.timedelta(days=ai["estimated_shelf_life_days"])
+    )
+
+    batch.origin_hash = generate_origin_hash(
+        latitude=batch.latitude,
+        longitude=batch.longitude,
+        region=batch.region or "Local Farm",
+    )
+
+    onchain_payload = {
+        "batchId": batch.batch_id,
+        "cropType": batch.crop_name,
+        "originHash": batch.origin_hash,
+        "expiryDate": batch.expiry_date.date().isoformat(),
+        "timestamp": datetime.datetime.utcnow().isoformat(),
+    }
+
+    # Pre-chain content hash (tx hash later)
+    batch.blockchain_tx_hash = hash_onchain_record(onchain_payload)
+
+    batch.status = models.BatchStatus.VERIFIED
+    batch.is_verified = True
+
+    db.add(
+        models.BatchEvent(
+            batch_id=batch.id,
+            event_type="VERIFIED",
+            description="Batch passed fraud checks and AI verification",
+            location=f"{batch.latitude},{batch.longitude}",
+        )
+    )
+    return []
+
+
+def _notify_farmer(db, batch: models.Batch, fraud_reasons):
+    if fraud_reasons:
+        db.add(models.Notification(
+            user_id=batch.farmer_id,
+            type=models.NotificationType.ALERT,
+            sender="System",
+            priority="Important",
+            message=f"Batch {batch.batch_id} was flagged: {'; '.join(fraud_reasons)}",
+        ))
+    else:
+        db.add(models.Notification(
+            user_id=batch.farmer_id,
+            type=models.NotificationType.SUCCESS,
+            sender="System",
+            message=f"Batch {batch.batch_id} verified (Grade {batch.quality_grade})",
+        ))
+
+
+def _notify_failed(db, batch: models.Batch):
+    db.add(models.Notification(
+        user_id=batch.farmer_id,
+        type=models.NotificationType.ALERT,
+        sender="System",
+        priority="Important",
+        message=f"Batch {batch.batch_id} could not be verified; please re-upload its photos or contact support",
+    ))
+
+
+def run_ingestion_job(job_id: str):
+    """
+    Verifies a job's batch. A failed run is re-queued until it has failed
+    INGESTION_MAX_ATTEMPTS times; then the job is left FAILED (see
+    retry_ingestion_job) and the farmer is told.
+    """
+    db = SessionLocal()
+    requeue = False
+    try:
+        job = db.get(models.IngestionJob, job_id)
+        if not job or job.status == models.JobStatus.DONE:
+            return
+
+        job.status = models.JobStatus.RUNNING
+        job.started_at = datetime.datetime.utcnow()
+        db.commit()
+
+        try:
+            batch = job.batch
+            image_paths = [image_path_from_url(img.image_url) for img in batch.images]
+            fraud_reasons = verify_batch(db, batch, image_paths)
+            _notify_farmer(db, batch, fraud_reasons)
+            job.status = models.JobStatus.DONE
+        except Exception as e:
+            db.rollback()
+            logger.warning("Ingestion job %s failed: %s", job_id, e)
+            job.attempts = (job.attempts or 0) + 1
+            job.error = str(e)
+            if job.attempts < INGESTION_MAX_ATTEMPTS:
+                job.status = models.JobStatus.QUEUED
+                requeue = True
+            else:
+                job.status = models.JobStatus.FAILED
+                _notify_failed(db, job.batch)
+
+        job.finished_at = datetime.datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+
+    if requeue:
+        try:
+            # Never block a worker on its own queue; a QUEUED job is
+            # picked up again at the next start otherwise
+            ingestion_queue.submit(job_id, block=False)
+        except queue.Full:
+            logger.warning("Ingestion queue full; job %s waits for a restart", job_id)
+
+
+def retry_ingestion_job(db, job: models.IngestionJob):
+    """Puts a FAILED job back on the queue with a fresh set of attempts."""
+    job.status = models.JobStatus.QUEUED
+    job.attempts = 0
+    job.error = None
+    job.started_at = job.finished_at = None
+    db.commit()
+    ingestion_queue.submit(job.id)
+
+
+ingestion_queue = JobQueue(
+    run_ingestion_job,
+    workers=INGESTION_WORKERS,
+    maxsize=INGESTION_QUEUE_SIZE,
+    name="ingestion",
+)
+
+
+def start_ingestion_workers():
+    """Starts the pool and re-queues jobs left unfinished by a previous run."""
+    rebuild_phash_index()
+    rebuild_embedding_index()
+    ingestion_queue.start()
+
+    db = SessionLocal()
+    try:
+        unfinished = db.query(models.IngestionJob.id).filter(
+            models.IngestionJob.status.in_([models.JobStatus.QUEUED, models.JobStatus.RUNNING])
+        ).order_by(models.IngestionJob.created_at).all()
+    finally:
+        db.close()
+
+    for (job_id,) in unfinished:
+        ingestion_queue.submit(job_id)
+
+
+def stop_ingestion_workers():
+    ingestion_queue.stop()
@@ -0,0 +1,60 @@
+# backend/utils/job_queue.py
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class JobQueue:
+    """
+    In-process worker pool fed by a local queue.
+
+    Stand-in for an external broker: jobs are plain ids, and the handler
+    reloads whatever state it needs, so swapping the queue out later does
+    not change callers.
+    """
+
+    def __init__(self, handler, workers: int = 4, maxsize: int = 0, name: str = "jobs"):
+        self.handler = handler
+        self.workers = workers
+        self.name = name
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(
+                target=self._run, name=f"{self.name}-{i}", daemon=True
+            )
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, job_id, block: bool = True, timeout: float = None):
+        self._queue.put(job_id, block=block, timeout=timeout)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self, timeout: float = 10.0):
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for t in self._threads:
+            t.join(timeout=timeout)
+        self._threads = []
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                if job_id is _STOP:
+                    return
+                self.handler(job_id)
+            except Exception:
+                logger.exception("%s: job %s failed", self.name, job_id)
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,179 @@
+# backend/utils/map_tiles.py
+import math
+import os
+
+from sqlalchemy import event, func, cast, inspect, Integer
+from sqlalchemy.orm import Session
+
+import models
+from ai.result_cache import ResultCache
+from utils.versioned_cache import bump_version, read_version
+
+# Each tile is split into CELLS_PER_TILE x CELLS_PER_TILE clusters
+CELLS_PER_TILE = 8
+# At this zoom and above, individual batches are returned too
+MAP_POINTS_ZOOM = int(os.getenv("MAP_POINTS_ZOOM", "13"))
+MAP_MAX_TILES = int(os.getenv("MAP_MAX_TILES", "64"))
+MAP_MAX_POINTS = int(os.getenv("MAP_MAX_POINTS", "2000"))
+# Same rule as the legacy map: more than this many batches in one area is over-farming
+STRESS_RED_COUNT = 5
+
+VERSION_KEY = "MAP_DATA_VERSION"
+# Moving a batch changes which tiles hold it, so it moves the version
+LOCATION_COLUMNS = ("latitude", "longitude")
+
+# New batches and crop/quantity edits reach cached tiles within this
+MAP_TILE_TTL = int(os.getenv("MAP_TILE_TTL", "300"))
+
+map_tile_cache = ResultCache(
+    path=os.getenv("MAP_TILE_CACHE_PATH", "map_tiles.db"),
+    ttl_seconds=MAP_TILE_TTL,
+    memory_size=4096,
+    max_entries=200000,
+)
+
+
+class TooManyTiles(ValueError):
+    pass
+
+
+def tile_size(zoom: int) -> float:
+    """Tile edge in degrees; a plain lat/lng grid, 2^zoom tiles around the globe."""
+    return 360.0 / (2 ** zoom)
+
+
+def tiles_for_bbox(min_lat, min_lng, max_lat, max_lng, zoom: int):
+    size = tile_size(zoom)
+    x0, x1 = math.floor((min_lng + 180) / size), math.floor((max_lng + 180) / size)
+    y0, y1 = math.floor((min_lat + 90) / size), math.floor((max_lat + 90) / size)
+    count = (x1 - x0 + 1) * (y1 - y0 + 1)
+    if count > MAP_MAX_TILES:
+        raise TooManyTiles(f"Bounding box covers {count} tiles at zoom {zoom}; zoom out or shrink it")
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def data_version(db) -> int:
+    """Part of every tile cache key; see _bump_on_batch_change."""
+    return read_version(db, VERSION_KEY)
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_batch_change(session, flush_context):
+    """
+    Moves the map version, in the same transaction, whenever a flush
+    deletes or moves a batch, so it leaves every cached tile at once.
+    Inserts and crop/quantity edits do not: a version bump invalidates
+    every tile, and at upload rates that would leave nothing cached, so
+    those reach the tiles within MAP_TILE_TTL. Bulk Core updates of
+    LOCATION_COLUMNS must bump it themselves.
+    """
+    changed = any(isinstance(obj, models.Batch) for obj in session.deleted)
+    for obj in session.dirty:
+        if changed:
+            break
+        if isinstance(obj, models.Batch):
+            state = inspect(obj)
+            changed = any(state.attrs[a].history.has_changes() for a in LOCATION_COLUMNS)
+    if changed:
+        bump_version(session.connection(), VERSION_KEY)
+
+
+def aggregate_tile(db, zoom: int, x: int, y: int) -> list:
+    """
+    Clusters one tile's batches into CELLS_PER_TILE^2 cells with a single
+    GROUP BY. Returns a list of cell dicts (empty cells omitted).
+    """
+    size = tile_size(zoom)
+    cell = size / CELLS_PER_TILE
+    min_lng, min_lat = x * size - 180, y * size - 90
+
+    cx = cast((models.Batch.longitude - min_lng) / cell, Integer).label("cx")
+    cy = cast((models.Batch.latitude - min_lat) / cell, Integer).label("cy")
+    rows = (
+        db.query(
+            cx, cy,
+            models.Batch.crop_name,
+            func.count(models.Batch.id),
+            func.sum(models.Batch.quantity),
+            func.avg(models.Batch.latitude),
+            func.avg(models.Batch.longitude),
+        )
+        .filter(
+            models.Batch.longitude >= min_lng, models.Batch.longitude < min_lng + size,
+            models.Batch.latitude >= min_lat, models.Batch.latitude < min_lat + size,
+        )
+        .group_by(cx, cy, models.Batch.crop_name)
+        .all()
+    )
+
+    cells = {}
+    for ix, iy, crop, count, total_kg, lat, lng in rows:
+        # Float rounding can put a point on the far edge into cell 8
+        ix, iy = min(ix, CELLS_PER_TILE - 1), min(iy, CELLS_PER_TILE - 1)
+        c = cells.setdefault((ix, iy), {"count": 0, "total_kg": 0.0, "lat": 0.0, "lng": 0.0, "crops": {}})
+        c["count"] += count
+        c["total_kg"] += total_kg or 0.0
+        # Count-weighted centroid of the batches, not the cell centre
+        c["lat"] += lat * count
+        c["lng"] += lng * count
+        c["crops"][crop or "Unknown"] = c["crops"].get(crop or "Unknown", 0) + count
+
+    out = []
+    for (ix, iy), c in cells.items():
+        n = c["count"]
+        out.append({
+            "cell": f"{zoom}/{x * CELLS_PER_TILE + ix}/{y * CELLS_PER_TILE + iy}",
+            "lat": round(c["lat"] / n, 5),
+            "lng": round(c["lng"] / n, 5),
+            "count": n,
+            "total_kg": round(c["total_kg"], 2),
+            "dominant_crop": max(c["crops"], key=c["crops"].get),
+            "crops": c["crops"],
+            "stress_score": n * 10,
+            "zone_status": "RED" if n > STRESS_RED_COUNT else "GREEN",
+        })
+    return out
+
+
+def cached_tile(db, zoom: int, x: int, y: int, version: int) -> list:
+    key = f"{version}:{zoom}/{x}/{y}"
+    cells = map_tile_cache.get(key)
+    if cells is None:
+        cells = aggregate_tile(db, zoom, x, y)
+        map_tile_cache.set(key, cells)
+    return cells
+
+
+def points_in_bbox(db, min_lat, min_lng, max_lat, max_lng, limit: int = MAP_MAX_POINTS) -> list:
+    rows = (
+        db.query(
+            models.Batch.batch_id,
+            models.Batch.latitude,
+            models.Batch.longitude,
+            models.Batch.crop_name,
+            models.Batch.region,
+            models.Batch.quantity,
+            models.Batch.status,
+            func.coalesce(models.User.full_name, "Unknown"),
+        )
+        .outerjoin(models.User, models.Batch.farmer_id == models.User.id)
+        .filter(
+            models.Batch.latitude.between(min_lat, max_lat),
+            models.Batch.longitude.between(min_lng, max_lng),
+        )
+        .limit(limit)
+        .all()
+    )
+    return [
+        {
+            "batch_id": batch_id,
+            "lat": lat,
+            "lng": lng,
+            "crop": crop,
+            "region": region or "Unknown",
+            "quantity": quantity,
+            "status": status,
+            "farmer": farmer,
+        }
+        for batch_id, lat, lng, crop, region, quantity, status, farmer in rows
+    ]
@@ -0,0 +1,42 @@
+# backend/utils/migrations.py
+import logging
+
+from sqlalchemy import inspect, text
+
+from database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def upgrade(engine):
+    """
+    Brings an existing database up to the models. create_all only creates
+    missing tables, so columns and indexes added to existing tables since
+    are added here. New columns must be nullable; existing rows get the
+    column's server_default, or NULL until their backfill fills them
+    (e.g. `python -m utils.backfill_images`).
+    """
+    import models  # noqa: F401  registers every table on Base
+
+    existing = set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            have = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in have:
+                    continue
+                if not column.nullable:
+                    raise RuntimeError(f"Cannot add NOT NULL column {table.name}.{column.name}")
+                ddl = f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column.type.compile(dialect=conn.dialect)}'
+                if column.server_default is not None:
+                    ddl += f" DEFAULT '{column.server_default.arg}'"
+                conn.execute(text(ddl))
+                logger.info("Added column %s.%s", table.name, column.name)
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
@@ -0,0 +1,120 @@
+# backend/utils/process_pool.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# 0 runs every task inline in the calling thread
+IMAGE_POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Tasks submitted but not yet finished; further submits wait for a slot
+IMAGE_POOL_MAX_PENDING = int(os.getenv("IMAGE_POOL_MAX_PENDING", "128"))
+# How long a request waits for a slot before giving up
+IMAGE_POOL_QUEUE_TIMEOUT = float(os.getenv("IMAGE_POOL_QUEUE_TIMEOUT", "30"))
+
+
+class PoolBusy(RuntimeError):
+    pass
+
+
+def _start_method() -> str:
+    # forkserver is POSIX-only; Windows has spawn alone
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class ImagePool:
+    """
+    Process pool for CPU-bound image work (decoding, hashing, resizing),
+    so it runs on all cores instead of contending for the GIL with the
+    API threads.
+
+    Tasks get file paths, never raw upload bytes: callers stage uploads
+    to disk first and workers read them from there. Workers are started
+    with forkserver (spawn where that is unavailable), so they do not
+    inherit the API's threads or sockets.
+    """
+
+    def __init__(self, workers: int, max_pending: int, queue_timeout: float):
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context(_start_method()),
+                    )
+                    logger.info("Image pool started with %d workers", self.workers)
+        return self._executor
+
+    def submit(self, fn, *args, timeout: float = None) -> Future:
+        """
+        Schedules fn(*args) in a worker. Blocks while IMAGE_POOL_MAX_PENDING
+        tasks are outstanding; raises PoolBusy if `timeout` passes first.
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolBusy("Image workers are saturated")
+
+        if self.workers <= 0:
+            future = Future()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._slots.release()
+            return future
+
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            self._reset()
+            self._slots.release()
+            raise
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def run(self, fn, *args):
+        """Runs fn(*args) in a worker and waits for the result."""
+        try:
+            return self.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); start fresh for the next task
+            self._reset()
+            raise
+
+    async def run_async(self, fn, *args):
+        """run() for the event loop; raises PoolBusy after queue_timeout."""
+        future = await asyncio.to_thread(self.submit, fn, *args, timeout=self.queue_timeout)
+        try:
+            return await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            self._reset()
+            raise
+
+    def _reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+image_pool = ImagePool(IMAGE_POOL_WORKERS, IMAGE_POOL_MAX_PENDING, IMAGE_POOL_QUEUE_TIMEOUT)
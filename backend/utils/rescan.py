@@ -0,0 +1,215 @@
+# backend/utils/rescan.py
+import os
+import datetime
+import logging
+import threading
+import time
+import uuid
+
+from sqlalchemy import insert, update
+
+from database import SessionLocal
+import models
+from utils.job_queue import JobQueue
+from utils import daily_rollups, settings
+
+from ai import bulk_screening, crop_rules
+from ai.fraud_detection import check_banned_zone, parse_banned_regions
+
+RESCAN_CHUNK_SIZE = int(os.getenv("RESCAN_CHUNK_SIZE", "2000"))
+
+logger = logging.getLogger(__name__)
+
+_stopping = threading.Event()
+
+
+def start_rescan(db, trigger: str) -> models.RescanJob:
+    """
+    Queues a rescan against the current settings. Any rescan still pending
+    is cancelled, since the new one covers every batch again.
+    """
+    db.query(models.RescanJob).filter(
+        models.RescanJob.status.in_([models.JobStatus.QUEUED, models.JobStatus.RUNNING])
+    ).update({models.RescanJob.status: models.JobStatus.CANCELLED}, synchronize_session=False)
+
+    job = models.RescanJob(
+        id=str(uuid.uuid4()),
+        trigger=trigger,
+        banned_regions=settings.get("BANNED_ZONES"),
+        total=db.query(models.Batch.id).filter(
+            models.Batch.status == models.BatchStatus.VERIFIED
+        ).count(),
+    )
+    db.add(job)
+    db.commit()
+    rescan_queue.submit(job.id)
+    return job
+
+
+def _next_chunk(db, after_id: int):
+    return (
+        db.query(
+            models.Batch.id,
+            models.Batch.batch_id,
+            models.Batch.crop_name,
+            models.Batch.region,
+            models.Batch.quantity,
+            models.Batch.latitude,
+            models.Batch.longitude,
+            models.Batch.farmer_id,
+            models.Batch.harvest_date,
+            models.Batch.freshness_score,
+        )
+        .filter(models.Batch.id > after_id, models.Batch.status == models.BatchStatus.VERIFIED)
+        .order_by(models.Batch.id)
+        .limit(RESCAN_CHUNK_SIZE)
+        .all()
+    )
+
+
+def screen_chunk(rows, banned: frozenset):
+    """Returns {row index: [reason, ...]} for the rows that now fail a rule."""
+    ids, batch_ids, crops, regions, quantity, *_ = zip(*rows)
+    cols = bulk_screening.BatchColumns(ids, batch_ids, crops, regions, [q or 0.0 for q in quantity])
+    rules = crop_rules.current()
+    flags = bulk_screening.screen(cols, rules=rules)
+    reasons = bulk_screening.flag_reasons(cols, flags, rules=rules)
+
+    out = {}
+    for i, batch_id in enumerate(cols.batch_ids):
+        found = list(reasons.get(batch_id, []))
+        in_banned_zone, reason = check_banned_zone(cols.regions[i], banned)
+        if in_banned_zone:
+            found.append(reason)
+        if found:
+            out[i] = found
+    return out
+
+
+def _apply_chunk(db, rows, flagged):
+    """Bulk-flags the failing rows and writes their events and notifications."""
+    if not flagged:
+        return
+    now = datetime.datetime.utcnow()
+
+    # Same fields verify_batch clears when it flags; one executemany UPDATE by id
+    db.execute(update(models.Batch), [
+        {
+            "id": rows[i].id,
+            "status": models.BatchStatus.FLAGGED,
+            "is_verified": False,
+            "processor_notes": "; ".join(reasons),
+            "expiry_date": None,
+            "estimated_shelf_life": None,
+        }
+        for i, reasons in flagged.items()
+    ])
+
+    # The bulk update bypasses the ORM listener; move the rows between statuses here
+    deltas = {}
+    for i in flagged:
+        row = rows[i]._asdict()
+        daily_rollups.add(deltas, {**row, "status": models.BatchStatus.VERIFIED}, sign=-1)
+        daily_rollups.add(deltas, {**row, "status": models.BatchStatus.FLAGGED})
+    daily_rollups.rollup.apply_deltas(db.connection(), deltas)
+
+    db.execute(insert(models.BatchEvent), [
+        {
+            "batch_id": rows[i].id,
+            "timestamp": now,
+            "event_type": "FLAGGED",
+            "description": "Rescan after rule change: " + "; ".join(reasons),
+            "location": f"{rows[i].latitude},{rows[i].longitude}",
+        }
+        for i, reasons in flagged.items()
+    ])
+    db.execute(insert(models.Notification), [
+        {
+            "user_id": rows[i].farmer_id,
+            "type": models.NotificationType.ALERT,
+            "sender": "System",
+            "priority": "Important",
+            "message": f"Batch {rows[i].batch_id} was flagged: {'; '.join(reasons)}",
+            "is_read": False,
+            "timestamp": now,
+        }
+        for i, reasons in flagged.items()
+    ])
+
+
+def run_rescan_job(job_id: str):
+    """
+    Walks the verified batches in id order, one chunk per transaction.
+    The chunk's status updates and the job's checkpoint commit together,
+    so a restart resumes after the last finished chunk.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(models.RescanJob, job_id)
+        if not job or job.status not in (models.JobStatus.QUEUED, models.JobStatus.RUNNING):
+            return
+
+        job.status = models.JobStatus.RUNNING
+        job.started_at = job.started_at or datetime.datetime.utcnow()
+        db.commit()
+        banned = parse_banned_regions(job.banned_regions)
+
+        try:
+            while not _stopping.is_set():
+                # A newer rescan may have cancelled this one
+                if db.query(models.RescanJob.status).filter(
+                    models.RescanJob.id == job.id
+                ).scalar() == models.JobStatus.CANCELLED:
+                    return
+
+                started = time.perf_counter()
+                rows = _next_chunk(db, job.checkpoint_id)
+                if not rows:
+                    job.status = models.JobStatus.DONE
+                    job.finished_at = datetime.datetime.utcnow()
+                    db.commit()
+                    logger.info("Rescan %s done: %d checked, %d flagged", job.id, job.processed, job.flagged)
+                    return
+
+                flagged = screen_chunk(rows, banned)
+                _apply_chunk(db, rows, flagged)
+
+                job.checkpoint_id = rows[-1].id
+                job.processed += len(rows)
+                job.flagged += len(flagged)
+                job.active_seconds += time.perf_counter() - started
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            job.status = models.JobStatus.FAILED
+            job.error = str(e)
+            job.finished_at = datetime.datetime.utcnow()
+            db.commit()
+    finally:
+        db.close()
+
+
+rescan_queue = JobQueue(run_rescan_job, workers=1, name="rescan")
+
+
+def start_rescan_workers():
+    """Starts the worker and resumes a rescan interrupted by a restart."""
+    _stopping.clear()
+    rescan_queue.start()
+
+    db = SessionLocal()
+    try:
+        unfinished = db.query(models.RescanJob.id).filter(
+            models.RescanJob.status.in_([models.JobStatus.QUEUED, models.JobStatus.RUNNING])
+        ).order_by(models.RescanJob.created_at).all()
+    finally:
+        db.close()
+
+    for (job_id,) in unfinished:
+        rescan_queue.submit(job_id)
+
+
+def stop_rescan_workers():
+    # Running jobs stop at the next chunk boundary and stay RUNNING
+    _stopping.set()
+    rescan_queue.stop()
@@ -0,0 +1,135 @@
+# backend/utils/rollups.py
+import logging
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+_registered = []
+_tracked = set()
+
+
+def old_value(obj, attr):
+    """
+    The value `attr` had before this flush's changes to `obj`. Reliable for
+    attributes a registered rollup tracks, including on deleted rows.
+    """
+    history = inspect(obj).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+
+class BatchRollup:
+    """
+    A summary table of batches kept in step with ORM writes, in the same
+    transaction, plus a full rebuild for bulk changes.
+
+    `add(deltas, values, sign)` folds one batch into `deltas`, a dict of
+    {key tuple: [sum, ...]}; `values` maps each `tracked` attribute to its
+    value and `sign` is -1 to take the batch back out. Keys and sums are
+    written to `key_columns` and `sum_columns` of `table`. `rebuild(db)`
+    recomputes the table from scratch and commits.
+    """
+
+    def __init__(self, name, table, key_columns, sum_columns, tracked, add, rebuild):
+        self.name = name
+        self.table = table
+        self.key_columns = tuple(key_columns)
+        self.sum_columns = tuple(sum_columns)
+        self.tracked = tuple(tracked)
+        self.add = add
+        self.rebuild = rebuild
+
+    def apply_deltas(self, connection, deltas):
+        """Upserts the accumulated deltas; bulk Core writers call this themselves."""
+        rows = [
+            {**dict(zip(self.key_columns, key)), **dict(zip(self.sum_columns, sums))}
+            for key, sums in deltas.items()
+            if any(sums)
+        ]
+        if not rows:
+            return
+        stmt = insert(self.table)
+        connection.execute(
+            stmt.on_conflict_do_update(
+                index_elements=list(self.key_columns),
+                set_={c: self.table.c[c] + stmt.excluded[c] for c in self.sum_columns},
+            ),
+            rows,
+        )
+
+    def flush_deltas(self, session) -> dict:
+        """Deltas for the batches inserted, deleted or changed by a flush."""
+        deltas = {}
+        for obj in session.new:
+            if isinstance(obj, models.Batch):
+                self.add(deltas, {a: getattr(obj, a) for a in self.tracked}, 1)
+
+        for obj in session.deleted:
+            if isinstance(obj, models.Batch):
+                self.add(deltas, {a: old_value(obj, a) for a in self.tracked}, -1)
+
+        for obj in session.dirty:
+            if not isinstance(obj, models.Batch):
+                continue
+            state = inspect(obj)
+            if not any(state.attrs[a].history.has_changes() for a in self.tracked):
+                continue
+            self.add(deltas, {a: old_value(obj, a) for a in self.tracked}, -1)
+            self.add(deltas, {a: getattr(obj, a) for a in self.tracked}, 1)
+        return deltas
+
+    def ensure_built(self):
+        """Backfills the table on first start after it was added."""
+        from database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            empty = db.query(self.table.c[self.key_columns[0]]).first() is None
+            if empty and db.query(models.Batch.id).first() is not None:
+                logger.info("Building %s", self.name)
+                self.rebuild(db)
+        finally:
+            db.close()
+
+
+def _keep_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+def register(*rollups):
+    """
+    Starts keeping `rollups` in step with batch writes. Called once at
+    startup; calling it again with the same rollups is harmless.
+    """
+    for rollup in rollups:
+        if rollup in _registered:
+            continue
+        _registered.append(rollup)
+        # Setting an expired attribute (the usual case after a commit)
+        # skips loading the value it replaces unless history is active
+        for attr in set(rollup.tracked) - _tracked:
+            event.listen(getattr(models.Batch, attr), "set", _keep_old_value, active_history=True, retval=True)
+            _tracked.add(attr)
+
+    if not event.contains(Session, "after_flush", _apply_rollups):
+        event.listen(Session, "before_flush", _load_deleted)
+        event.listen(Session, "after_flush", _apply_rollups)
+
+
+def _load_deleted(session, flush_context, instances):
+    # A deleted row can no longer be loaded once its DELETE is flushed
+    for obj in session.deleted:
+        if isinstance(obj, models.Batch):
+            for attr in _tracked:
+                getattr(obj, attr)
+
+
+def _apply_rollups(session, flush_context):
+    for rollup in _registered:
+        deltas = rollup.flush_deltas(session)
+        if deltas:
+            rollup.apply_deltas(session.connection(), deltas)
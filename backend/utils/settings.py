@@ -0,0 +1,57 @@
+# backend/utils/settings.py
+import os
+
+from utils.versioned_cache import VersionedCache
+import models
+
+# Max staleness of another process's setting writes (see utils/versioned_cache.py)
+SETTINGS_RECHECK_SECONDS = float(os.getenv("SETTINGS_RECHECK_SECONDS", "5"))
+
+VERSION_KEY = "SETTINGS_VERSION"
+
+DEFAULTS = {
+    "MAX_HARVEST_LIMIT": "500",
+    "BANNED_ZONES": "",
+}
+
+
+def _load(db):
+    # Values and version from one query, so they always agree
+    values = dict(db.query(models.GlobalSettings.key, models.GlobalSettings.value).all())
+    return int(values.get(VERSION_KEY, 0)), values
+
+
+_cache = VersionedCache(VERSION_KEY, _load, SETTINGS_RECHECK_SECONDS)
+
+
+def get(key: str, default: str = None) -> str:
+    value = _cache.get().get(key)
+    if value is None:
+        return DEFAULTS.get(key) if default is None else default
+    return value
+
+
+def get_float(key: str, default: float = None) -> float:
+    value = get(key)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        if default is not None:
+            return default
+        return float(DEFAULTS[key])
+
+
+def set_many(db, values: dict):
+    """Writes settings and bumps the version in one commit."""
+    existing = {
+        s.key: s for s in
+        db.query(models.GlobalSettings).filter(models.GlobalSettings.key.in_(list(values))).all()
+    }
+    for key, value in values.items():
+        if key in existing:
+            existing[key].value = value
+        else:
+            db.add(models.GlobalSettings(key=key, value=value))
+    _cache.bump(db)
+    db.commit()
+    _cache.invalidate()
@@ -0,0 +1,213 @@
+# backend/utils/upload_utils.py
+import asyncio
+import os
+import hashlib
+import tempfile
+
+try:
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import MultipartParser, parse_options_header
+
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_BYTES", str(20 * 1024 * 1024)))
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", str(80 * 1024 * 1024)))
+MAX_FORM_FIELD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class MalformedUpload(ValueError):
+    pass
+
+
+class StagedUpload:
+    """An upload streamed to a temp file next to its final location."""
+
+    def __init__(self, filename: str, temp_path: str, sha256: str, size: int):
+        self.filename = filename
+        self.temp_path = temp_path
+        self.sha256 = sha256
+        self.size = size
+
+    def commit(self, final_path: str):
+        # Same directory, so this is a rename, not a copy
+        os.replace(self.temp_path, final_path)
+        self.temp_path = None
+
+    def discard(self):
+        if self.temp_path and os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+        self.temp_path = None
+
+
+def stage_stream(fileobj, filename: str, directory: str, max_bytes: int = MAX_UPLOAD_FILE_BYTES) -> StagedUpload:
+    """
+    Streams a file object to a temp file in `directory` in CHUNK_SIZE pieces,
+    hashing as it goes. Raises UploadTooLarge as soon as max_bytes is passed.
+    """
+    sha = hashlib.sha256()
+    size = 0
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"{filename} exceeds {max_bytes} bytes")
+                sha.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+    return StagedUpload(filename, temp_path, sha.hexdigest(), size)
+
+
+def discard_all(staged):
+    for s in staged:
+        s.discard()
+
+
+class MultipartReceiver:
+    """
+    Parses a multipart/form-data body as it arrives. Each file part is
+    written once, straight to a temp file in `directory`, hashed and
+    size-checked per chunk; StagedUpload.commit() then renames it into
+    place. Plain fields are kept in `fields`.
+    """
+
+    def __init__(self, content_type: str, directory: str,
+                 max_file_bytes: int = MAX_UPLOAD_FILE_BYTES,
+                 max_request_bytes: int = MAX_UPLOAD_REQUEST_BYTES):
+        kind, params = parse_options_header(content_type or "")
+        if kind != b"multipart/form-data" or not params.get(b"boundary"):
+            raise MalformedUpload("Expected a multipart/form-data body")
+
+        self.directory = directory
+        self.max_file_bytes = max_file_bytes
+        self.max_request_bytes = max_request_bytes
+        self.fields = {}
+        self.files = []  # (field name, StagedUpload), in arrival order
+        self.received = 0
+
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._reset_part()
+        self._parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": self._reset_part,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def _reset_part(self):
+        self._disposition = b""
+        self._name = None
+        self._filename = None
+        self._data = bytearray()
+        self._out = None
+
+    def _on_header_field(self, data, start, end):
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data, start, end):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._disposition)
+        if b"name" not in options:
+            raise MalformedUpload("Form part without a name")
+        self._name = options[b"name"].decode("utf-8", "replace")
+        if b"filename" in options:
+            self._filename = options[b"filename"].decode("utf-8", "replace")
+            fd, self._temp_path = tempfile.mkstemp(dir=self.directory, suffix=".part")
+            self._out = os.fdopen(fd, "wb")
+            self._sha = hashlib.sha256()
+            self._size = 0
+
+    def _on_part_data(self, data, start, end):
+        chunk = data[start:end]
+        if self._out is None:
+            if len(self._data) + len(chunk) > MAX_FORM_FIELD_BYTES:
+                raise MalformedUpload(f"Form field {self._name} is too long")
+            self._data += chunk
+            return
+        self._size += len(chunk)
+        if self._size > self.max_file_bytes:
+            raise UploadTooLarge(f"{self._filename} exceeds {self.max_file_bytes} bytes")
+        self._sha.update(chunk)
+        self._out.write(chunk)
+
+    def _on_part_end(self):
+        if self._out is None:
+            self.fields[self._name] = self._data.decode("utf-8", "replace")
+            return
+        self._out.close()
+        self._out = None
+        self.files.append((self._name, StagedUpload(self._filename, self._temp_path, self._sha.hexdigest(), self._size)))
+
+    def feed(self, chunk: bytes):
+        self.received += len(chunk)
+        if self.received > self.max_request_bytes:
+            raise UploadTooLarge(f"request exceeds {self.max_request_bytes} bytes")
+        self._parser.write(chunk)
+
+    def finish(self):
+        self._parser.finalize()
+
+    def uploads(self, name: str) -> list:
+        return [upload for field, upload in self.files if field == name]
+
+    def discard(self):
+        """Removes every file written so far, including a partial one."""
+        if self._out is not None:
+            self._out.close()
+            os.remove(self._temp_path)
+            self._out = None
+        discard_all(upload for _, upload in self.files)
+
+
+async def receive_multipart(request, directory: str,
+                            max_file_bytes: int = MAX_UPLOAD_FILE_BYTES,
+                            max_request_bytes: int = MAX_UPLOAD_REQUEST_BYTES) -> MultipartReceiver:
+    """
+    Streams the request body through a MultipartReceiver. The declared
+    Content-Length is checked before any of the body is read, and the
+    running total and each file while it arrives, so oversized uploads
+    are cut off early. Disk writes run in worker threads.
+    Raises UploadTooLarge or MalformedUpload, leaving no files behind.
+    """
+    if int(request.headers.get("content-length") or 0) > max_request_bytes:
+        raise UploadTooLarge(f"request exceeds {max_request_bytes} bytes")
+
+    receiver = MultipartReceiver(request.headers.get("content-type"), directory, max_file_bytes, max_request_bytes)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await asyncio.to_thread(receiver.feed, chunk)
+        receiver.finish()
+    except FormParserError as e:
+        receiver.discard()
+        raise MalformedUpload(str(e))
+    except BaseException:
+        receiver.discard()
+        raise
+    return receiver
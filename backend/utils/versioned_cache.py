@@ -0,0 +1,95 @@
+# backend/utils/versioned_cache.py
+import logging
+import threading
+import time
+
+from sqlalchemy import Integer, cast
+from sqlalchemy.dialects.sqlite import insert
+
+logger = logging.getLogger(__name__)
+
+
+def read_version(db, key: str) -> int:
+    """Current value of a version counter in global_settings (0 if unset)."""
+    import models
+
+    row = db.query(models.GlobalSettings.value).filter(models.GlobalSettings.key == key).first()
+    return int(row[0]) if row else 0
+
+
+def bump_version(db, key: str):
+    """
+    Increments a version counter in one statement; `db` is a Session or,
+    inside flush hooks, its Connection. The caller commits.
+    """
+    import models
+
+    table = models.GlobalSettings.__table__
+    stmt = insert(table).values(key=key, value="1")
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["key"],
+        set_={"value": cast(table.c.value, Integer) + 1},
+    ))
+
+
+class VersionedCache:
+    """
+    A per-process copy of something loaded from the database, tied to a
+    version counter in global_settings.
+
+    `load(db)` returns (version, value). The counter is checked at most
+    every `recheck_seconds`, and the value is reloaded only when it has
+    moved, so a read is normally an attribute lookup. Writers bump the
+    counter in their transaction and call invalidate() after committing,
+    so their own process sees the change at once.
+    """
+
+    def __init__(self, key: str, load, recheck_seconds: float):
+        self.key = key
+        self.recheck_seconds = recheck_seconds
+        self._load = load
+        self._value = None
+        self._version = -1
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def _fresh(self) -> bool:
+        return self._value is not None and time.monotonic() - self._checked_at < self.recheck_seconds
+
+    def get(self):
+        if self._fresh():
+            return self._value
+
+        with self._lock:
+            if self._fresh():
+                return self._value
+
+            from database import SessionLocal
+
+            db = SessionLocal()
+            try:
+                if self._value is None or read_version(db, self.key) != self._version:
+                    self._version, self._value = self._load(db)
+                    logger.info("%s loaded (version %s)", self.key, self._version)
+            finally:
+                db.close()
+            self._checked_at = time.monotonic()
+            return self._value
+
+    @property
+    def version(self) -> int:
+        self.get()
+        return self._version
+
+    def bump(self, db):
+        bump_version(db, self.key)
+
+    def invalidate(self):
+        """Forces the next read to re-check the version."""
+        self._checked_at = float("-inf")
+
+    def clear(self):
+        """Drops the cached value; the next read reloads it."""
+        with self._lock:
+            self._value = None
+            self._checked_at = float("-inf")
@@ -2,7 +2,7 @@ import React, { useEffect, useState } from 'react';
 import { View, Text, StyleSheet, FlatList, ActivityIndicator, Image } from 'react-native';
 import { useRouter } from 'expo-router';
 import { Ionicons } from '@expo/vector-icons';
-import api from '../../services/api';
+import { getAllPages } from '../../services/api';
 
 export default function ProcessorHistory() {
   const router = useRouter();
@@ -15,8 +15,7 @@ export default function ProcessorHistory() {
 
   const loadHistory = async () => {
     try {
-      const res = await api.get('/batches/all');
-      const data = res.data || [];
+      const data = await getAllPages('/batches/all');
       
       // Filter: Show only batches that have been PROCESSED (Lab Tested, Sold, etc.)
       // We exclude 'HARVESTED' because those are new/untouched.
@@ -24,8 +23,8 @@ export default function ProcessorHistory() {
         b.status === 'LAB_TESTED' || b.status === 'SOLD' || b.status === 'IN_TRANSIT' || b.status === 'DONATION_READY'
       );
       
-      // Sort by newest
-      setHistory(processed.reverse());
+      // Already newest first
+      setHistory(processed);
     } catch (e) {
       console.error(e);
     } finally {
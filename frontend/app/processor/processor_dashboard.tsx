@@ -3,7 +3,7 @@ import { View, Text, StyleSheet, TouchableOpacity, ScrollView, Alert } from 'rea
 import { useRouter } from 'expo-router';
 import { Ionicons, MaterialIcons } from '@expo/vector-icons';
 import { CameraView, useCameraPermissions } from 'expo-camera';
-import api from '../../services/api';
+import { getAllPages } from '../../services/api';
 
 export default function ProcessorDashboard() {
   const router = useRouter();
@@ -16,8 +16,7 @@ export default function ProcessorDashboard() {
 
   const loadStats = async () => {
     try {
-      const res = await api.get('/batches/all');
-      const batches = Array.isArray(res.data) ? res.data : [];
+      const batches = await getAllPages('/batches/all');
       setPendingCount(batches.filter((b: any) => b.status === "HARVESTED" || b.status === "AT_PROCESSOR").length);
       setCertifiedCount(batches.filter((b: any) => b.status === "LAB_TESTED").length);
       setRecent(batches.filter((b: any) => b.status === "LAB_TESTED").slice(0, 3));
@@ -36,6 +36,18 @@ api.interceptors.response.use(
     return Promise.reject(error);
   }
 );
+// List endpoints return one page at a time; X-Next-Cursor points at the next
+export const getAllPages = async (path: string, limit = 200) => {
+  const rows: any[] = [];
+  let cursor: string | undefined;
+  do {
+    const res = await api.get(path, { params: { limit, cursor } });
+    rows.push(...(Array.isArray(res.data) ? res.data : []));
+    cursor = res.headers['x-next-cursor'];
+  } while (cursor);
+  return rows;
+};
+
 // --- 1. AUTH & FARMER ---
 export const AuthAPI = {
   signup: async (userData: any) => {
@@ -65,10 +77,7 @@ export const CollectorAPI = {
     });
     return response.data;
   },
-  getHistory: async (userId: number) => {
-    const res = await api.get(`/batches/farmer/${userId}`);
-    return res.data;
-  }
+  getHistory: async (userId: number) => getAllPages(`/batches/farmer/${userId}`)
 };
 
 // --- 2. REGULATOR (Government) ---